@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from celery.schedules import crontab
@@ -80,19 +81,164 @@ DATABASES = {
 }
 
 
+# Redis
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+
 # Celery settings
 
-CELERY_BROKER_URL = f'redis://127.0.0.1:6379/0'
-CELERY_RESULT_BACKEND = f'redis://127.0.0.1:6379/0'
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_BEAT_SCHEDULE = {
-    'fetch-articles-every-10-minutes': {
-        'task': 'parcer_app.tasks.schedule_fetching',
-        'schedule': crontab(minute='*/10'),
+    'dispatch-due-hubs-every-minute': {
+        'task': 'parcer_app.tasks.dispatch_due_hubs',
+        'schedule': crontab(minute='*'),
     },
 }
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+# Обход хабов идет в отдельной очереди, чтобы долгие задачи не задерживали планировщик
+CELERY_TASK_ROUTES = {
+    'parcer_app.tasks.fetch_hubs': {'queue': 'crawl'},
+}
+# Воркер не резервирует долгие задачи обхода, пока другие воркеры простаивают
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+
+
+# Parcer settings
+
+# Условные запросы (If-None-Match/If-Modified-Since) для страниц хабов и статей
+PARCER_HTTP_CACHE_ENABLED = os.getenv('PARCER_HTTP_CACHE_ENABLED', 'True') == 'True'
+
+# Общий индекс уже сохраненных ссылок в Redis (иначе только в памяти процесса)
+PARCER_KNOWN_URLS_REDIS = os.getenv('PARCER_KNOWN_URLS_REDIS', 'False') == 'True'
+
+# Пул для парсинга HTML: 'process' (по умолчанию) или 'thread'
+PARCER_PARSE_EXECUTOR = os.getenv('PARCER_PARSE_EXECUTOR', 'process')
+PARCER_PARSE_WORKERS = int(os.getenv('PARCER_PARSE_WORKERS', '0'))
+
+# Движок извлечения данных по умолчанию: 'bs4' или 'lxml' (можно переопределить в хабе)
+PARCER_PARSER_ENGINE = os.getenv('PARCER_PARSER_ENGINE', 'bs4')
+
+# Конвейер загрузка -> парсинг -> сохранение: число обработчиков на каждом этапе,
+# размер очередей между этапами и пачки записи в БД
+PARCER_DOWNLOAD_CONCURRENCY = int(os.getenv('PARCER_DOWNLOAD_CONCURRENCY', '5'))
+PARCER_PARSE_CONCURRENCY = int(os.getenv('PARCER_PARSE_CONCURRENCY', '2'))
+PARCER_QUEUE_SIZE = int(os.getenv('PARCER_QUEUE_SIZE', '100'))
+PARCER_STORE_BATCH_SIZE = int(os.getenv('PARCER_STORE_BATCH_SIZE', '50'))
+PARCER_STORE_FLUSH_INTERVAL = float(os.getenv('PARCER_STORE_FLUSH_INTERVAL', '5'))
+# Сжатие текста постов в таблице PostContent: '' (без сжатия), 'zlib' или 'zstd' (пакет zstandard)
+PARCER_CONTENT_COMPRESSION = os.getenv('PARCER_CONTENT_COMPRESSION', 'zlib')
+
+# Число строк в одном INSERT при пакетной записи в БД
+PARCER_DB_BATCH_SIZE = int(os.getenv('PARCER_DB_BATCH_SIZE', '500'))
+
+# Ограничение нагрузки на один хост (общее для всех хабов этого хоста):
+# запросов в секунду, размер всплеска и число одновременных соединений.
+# Число соединений подстраивается между MIN и MAX по задержкам и ошибкам,
+# начиная с INITIAL или со значения, сохраненного в хабе после прошлого обхода.
+# PARCER_HOST_LIMITS переопределяет значения для отдельных хостов, например
+# {"habr.com": {"rate": 2, "burst": 4, "max_connections": 3}}
+PARCER_HOST_RATE = float(os.getenv('PARCER_HOST_RATE', '5'))
+PARCER_HOST_BURST = int(os.getenv('PARCER_HOST_BURST', '10'))
+PARCER_HOST_MAX_CONNECTIONS = int(os.getenv('PARCER_HOST_MAX_CONNECTIONS', '16'))
+PARCER_HOST_MIN_CONNECTIONS = int(os.getenv('PARCER_HOST_MIN_CONNECTIONS', '1'))
+PARCER_HOST_INITIAL_CONNECTIONS = int(os.getenv('PARCER_HOST_INITIAL_CONNECTIONS', '4'))
+# Во сколько раз p95 задержки может превысить базовую, прежде чем лимит уменьшится
+PARCER_HOST_LATENCY_TOLERANCE = float(os.getenv('PARCER_HOST_LATENCY_TOLERANCE', '2'))
+PARCER_HOST_LIMITS = json.loads(os.getenv('PARCER_HOST_LIMITS', '{}'))
+
+# Пул HTTP-соединений
+PARCER_CONNECTION_LIMIT = int(os.getenv('PARCER_CONNECTION_LIMIT', '100'))
+PARCER_DNS_CACHE_TTL = int(os.getenv('PARCER_DNS_CACHE_TTL', '300'))
+PARCER_KEEPALIVE_TIMEOUT = float(os.getenv('PARCER_KEEPALIVE_TIMEOUT', '30'))
+PARCER_REQUEST_TIMEOUT = float(os.getenv('PARCER_REQUEST_TIMEOUT', '30'))
+
+# Повторы при временных ошибках (таймауты, 429, 5xx): число повторов и границы
+# экспоненциальной задержки в секундах. Retry-After больше MAX_DELAY не ждем.
+PARCER_RETRY_ATTEMPTS = int(os.getenv('PARCER_RETRY_ATTEMPTS', '2'))
+PARCER_RETRY_BASE_DELAY = float(os.getenv('PARCER_RETRY_BASE_DELAY', '1'))
+PARCER_RETRY_MAX_DELAY = float(os.getenv('PARCER_RETRY_MAX_DELAY', '30'))
+
+# Предохранитель хоста: после стольких неудач подряд запросы к хосту
+# не отправляются RESET_TIMEOUT секунд
+PARCER_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('PARCER_CIRCUIT_FAILURE_THRESHOLD', '5'))
+PARCER_CIRCUIT_RESET_TIMEOUT = float(os.getenv('PARCER_CIRCUIT_RESET_TIMEOUT', '60'))
+
+# Число хабов в одной задаче Celery и ограничения времени задачи в секундах
+PARCER_HUBS_PER_TASK = int(os.getenv('PARCER_HUBS_PER_TASK', '1'))
+PARCER_HUB_TASK_SOFT_TIME_LIMIT = int(os.getenv('PARCER_HUB_TASK_SOFT_TIME_LIMIT', '540'))
+PARCER_HUB_TASK_TIME_LIMIT = int(os.getenv('PARCER_HUB_TASK_TIME_LIMIT', '600'))
+
+# Аренда хаба в Redis на время обхода: пересекающиеся запуски одного хаба пропускаются.
+# TTL в секундах, аренда продлевается каждые TTL/3.
+PARCER_HUB_LEASE_ENABLED = os.getenv('PARCER_HUB_LEASE_ENABLED', 'True') == 'True'
+PARCER_HUB_LEASE_TTL = float(os.getenv('PARCER_HUB_LEASE_TTL', '60'))
+
+# Расписание обхода: интервал в минутах подбирается для каждого хаба так,
+# чтобы за обход находилось около TARGET_NEW_POSTS статей; без новых статей
+# интервал растет в BACKOFF раз
+PARCER_FETCH_INTERVAL_DEFAULT = float(os.getenv('PARCER_FETCH_INTERVAL_DEFAULT', '10'))
+PARCER_FETCH_INTERVAL_MIN = float(os.getenv('PARCER_FETCH_INTERVAL_MIN', '5'))
+PARCER_FETCH_INTERVAL_MAX = float(os.getenv('PARCER_FETCH_INTERVAL_MAX', '360'))
+PARCER_TARGET_NEW_POSTS = int(os.getenv('PARCER_TARGET_NEW_POSTS', '5'))
+PARCER_FETCH_BACKOFF = float(os.getenv('PARCER_FETCH_BACKOFF', '1.5'))
+
+# Повторная проверка статей, опубликованных за последние RECRAWL_WINDOW часов
+# (также включается ключом fetch_articles --recrawl)
+PARCER_RECRAWL_ENABLED = os.getenv('PARCER_RECRAWL_ENABLED', 'False') == 'True'
+PARCER_RECRAWL_WINDOW = float(os.getenv('PARCER_RECRAWL_WINDOW', '24'))
+
+# Каталог архива исходного HTML статей (пусто - архив не ведется).
+# Из архива статьи можно разобрать заново: fetch_articles --replay
+PARCER_ARCHIVE_DIR = os.getenv('PARCER_ARCHIVE_DIR', '')
+
+# Сколько обходов подряд повторять статью, которую не удалось загрузить
+PARCER_FAILED_URL_MAX_ATTEMPTS = int(os.getenv('PARCER_FAILED_URL_MAX_ATTEMPTS', '5'))
+
+# Очередь обхода в БД: сколько статей процесс забирает за раз и на сколько
+# секунд. Ссылки упавшего процесса возвращаются в очередь по истечении аренды.
+PARCER_FRONTIER_BATCH_SIZE = int(os.getenv('PARCER_FRONTIER_BATCH_SIZE', '100'))
+PARCER_FRONTIER_LEASE_TTL = int(os.getenv('PARCER_FRONTIER_LEASE_TTL', '600'))
+
+# Метрики Prometheus отдаются по /metrics. Воркеры Celery на других машинах
+# отправляют их в Pushgateway по этому адресу (пусто - не отправлять).
+# Для сбора метрик всех процессов одной машины задайте PROMETHEUS_MULTIPROC_DIR.
+PARCER_METRICS_PUSHGATEWAY = os.getenv('PARCER_METRICS_PUSHGATEWAY', '')
+
+# Логи парсера пишутся в stdout отдельным потоком, обход на выводе не блокируется.
+# DEBUG включает сообщения по каждой статье, в рабочем режиме достаточно INFO.
+PARCER_LOG_LEVEL = os.getenv('PARCER_LOG_LEVEL', 'INFO')
+
+# Каталог профилей обхода (fetch_articles --profile, задачи с profile=True)
+PARCER_PROFILE_DIR = os.getenv('PARCER_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'parcer': {
+            'format': '%(asctime)s %(levelname)s %(processName)s %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'parcer': {
+            '()': 'parcer_app.log.BackgroundHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'parcer',
+        },
+    },
+    'loggers': {
+        'parcer_app': {
+            'handlers': ['parcer'],
+            'level': PARCER_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
 
 
 
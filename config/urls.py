@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.urls import path
 from django.shortcuts import redirect
+from parcer_app.views import metrics
 
 urlpatterns = [
     path('', lambda request: redirect('parcer/admin/')),
     path('parcer/', lambda request: redirect('parcer/admin/')),
     path('parcer/admin/', admin.site.urls),
+    path('metrics', metrics),
 ]
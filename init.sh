@@ -370,6 +370,9 @@ update_env_file
 # Обновляем резервную копию .env.bak после успешного изменения .env
 cp "$ENV_FILE" "$ENV_FILE.bak"
 
+# Текст постов переехал в PostContent: копируем старый столбец до его удаления миграцией
+python manage.py move_post_content
+
 # Выполняем миграции
 echo "Создаем миграции..."
 python manage.py makemigrations
@@ -379,6 +382,7 @@ sleep 1
 if [ "$(ls parcer_app/migrations/ | grep '000*')" ]; then
     echo "Применяем миграции..."
     python manage.py migrate
+    python manage.py move_post_content
 else
     echo "Миграции не были созданы, пропускаем применение."
 fi
@@ -429,9 +433,22 @@ if [ $? -ne 0 ]; then
 fi
 echo ""
 
+# Метрики воркеров Celery и сервера пишутся в общий каталог и отдаются по /metrics
+export PROMETHEUS_MULTIPROC_DIR="$(pwd)/.prometheus"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # Запуск Celery
 echo "Запускаем Celery..."
-PYTHONIOENCODING=UTF-8 celery -A config worker -l info -P solo &
+# Задачи обхода хабов идут в очередь crawl. Пул threads: задачи делят один
+# event loop, лимиты хостов и пул процессов парсинга (дочерние процессы
+# prefork демонические и не могут запускать свои процессы).
+if [[ "$OSTYPE" == "msys" || "$OSTYPE" == "win32" ]]; then
+    CELERY_POOL_ARGS="-P solo"
+else
+    CELERY_POOL_ARGS="-P threads -c ${CELERY_CONCURRENCY:-4}"
+fi
+PYTHONIOENCODING=UTF-8 celery -A config worker -l info -Q celery,crawl $CELERY_POOL_ARGS &
 CELERY_PID=$!
 if [ $? -ne 0 ]; then
     echo "ОШИБКА: Не удалось запустить Celery."
@@ -449,8 +466,9 @@ fi
 echo ""
 
 # Проверка работы парсера
+# Тесты не пишут метрики в каталог работающих воркеров и сервера
 echo "Проверка работы парсера..."
-if ! python manage.py test parcer_app.tests.test_fetch_articles; then
+if ! env -u PROMETHEUS_MULTIPROC_DIR python manage.py test parcer_app.tests.test_fetch_articles; then
     echo "ОШИБКА: Ошибка работы парсера. Завершение скрипта."
     restore_env
     exit 1
@@ -465,7 +483,7 @@ echo ""
 
 # Запускам парсер (1 итерация)
 echo "Запускаем парсер..."
-python manage.py shell -c "from parcer_app.tasks import fetch_articles; fetch_articles.delay()"
+python manage.py shell -c "from parcer_app.tasks import schedule_fetching; schedule_fetching.delay()"
 echo ""
 
 # Ожидание завершения процесса сервера
@@ -1,12 +1,13 @@
 from django.contrib import admin
-from .models import Hub, HubSelectors, Post
+from .models import ArchivedPage, CrawlURL, Hub, HubSelectors, Post
 
 @admin.register(Hub)
 class HubAdmin(admin.ModelAdmin):
     list_display = [
-        'name', 'last_fetched'
+        'name', 'parser_engine', 'last_fetched', 'last_new_posts',
+        'fetch_interval', 'next_fetch_at', 'concurrency_limit'
     ]
-    readonly_fields = ('last_fetched',)
+    readonly_fields = ('last_fetched', 'last_new_posts', 'concurrency_limit')
     list_filter = ('name',)
     search_fields = ('name',)
 
@@ -20,7 +21,7 @@ class PostAdmin(admin.ModelAdmin):
     list_select_related = ('hub',)
     readonly_fields = (
         'hub', 'title', 'post_url', 'author_name', 'publication_date',
-        'author_url', 'created_at',
+        'author_url', 'created_at', 'content',
     )
 
     list_filter = ('hub', 'publication_date',)
@@ -34,4 +35,28 @@ class HubSelectorsAdmin(admin.ModelAdmin):
     ]
     list_select_related = ('hub',)
     list_filter = ('hub',)
-    search_fields = ('hub',)
\ No newline at end of file
+    search_fields = ('hub',)
+
+@admin.register(CrawlURL)
+class CrawlURLAdmin(admin.ModelAdmin):
+    list_display = [
+        'url', 'hub', 'status', 'priority', 'attempts', 'last_status',
+        'lease_owner', 'leased_until', 'updated_at'
+    ]
+    list_select_related = ('hub',)
+    readonly_fields = (
+        'url', 'hub', 'lease_owner', 'leased_until', 'last_status', 'last_error',
+        'created_at', 'updated_at',
+    )
+    list_filter = ('status', 'hub', 'last_status',)
+    search_fields = ('url',)
+
+@admin.register(ArchivedPage)
+class ArchivedPageAdmin(admin.ModelAdmin):
+    list_display = [
+        'url', 'hub', 'digest', 'fetched_at'
+    ]
+    list_select_related = ('hub',)
+    readonly_fields = ('url', 'hub', 'digest', 'fetched_at')
+    list_filter = ('hub',)
+    search_fields = ('url',)
\ No newline at end of file
@@ -0,0 +1,36 @@
+import hashlib
+import os
+from pathlib import Path
+from django.conf import settings
+from parcer_app.compression import compress, decompress
+
+# Страницы в архиве всегда сжаты zlib, независимо от настроек сжатия постов
+ARCHIVE_COMPRESSION = 'zlib'
+
+
+# Архив исходного HTML на диске. Файл называется по SHA-256 содержимого,
+# поэтому одинаковые ответы хранятся один раз. Индекс по ссылке и времени
+# загрузки хранится в модели ArchivedPage.
+class HtmlArchive:
+    def __init__(self, root=None):
+        self.root = Path(root or settings.PARCER_ARCHIVE_DIR)
+
+    def path(self, digest):
+        return self.root / digest[:2] / digest[2:4] / f'{digest}.html.zz'
+
+    def write(self, html_content):
+        data = html_content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if path.exists():
+            return digest
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Запись через временный файл: читатель не увидит недописанную страницу
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        temp_path.write_bytes(compress(html_content, ARCHIVE_COMPRESSION))
+        os.replace(temp_path, path)
+        return digest
+
+    def read(self, digest):
+        return decompress(self.path(digest).read_bytes(), ARCHIVE_COMPRESSION)
@@ -0,0 +1,232 @@
+# Версионированный корпус страниц Habr и StackOverflow для бенчмарка разбора.
+# Страницы генерируются детерминированно из benchmarks/pages.py, который
+# использует и бенчмарк обхода. Хэш корпуса сохраняется в базовой линии:
+# после любого изменения страниц сравнение с ней отклоняется, и базовую
+# линию (BASELINE_PATH) нужно пересохранить.
+import gc
+import hashlib
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from parcer_app.benchmarks.pages import (
+    HABR_SELECTORS, STACKOVERFLOW_SELECTORS, habr_article_page, habr_hub_page,
+    stackoverflow_hub_page, stackoverflow_question_page,
+)
+from parcer_app.management.commands.fetch_articles import ArticleFetcher
+from parcer_app.parsing import extract_article, extract_links
+
+CORPUS_VERSION = 1
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'parse_baseline.json')
+
+# Размер статьи (абзацы), число комментариев и ссылок на странице хаба
+SIZES = {
+    'small': {'paragraphs': 5, 'comments': 10, 'links': 10},
+    'median': {'paragraphs': 60, 'comments': 80, 'links': 20},
+    'huge': {'paragraphs': 1500, 'comments': 600, 'links': 100},
+}
+
+SITES = {
+    'habr': (HABR_SELECTORS, habr_hub_page, habr_article_page),
+    'stackoverflow': (STACKOVERFLOW_SELECTORS, stackoverflow_hub_page, stackoverflow_question_page),
+}
+
+ARTICLE_FIELDS = ['title', 'author', 'author_url', 'publication_date', 'content']
+
+PUBLICATION_DATES = [
+    '2024-11-05T10:00:00',
+    '2024-11-05T10:00:00.000Z',
+    '2024-10-01 12:00:00Z',
+    '5 ноября 2024',
+    None,
+]
+
+
+def page_chrome(html_content, comments):
+    # Как на настоящих страницах: шапка с навигацией, скрипты, боковая
+    # колонка и комментарии вокруг статьи, которые парсер должен пропустить
+    header = (
+        '<header class="tm-header"><nav>'
+        + ''.join(f'<a class="tm-nav__link" href="/ru/flows/{number}/">Раздел {number}</a>' for number in range(40))
+        + '</nav></header>'
+        + '<script>window.__INITIAL_STATE__ = {"articles": {}, "user": null};</script>' * 5
+    )
+    sidebar = (
+        '<aside class="tm-layout__sidebar">'
+        + ''.join(
+            f'<div class="tm-block"><a href="/ru/companies/{number}/">Компания {number}</a>'
+            f'<p>Описание компании {number} в боковой колонке.</p></div>'
+            for number in range(30)
+        )
+        + '</aside>'
+    )
+    thread = (
+        '<section class="tm-comments">'
+        + ''.join(
+            f'<div class="tm-comment"><a class="tm-user-info__username" href="/ru/users/c{number}/">c{number}</a>'
+            f'<time datetime="2024-11-06T10:00:00.000Z">6 ноя</time>'
+            f'<div class="tm-comment__body-content"><p>Комментарий {number}: <b>согласен</b>, но есть нюанс.</p></div></div>'
+            for number in range(comments)
+        )
+        + '</section>'
+    )
+    body_start = html_content.index('<body>') + len('<body>')
+    body_end = html_content.rindex('</body>')
+    return html_content[:body_start] + header + html_content[body_start:body_end] + sidebar + thread + html_content[body_end:]
+
+
+def build_corpus():
+    corpus = {}
+    for site, (selectors, hub_page, article_page) in SITES.items():
+        for size, options in SIZES.items():
+            corpus[f'{site}-hub-{size}'] = (
+                'hub', selectors, page_chrome(hub_page(f'/{site}', options['links']), 0),
+            )
+            corpus[f'{site}-article-{size}'] = (
+                'article', selectors, page_chrome(article_page(7, options['paragraphs']), options['comments']),
+            )
+    return corpus
+
+
+def corpus_hash(corpus):
+    digest = hashlib.sha256()
+    for name, page in sorted(corpus.items()):
+        digest.update(json.dumps([name, *page], sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+# tracemalloc видит только выделения Python: дерево lxml строится в C,
+# и пик памяти для него почти ничего не значит
+TRACEMALLOC_ENGINES = ('bs4',)
+
+
+def median_times(funcs, repeat, number=None):
+    # Замеры идут по кругу: в каждом круге каждая функция вызывается один раз.
+    # Временное замедление машины тогда задевает все страницы поровну
+    # и отсекается медианой, а не смещает время отдельных страниц.
+    # number - сколько вызовов входит в один замер функции (для коротких).
+    # Возвращает медиану и медианное отклонение: по нему задается порог шума.
+    number = number or {}
+    samples = {key: [] for key in funcs}
+    # Сборщик мусора на время замеров отключается, как в timeit
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for key, func in funcs.items():
+                calls = number.get(key, 1)
+                started = time.perf_counter()
+                for _ in range(calls):
+                    func()
+                samples[key].append((time.perf_counter() - started) / calls)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    times = {}
+    for key, values in samples.items():
+        median = statistics.median(values)
+        times[key] = (median, statistics.median(abs(value - median) for value in values))
+    return times
+
+
+def calibration():
+    # Постоянная нагрузка на чистом Python: по ее времени в том же прогоне
+    # базовая линия приводится к текущей скорости машины
+    return sorted(str(number) for number in range(20000))
+
+
+def peak_allocations(func):
+    # Отдельный прогон: tracemalloc сильно замедляет разбор и исказил бы время
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(engine='bs4', repeat=15):
+    corpus = build_corpus()
+    pages = {}
+    funcs = {}
+    for name, (kind, selectors, html_content) in corpus.items():
+        selectors = dict(selectors, engine=engine)
+        func = extract_links if kind == 'hub' else extract_article
+        parse = funcs[name] = lambda func=func, html_content=html_content, selectors=selectors: func(html_content, selectors)
+
+        # Первый вызов компилирует селекторы и дает извлеченные поля
+        result = parse()
+        if kind == 'hub':
+            fields = {'links': sum(len(link) for link in result)}
+        else:
+            fields = {field: len(result[field] or '') for field in ARTICLE_FIELDS}
+
+        pages[name] = {'page_bytes': len(html_content.encode('utf-8')), 'fields': fields}
+        if engine in TRACEMALLOC_ENGINES:
+            pages[name]['peak_kb'] = peak_allocations(parse) / 1024
+
+    # Разбор даты публикации выполняется для каждой сохраняемой статьи
+    funcs['publication_date'] = lambda: [ArticleFetcher._parse_publication_date(value) for value in PUBLICATION_DATES]
+    funcs['calibration'] = calibration
+    times = median_times(funcs, repeat, number={'publication_date': 100})
+
+    for name, page in pages.items():
+        page['time_ms'], page['spread_ms'] = (value * 1000 for value in times[name])
+    elapsed, spread = times['publication_date']
+    dates = {
+        'time_ms': elapsed * 1000 / len(PUBLICATION_DATES),
+        'spread_ms': spread * 1000 / len(PUBLICATION_DATES),
+    }
+
+    return {
+        'version': CORPUS_VERSION,
+        'corpus_hash': corpus_hash(corpus),
+        'engine': engine,
+        'calibration_ms': times['calibration'][0] * 1000,
+        'pages': pages,
+        'publication_date': dates,
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms=0.05, noise=3):
+    # Регрессия: время или пик памяти выросли больше чем на threshold
+    # (доля от базовой линии), либо изменился размер извлеченных полей.
+    # Время базовой линии приводится к скорости машины по калибровке.
+    # Рост времени в пределах шума (noise медианных отклонений
+    # или min_delta_ms) регрессией не считается.
+    if baseline.get('version') != results['version']:
+        raise ValueError(
+            f"Базовая линия снята на корпусе версии {baseline.get('version')}, "
+            f"текущая версия {results['version']}: пересохраните базовую линию"
+        )
+    if baseline.get('corpus_hash') != results.get('corpus_hash'):
+        raise ValueError(
+            f"Базовая линия снята на другом корпусе (хэш {baseline.get('corpus_hash')}, "
+            f"текущий {results.get('corpus_hash')}): страницы изменились, пересохраните базовую линию"
+        )
+
+    scale = 1.0
+    if baseline.get('calibration_ms') and results.get('calibration_ms'):
+        scale = results['calibration_ms'] / baseline['calibration_ms']
+
+    regressions = []
+    measured = dict(results['pages'], publication_date=results['publication_date'])
+    expected = dict(baseline.get('pages', {}), publication_date=baseline.get('publication_date', {}))
+    for name, current in measured.items():
+        base = expected.get(name)
+        if base is None:
+            continue
+        base_time = base['time_ms'] * scale
+        delta = current['time_ms'] - base_time
+        noise_floor = max(min_delta_ms, noise * max(base.get('spread_ms', 0) * scale, current.get('spread_ms', 0)))
+        if delta > base_time * threshold and delta > noise_floor:
+            regressions.append(f"{name}: время {base_time:.3f} -> {current['time_ms']:.3f} мс")
+        if 'peak_kb' in base and 'peak_kb' in current and current['peak_kb'] > base['peak_kb'] * (1 + threshold):
+            regressions.append(f"{name}: пик памяти {base['peak_kb']:.1f} -> {current['peak_kb']:.1f} КБ")
+        for field, size in base.get('fields', {}).items():
+            if current['fields'].get(field) != size:
+                regressions.append(f"{name}: размер поля {field} {size} -> {current['fields'].get(field)}")
+    return regressions
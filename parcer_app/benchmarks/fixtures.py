@@ -0,0 +1,38 @@
+# Синтетические страницы для бенчмарков парсинга
+
+CONTENT_SELECTORS = {
+    'article_selector': 'a',
+    'title_selector': 'h1',
+    'author_selector': '.author',
+    'author_url_selector': '.author',
+    'publication_date_selector': 'time',
+    'content_selector': '.content',
+}
+
+
+def nested_content_html(depth, paragraphs=3):
+    # Каждый уровень вложенности содержит свои абзацы и следующий уровень,
+    # как в статьях со вложенными div/blockquote/spoiler
+    opening = ''.join(
+        f'<div class="level-{level}">' + ''.join(
+            f'<p>Абзац {paragraph} на уровне {level} с <b>выделением</b>.</p>'
+            for paragraph in range(paragraphs)
+        )
+        for level in range(depth)
+    )
+    closing = '</div>' * depth
+    return (
+        '<html><body><h1>Вложенная статья</h1>'
+        '<a class="author" href="/users/author/">author</a>'
+        '<time datetime="2024-01-01T00:00:00">1 января</time>'
+        f'<div class="content">{opening}{closing}</div>'
+        '</body></html>'
+    )
+
+
+def legacy_content(content_element):
+    # Прежний способ: get_text по каждому блочному тегу, текст вложенных
+    # блоков повторяется для каждого предка
+    tags = ['p', 'pre', 'code', 'blockquote', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+    nested_content = "\n".join(element.get_text(strip=True) for element in content_element.find_all(tags))
+    return nested_content.strip() if nested_content.strip() else content_element.get_text(strip=True)
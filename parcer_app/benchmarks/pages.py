@@ -0,0 +1,76 @@
+# Синтетические страницы в разметке Habr и StackOverflow для бенчмарка обхода.
+# Селекторы совпадают с initial_data.json.
+
+HABR_SELECTORS = {
+    'article_selector': 'article .tm-title__link',
+    'title_selector': 'article .tm-title span',
+    'author_selector': '.tm-article-presenter__content .tm-article-snippet__author .tm-user-info__username',
+    'author_url_selector': '.tm-article-presenter__content .tm-article-snippet__author .tm-user-info__username',
+    'publication_date_selector': 'article .tm-article-datetime-published time',
+    'content_selector': 'article .tm-article-body .article-formatted-body',
+}
+
+STACKOVERFLOW_SELECTORS = {
+    'article_selector': '#questions .s-link',
+    'title_selector': '#question-header .question-hyperlink',
+    'author_selector': '.postcell .user-info .user-details a',
+    'author_url_selector': '.postcell .user-info .user-details a',
+    'publication_date_selector': '.postcell .user-action-time span',
+    'content_selector': '.postcell .js-post-body',
+}
+
+
+def _paragraphs(number, count):
+    return ''.join(
+        f'<p>Абзац {paragraph} статьи {number}: <b>выделенный</b> текст и <a href="#p{paragraph}">ссылка</a>.</p>'
+        + (f'<pre><code>print({paragraph})</code></pre>' if paragraph % 5 == 4 else '')
+        for paragraph in range(count)
+    )
+
+
+def habr_hub_page(prefix, links):
+    items = ''.join(
+        f'<article class="tm-articles-list__item"><h2 class="tm-title">'
+        f'<a class="tm-title__link" href="{prefix}/ru/articles/{number}/"><span>Статья {number}</span></a>'
+        f'</h2></article>'
+        for number in range(links)
+    )
+    return f'<html><head><title>Хаб</title></head><body><div class="tm-articles-list">{items}</div></body></html>'
+
+
+def habr_article_page(number, paragraphs):
+    return (
+        '<html><head><title>Статья</title><script>var config = {};</script></head><body>'
+        '<div class="tm-article-presenter__content">'
+        '<article class="tm-article-presenter__content tm-article-presenter__content_narrow">'
+        '<div class="tm-article-snippet__meta-container"><div class="tm-article-snippet__author">'
+        f'<span class="tm-user-info"><a class="tm-user-info__username" href="/ru/users/author{number % 50}/">author{number % 50}</a></span>'
+        '</div><span class="tm-article-datetime-published">'
+        '<time datetime="2024-11-05T10:00:00.000Z" title="2024-11-05, 13:00">5 ноя</time></span></div>'
+        f'<h1 class="tm-title tm-title_h1"><span>Статья {number}</span></h1>'
+        '<div class="tm-article-body"><div class="article-formatted-body article-formatted-body_version-2">'
+        f'<div xmlns="http://www.w3.org/1999/xhtml">{_paragraphs(number, paragraphs)}</div>'
+        '</div></div></article></div></body></html>'
+    )
+
+
+def stackoverflow_hub_page(prefix, links):
+    items = ''.join(
+        f'<div class="s-post-summary"><h3 class="s-post-summary--content-title">'
+        f'<a class="s-link" href="{prefix}/questions/{number}/question-{number}">Вопрос {number}</a></h3></div>'
+        for number in range(links)
+    )
+    return f'<html><body><div id="questions">{items}</div></body></html>'
+
+
+def stackoverflow_question_page(number, paragraphs):
+    return (
+        '<html><body>'
+        f'<div id="question-header"><h1><a href="/questions/{number}/q" class="question-hyperlink">Вопрос {number}</a></h1></div>'
+        '<div class="question"><div class="postcell">'
+        f'<div class="s-prose js-post-body" itemprop="text">{_paragraphs(number, paragraphs)}</div>'
+        '<div class="user-info"><div class="user-action-time">asked '
+        '<span title="2024-10-01 12:00:00Z" class="relativetime">Oct 1</span></div>'
+        f'<div class="user-details"><a href="/users/{number % 50}/user">user{number % 50}</a></div>'
+        '</div></div></div></body></html>'
+    )
@@ -0,0 +1,38 @@
+# Синтетические посты для бенчмарков запросов к БД
+import random
+from datetime import timedelta
+from django.utils import timezone
+from parcer_app.models import Hub, Post
+
+
+def seed_hubs(count):
+    return Hub.objects.bulk_create(
+        Hub(name=f'Хаб {number}', url=f'https://example.com/hubs/{number}/') for number in range(count)
+    )
+
+
+def seed_posts(hubs, count, batch_size=10000, authors=5000, days=365, seed=0):
+    # Даты публикации равномерно за days дней, авторы повторяются,
+    # как в реальных хабах. Генератор детерминирован при одинаковом seed.
+    rng = random.Random(seed)
+    now = timezone.now()
+    created = 0
+
+    while created < count:
+        size = min(batch_size, count - created)
+        posts = []
+        for number in range(created, created + size):
+            published = now - timedelta(seconds=rng.randrange(days * 24 * 3600))
+            author = rng.randrange(authors)
+            posts.append(Post(
+                hub=rng.choice(hubs),
+                title=f'Пост {number}',
+                author_name=f'author{author}',
+                author_url=f'https://example.com/users/author{author}/',
+                post_url=f'https://example.com/posts/{number}/',
+                publication_date=published,
+                content_hash='',
+            ))
+        Post.objects.bulk_create(posts)
+        created += size
+        yield created
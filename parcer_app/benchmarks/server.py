@@ -0,0 +1,68 @@
+# Локальный сервер-заглушка для бенчмарка обхода: отдает синтетические
+# страницы Habr и StackOverflow с заданной задержкой и долей ошибок
+import asyncio
+import random
+from aiohttp import web
+from parcer_app.benchmarks.pages import (
+    habr_article_page, habr_hub_page, stackoverflow_hub_page, stackoverflow_question_page,
+)
+
+HABR_PREFIX = '/habr'
+STACKOVERFLOW_PREFIX = '/stackoverflow'
+
+
+def create_app(links=50, paragraphs=20, latency=0.05, error_rate=0.0, seed=0):
+    rng = random.Random(seed)
+
+    @web.middleware
+    async def conditions(request, handler):
+        # Задержка с разбросом +-50%, как у настоящего сайта
+        if latency:
+            await asyncio.sleep(latency * rng.uniform(0.5, 1.5))
+        if error_rate and rng.random() < error_rate:
+            return web.Response(status=503, text='Service Unavailable')
+        return await handler(request)
+
+    def html(text):
+        return web.Response(text=text, content_type='text/html', charset='utf-8')
+
+    async def habr_hub(request):
+        return html(habr_hub_page(HABR_PREFIX, links))
+
+    async def habr_article(request):
+        return html(habr_article_page(int(request.match_info['number']), paragraphs))
+
+    async def stackoverflow_hub(request):
+        return html(stackoverflow_hub_page(STACKOVERFLOW_PREFIX, links))
+
+    async def stackoverflow_question(request):
+        return html(stackoverflow_question_page(int(request.match_info['number']), paragraphs))
+
+    app = web.Application(middlewares=[conditions])
+    app.router.add_get(f'{HABR_PREFIX}/ru/articles/', habr_hub)
+    app.router.add_get(f'{HABR_PREFIX}/ru/articles/{{number}}/', habr_article)
+    app.router.add_get(f'{STACKOVERFLOW_PREFIX}/questions', stackoverflow_hub)
+    app.router.add_get(f'{STACKOVERFLOW_PREFIX}/questions/{{number}}/{{slug}}', stackoverflow_question)
+    return app
+
+
+async def start_server(app, host='127.0.0.1', port=0):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://{host}:{port}'
+
+
+def serve(options, ready):
+    # Точка входа отдельного процесса: сервер не делит GIL и память с обходчиком
+    async def main():
+        runner, base_url = await start_server(create_app(**options))
+        ready.put(base_url)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
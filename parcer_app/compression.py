@@ -0,0 +1,39 @@
+import zlib
+from django.core.exceptions import ImproperlyConfigured
+
+COMPRESSION_CHOICES = (
+    ('', 'Без сжатия'),
+    ('zlib', 'zlib'),
+    ('zstd', 'zstd'),
+)
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImproperlyConfigured("Для сжатия 'zstd' необходимо установить пакет zstandard")
+    return zstandard
+
+
+def compress(text, method):
+    data = text.encode('utf-8')
+    if method == '':
+        return data
+    if method == 'zlib':
+        return zlib.compress(data)
+    if method == 'zstd':
+        return _zstd().ZstdCompressor().compress(data)
+    raise ImproperlyConfigured(f"Неизвестный способ сжатия: {method}")
+
+
+def decompress(data, method):
+    # Драйвер БД может вернуть memoryview
+    data = bytes(data)
+    if method == 'zlib':
+        data = zlib.decompress(data)
+    elif method == 'zstd':
+        data = _zstd().ZstdDecompressor().decompress(data)
+    elif method != '':
+        raise ImproperlyConfigured(f"Неизвестный способ сжатия: {method}")
+    return data.decode('utf-8')
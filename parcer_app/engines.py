@@ -0,0 +1,181 @@
+import re
+from functools import lru_cache
+import soupsieve
+from bs4 import BeautifulSoup, CData, NavigableString, SoupStrainer, Tag
+from django.core.exceptions import ImproperlyConfigured
+
+# Текст этих тегов BeautifulSoup не включает в get_text()
+SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+
+# Типы строк, которые BeautifulSoup считает текстом (без комментариев, скриптов и т.п.)
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+# Первый составной селектор вида tag.class#id и то, что идет за ним
+LEADING_COMPOUND = re.compile(r'^\s*([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)(.*)$', re.S)
+
+
+def leading_rule(selector):
+    # Правило для SoupStrainer по первому составному селектору.
+    # None означает, что безопасно ограничить разбор нельзя.
+    if not selector or ',' in selector:
+        return None
+
+    tag, qualifiers, rest = LEADING_COMPOUND.match(selector).groups()
+    if not tag and not qualifiers:
+        return None
+
+    # Сразу за первым селектором допустимы только пробел или '>':
+    # соседние элементы (+, ~) и псевдоклассы вне сохраненного поддерева не видны
+    if rest and not rest[0].isspace() and rest[0] != '>':
+        return None
+    if rest.lstrip()[:1] in ('+', '~'):
+        return None
+
+    classes = set(re.findall(r'\.([\w-]+)', qualifiers))
+    ids = set(re.findall(r'#([\w-]+)', qualifiers))
+    return tag.lower() if tag else None, classes, ids
+
+
+def _rule_matches(rule, name, attrs):
+    tag, classes, ids = rule
+    if tag and name != tag:
+        return False
+    if classes and not classes.issubset((attrs.get('class') or '').split()):
+        return False
+    if ids and attrs.get('id') not in ids:
+        return False
+    return True
+
+
+# Движок по умолчанию: BeautifulSoup со встроенным html.parser
+class SoupEngine:
+    name = 'bs4'
+
+    def compile(self, selector):
+        return soupsieve.compile(selector)
+
+    def strainer(self, selectors):
+        rules = [leading_rule(selector) for selector in selectors]
+        if not rules or None in rules:
+            return None
+
+        # Строятся только поддеревья, с которых начинается хотя бы один селектор
+        return SoupStrainer(lambda name, attrs: any(_rule_matches(rule, name, attrs) for rule in rules))
+
+    def parse(self, html_content, only=None):
+        return BeautifulSoup(html_content, 'html.parser', parse_only=only)
+
+    def select(self, document, pattern):
+        return pattern.select(document)
+
+    def first_matches(self, document, patterns):
+        # Один обход дерева для всех селекторов вместо select_one на каждый
+        found = {}
+        pending = dict(patterns)
+        for element in document.descendants:
+            if not isinstance(element, Tag):
+                continue
+            for key, pattern in list(pending.items()):
+                if pattern.match(element):
+                    found[key] = element
+                    del pending[key]
+            if not pending:
+                break
+        return found
+
+    def text(self, element):
+        return element.get_text(strip=True)
+
+    def attr(self, element, name, default=None):
+        return element.get(name, default)
+
+    def walk(self, element):
+        # Обход поддерева без рекурсии: события start/end для тегов и text для строк
+        yield 'start', element.name
+        stack = [(element, iter(element.contents))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                yield 'end', node.name
+            elif isinstance(child, Tag):
+                yield 'start', child.name
+                stack.append((child, iter(child.contents)))
+            elif type(child) in TEXT_STRING_TYPES:
+                yield 'text', str(child)
+
+
+# Быстрый движок на lxml + cssselect, результаты совпадают с SoupEngine.
+# Разбор выполняется целиком в C, поэтому поддеревья не ограничиваются.
+class LxmlEngine:
+    name = 'lxml'
+
+    def __init__(self):
+        try:
+            import lxml.etree
+            import lxml.html
+            from lxml.cssselect import CSSSelector
+        except ImportError:
+            raise ImproperlyConfigured("Для движка 'lxml' необходимо установить пакеты lxml и cssselect")
+
+        self.html = lxml.html
+        self.etree = lxml.etree
+        self.css_selector = CSSSelector
+        # huge_tree снимает ограничение libxml2 на глубину вложенности
+        self.parser = lxml.html.HTMLParser(huge_tree=True)
+
+    def compile(self, selector):
+        return self.css_selector(selector)
+
+    def strainer(self, selectors):
+        return None
+
+    def parse(self, html_content, only=None):
+        return self.html.document_fromstring(html_content, parser=self.parser)
+
+    def select(self, document, pattern):
+        return pattern(document)
+
+    def first_matches(self, document, patterns):
+        found = {}
+        for key, pattern in patterns.items():
+            matches = pattern(document)
+            if matches:
+                found[key] = matches[0]
+        return found
+
+    def text(self, element):
+        return ''.join(value.strip() for event, value in self.walk(element) if event == 'text')
+
+    def attr(self, element, name, default=None):
+        return element.get(name, default)
+
+    def walk(self, element):
+        events = ('start', 'end', 'comment', 'pi')
+        for event, node in self.etree.iterwalk(element, events=events):
+            if event == 'start':
+                yield 'start', node.tag
+                if node.text and node.tag not in SKIP_TEXT_TAGS:
+                    yield 'text', node.text
+                continue
+
+            # Хвост корня поддерева к его содержимому не относится
+            if event == 'end':
+                yield 'end', node.tag
+            if node.tail and node is not element:
+                yield 'text', node.tail
+
+
+ENGINES = {
+    SoupEngine.name: SoupEngine,
+    LxmlEngine.name: LxmlEngine,
+}
+
+
+@lru_cache(maxsize=None)
+def get_engine(name):
+    try:
+        return ENGINES[name]()
+    except KeyError:
+        raise ImproperlyConfigured(f"Неизвестный движок парсинга: {name}")
@@ -0,0 +1,88 @@
+import os
+import socket
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from parcer_app.models import CrawlURL
+
+
+# Очередь обхода хаба в БД. Процесс забирает ссылки пачками под аренду,
+# ссылки упавшего воркера возвращаются в очередь по истечении аренды.
+# Очередь хаба разбирает один процесс: это обеспечивает аренда хаба
+# (HubLease). Блокировка строк в claim нужна, только если аренда
+# отключена или Redis недоступен: тогда второй процесс ждет, а не выдает
+# те же ссылки. Методы синхронные, из корутин вызываются через sync_to_async.
+class Frontier:
+    def __init__(self, hub):
+        self.hub = hub
+        self.owner = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    def enqueue(self, urls, priority=CrawlURL.PRIORITY_NEW, requeue=False):
+        # Уже известные очереди ссылки не сбрасываются, кроме requeue:
+        # обработанные ссылки снова ставятся в очередь (повторная проверка)
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        CrawlURL.objects.bulk_create(
+            [CrawlURL(url=url, hub=self.hub, priority=priority) for url in urls],
+            batch_size=settings.PARCER_DB_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        if requeue:
+            CrawlURL.objects.filter(url__in=urls, status__in=[CrawlURL.DONE, CrawlURL.FAILED]).update(
+                status=CrawlURL.PENDING, priority=priority, attempts=0, available_at=None, updated_at=timezone.now()
+            )
+
+    @transaction.atomic
+    def claim(self, limit, started):
+        # started - начало обхода: отложенные в этом же обходе ссылки не выдаются повторно
+        now = timezone.now()
+        available = (
+            Q(status=CrawlURL.PENDING) & (Q(available_at__isnull=True) | Q(available_at__lt=started))
+            | Q(status=CrawlURL.LEASED, leased_until__lt=now)
+        )
+        ids = list(
+            CrawlURL.objects.select_for_update()
+            .filter(available, hub=self.hub)
+            .order_by('-priority', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+
+        CrawlURL.objects.filter(id__in=ids).update(
+            status=CrawlURL.LEASED,
+            lease_owner=self.owner,
+            leased_until=now + timedelta(seconds=settings.PARCER_FRONTIER_LEASE_TTL),
+            updated_at=now,
+        )
+        return list(CrawlURL.objects.filter(id__in=ids).order_by('-priority', 'id').values_list('url', flat=True))
+
+    def complete(self, urls):
+        CrawlURL.objects.filter(url__in=urls).update(
+            status=CrawlURL.DONE, lease_owner='', leased_until=None, last_error='', updated_at=timezone.now()
+        )
+
+    @transaction.atomic
+    def fail(self, url, status=None, error='', attempted=True):
+        # Ссылка вернется в очередь со следующим обходом, пока не исчерпаны попытки.
+        # Пока хост отключен предохранителем, попытка не засчитывается.
+        item, _ = CrawlURL.objects.select_for_update().get_or_create(url=url, defaults={'hub': self.hub})
+        if attempted:
+            item.attempts += 1
+        item.status = CrawlURL.FAILED if item.attempts >= settings.PARCER_FAILED_URL_MAX_ATTEMPTS else CrawlURL.PENDING
+        item.last_status = status
+        item.last_error = error
+        item.lease_owner = ''
+        item.leased_until = None
+        item.available_at = timezone.now()
+        item.save()
+
+    def release(self):
+        # Необработанные ссылки прерванного обхода сразу возвращаются в очередь
+        return CrawlURL.objects.filter(status=CrawlURL.LEASED, lease_owner=self.owner).update(
+            status=CrawlURL.PENDING, lease_owner='', leased_until=None, updated_at=timezone.now()
+        )
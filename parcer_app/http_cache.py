@@ -0,0 +1,64 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from parcer_app.models import PageValidator
+
+
+# Кэш валидаторов (ETag/Last-Modified) для условных запросов.
+# Новые значения сохраняются вместе со статьями, чтобы 304 не пришел
+# для страницы, которая так и не попала в базу.
+class ValidatorCache:
+    def __init__(self):
+        self.enabled = settings.PARCER_HTTP_CACHE_ENABLED
+        self.validators = {}
+        self.pending = {}
+
+    async def load(self, urls):
+        if not self.enabled:
+            return
+
+        missing = [url for url in urls if url not in self.validators]
+        if not missing:
+            return
+
+        rows = await sync_to_async(list)(
+            PageValidator.objects.filter(url__in=missing).values_list('url', 'etag', 'last_modified')
+        )
+        for url, etag, last_modified in rows:
+            self.validators[url] = (etag, last_modified)
+
+    def request_kwargs(self, url):
+        etag, last_modified = self.validators.get(url, (None, None))
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        return {'headers': headers} if headers else {}
+
+    def remember(self, url, response):
+        if not self.enabled:
+            return
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.pending[url] = (etag, last_modified)
+
+    def save(self, urls):
+        ready = {url: self.pending.pop(url) for url in urls if url in self.pending}
+        if not ready:
+            return
+
+        PageValidator.objects.bulk_create(
+            [
+                PageValidator(url=url, etag=etag, last_modified=last_modified)
+                for url, (etag, last_modified) in ready.items()
+            ],
+            batch_size=settings.PARCER_DB_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['url'],
+            update_fields=['etag', 'last_modified', 'updated_at'],
+        )
+        self.validators.update(ready)
@@ -0,0 +1,19 @@
+import aiohttp
+from django.conf import settings
+from parcer_app.metrics import trace_config
+from parcer_app.throttling import max_host_connections
+
+
+def create_session():
+    # Пул соединений с keep-alive и кэшем DNS. Число соединений с хостом
+    # задает ограничитель хоста, пул лишь страхует сверху.
+    connector = aiohttp.TCPConnector(
+        limit=settings.PARCER_CONNECTION_LIMIT,
+        limit_per_host=max_host_connections(),
+        use_dns_cache=True,
+        ttl_dns_cache=settings.PARCER_DNS_CACHE_TTL,
+        keepalive_timeout=settings.PARCER_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    timeout = aiohttp.ClientTimeout(total=settings.PARCER_REQUEST_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[trace_config()])
@@ -0,0 +1,62 @@
+import logging
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from parcer_app.models import Post
+from parcer_app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = 'parcer:known_urls'
+
+
+# Индекс уже сохраненных статей. Проверка делается до запроса статьи,
+# поэтому известные ссылки не скачиваются и не парсятся повторно.
+class KnownUrlIndex:
+    def __init__(self):
+        self.urls = set()
+        self.use_redis = settings.PARCER_KNOWN_URLS_REDIS
+
+    async def filter_new(self, urls):
+        return await sync_to_async(self._filter_new)(urls)
+
+    def _filter_new(self, urls):
+        # Убираем повторы, сохраняя порядок ссылок на странице
+        urls = list(dict.fromkeys(urls))
+        candidates = [url for url in urls if url not in self.urls]
+
+        if candidates and self.use_redis:
+            try:
+                flags = get_redis().smismember(REDIS_KEY, candidates)
+                self.urls.update(url for url, flag in zip(candidates, flags) if flag)
+                candidates = [url for url, flag in zip(candidates, flags) if not flag]
+            except redis.RedisError as e:
+                logger.warning("Ошибка при обращении к Redis, проверяем ссылки по базе данных: %s", e)
+
+        if candidates:
+            found = set(Post.objects.filter(post_url__in=candidates).values_list('post_url', flat=True))
+            if found:
+                self.urls.update(found)
+                self._share(found)
+
+        return [url for url in urls if url not in self.urls]
+
+    def add(self, urls):
+        urls = set(urls)
+        if not urls:
+            return
+
+        def remember():
+            self.urls.update(urls)
+            self._share(urls)
+
+        transaction.on_commit(remember)
+
+    def _share(self, urls):
+        if not self.use_redis:
+            return
+        try:
+            get_redis().sadd(REDIS_KEY, *urls)
+        except redis.RedisError as e:
+            logger.warning("Ошибка при обращении к Redis: %s", e)
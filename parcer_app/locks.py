@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import uuid
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from parcer_app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'parcer:hub_lease:'
+
+# Продление и снятие только своей аренды: токен сверяется атомарно
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# Аренда хаба в Redis: пока она жива, другие процессы этот хаб не обходят.
+# Ключ истекает сам, если владелец упал и перестал продлевать аренду.
+class HubLease:
+    def __init__(self, hub_id, ttl=None):
+        self.key = f'{KEY_PREFIX}{hub_id}'
+        self.token = uuid.uuid4().hex
+        self.ttl = ttl or settings.PARCER_HUB_LEASE_TTL
+
+    def acquire(self):
+        return bool(get_redis().set(self.key, self.token, nx=True, px=int(self.ttl * 1000)))
+
+    def renew(self):
+        script = get_redis().register_script(RENEW_SCRIPT)
+        return bool(script(keys=[self.key], args=[self.token, int(self.ttl * 1000)]))
+
+    def release(self):
+        script = get_redis().register_script(RELEASE_SCRIPT)
+        return bool(script(keys=[self.key], args=[self.token]))
+
+    async def heartbeat(self, on_lost):
+        # Продлеваем аренду втрое чаще TTL, чтобы пережить пару неудачных продлений
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                renewed = await sync_to_async(self.renew, thread_sensitive=False)()
+            except redis.RedisError as e:
+                logger.warning("Ошибка при продлении аренды %s: %s", self.key, e)
+                continue
+            if not renewed:
+                on_lost()
+                return
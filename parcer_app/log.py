@@ -0,0 +1,56 @@
+import atexit
+import copy
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Обработчик логов, который не блокирует обход: запись только кладется
+# в очередь, а в поток вывода ее пишет отдельный поток QueueListener
+class BackgroundHandler(QueueHandler):
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = None
+        self._start_listener()
+        atexit.register(self._stop_listener)
+        # Потоки не переживают fork: в процессах prefork-пула Celery слушатель запускается заново
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_listener)
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _stop_listener(self):
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def _restart_listener(self):
+        self.queue = queue.SimpleQueue()
+        self._start_listener()
+
+    def prepare(self, record):
+        # QueueHandler.prepare форматирует запись в вызывающем потоке.
+        # Здесь запись только копируется, а строку с датой, полями и трассировкой
+        # собирает форматтер target в потоке слушателя. Аргументы сообщения
+        # подставляются сразу, пока вызывающий код их не изменил.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+
+# Имя и id хаба добавляются к каждой записи полями hub и hub_id,
+# а имя хаба еще и к тексту сообщения
+class HubLogger(logging.LoggerAdapter):
+    def __init__(self, logger, hub):
+        super().__init__(logger, {'hub': hub.name, 'hub_id': hub.pk})
+
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **kwargs.get('extra', {})}
+        return f"[{self.extra['hub']}] {msg}", kwargs
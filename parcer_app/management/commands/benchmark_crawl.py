@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from parcer_app.benchmarks.pages import HABR_SELECTORS, STACKOVERFLOW_SELECTORS
+from parcer_app.benchmarks.server import HABR_PREFIX, STACKOVERFLOW_PREFIX, serve
+from parcer_app.management.commands.fetch_articles import Command as FetchCommand
+from parcer_app.models import Hub, HubSelectors, Post
+from parcer_app.parsing import shutdown_parse_executor
+from parcer_app.resilience import reset_circuit_breakers
+
+
+class Command(BaseCommand):
+    help = 'Обходит синтетические хабы на локальном сервере и замеряет скорость обхода, разбора и записи в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--links', type=int, default=100, help='Число статей на странице хаба')
+        parser.add_argument('--paragraphs', type=int, default=20, help='Число абзацев в статье (размер страницы)')
+        parser.add_argument('--latency', type=float, default=0.05, help='Средняя задержка ответа сервера, секунды')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов 503')
+        parser.add_argument('--host-rate', type=float, default=0.0, help='Лимит запросов в секунду на хост, 0 - без лимита')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--tracemalloc', action='store_true', help='Замерить пик памяти Python (замедляет обход)')
+        parser.add_argument('--keepdb', action='store_true', help='Не удалять тестовую БД')
+
+    def start_server(self, options):
+        # Сервер в отдельном процессе, чтобы не отнимать время у обходчика
+        context = multiprocessing.get_context('spawn')
+        ready = context.Queue()
+        server_options = {
+            'links': options['links'],
+            'paragraphs': options['paragraphs'],
+            'latency': options['latency'],
+            'error_rate': options['error_rate'],
+            'seed': options['seed'],
+        }
+        process = context.Process(target=serve, args=(server_options, ready), daemon=True)
+        process.start()
+        return process, ready.get(timeout=30)
+
+    def create_hubs(self, base_url):
+        Post.objects.all().delete()
+        Hub.objects.all().delete()
+        for name, url, selectors in [
+            ('Habr', f'{base_url}{HABR_PREFIX}/ru/articles/', HABR_SELECTORS),
+            ('StackOverflow', f'{base_url}{STACKOVERFLOW_PREFIX}/questions', STACKOVERFLOW_SELECTORS),
+        ]:
+            hub = Hub.objects.create(name=name, url=url)
+            HubSelectors.objects.create(hub=hub, **selectors)
+
+    def crawl(self, options):
+        reset_circuit_breakers()
+        if options['tracemalloc']:
+            tracemalloc.start()
+
+        started = time.perf_counter()
+        results = asyncio.run(FetchCommand().fetch_all_hubs())
+        elapsed = time.perf_counter() - started
+        # Процессы пула разбора завершаются и попадают в RUSAGE_CHILDREN
+        shutdown_parse_executor()
+
+        peak = None
+        if options['tracemalloc']:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return results, elapsed, peak
+
+    def max_rss(self, who):
+        # ru_maxrss в килобайтах на Linux и в байтах на macOS
+        max_rss = resource.getrusage(who).ru_maxrss
+        return max_rss / 1024 if sys.platform != 'darwin' else max_rss / 1024 / 1024
+
+    def report(self, results, elapsed, peak):
+        processed = sum(result['processed'] for result in results)
+        stored = sum(result['stored'] for result in results)
+        parse_time = sum(result['parse_time'] for result in results)
+        store_time = sum(result['store_time'] for result in results)
+
+        max_rss = self.max_rss(resource.RUSAGE_SELF)
+        # Для завершенных дочерних процессов (пул разбора) ru_maxrss - пик
+        # самого большого из них, а не сумма. Сервер-заглушка еще работает и не учитывается.
+        children_rss = self.max_rss(resource.RUSAGE_CHILDREN)
+
+        print(f"\n{'хаб':<16} {'обработано':>10} {'добавлено':>10} {'разбор, с':>10} {'запись, с':>10}")
+        for result in results:
+            print(f"{result['hub']:<16} {result['processed']:>10} {result['stored']:>10} "
+                  f"{result['parse_time']:>10.2f} {result['store_time']:>10.2f}")
+
+        print(f"\nВремя обхода: {elapsed:.2f} с")
+        print(f"Страниц в секунду: {processed / max(elapsed, 1e-6):.1f}")
+        print(f"Разбор на страницу: {parse_time / max(processed, 1) * 1000:.2f} мс")
+        print(f"Запись в БД: {store_time:.2f} с, {store_time / max(stored, 1) * 1000:.2f} мс на статью")
+        print(f"Пик RSS основного процесса: {max_rss:.1f} МБ")
+        if children_rss:
+            print(f"Пик RSS процесса пула разбора (наибольший): {children_rss:.1f} МБ")
+        if peak is not None:
+            print(f"Пик памяти Python (tracemalloc): {peak / 1024 / 1024:.1f} МБ")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        process, base_url = self.start_server(options)
+        print(f"Сервер-заглушка: {base_url}")
+        try:
+            self.create_hubs(base_url)
+            # Обход без Redis и архива, повторы без ожидания: замеряется сам обходчик
+            with override_settings(
+                PARCER_HUB_LEASE_ENABLED=False,
+                PARCER_KNOWN_URLS_REDIS=False,
+                PARCER_ARCHIVE_DIR='',
+                PARCER_RECRAWL_ENABLED=False,
+                PARCER_HOST_RATE=options['host_rate'],
+                PARCER_RETRY_BASE_DELAY=0,
+            ):
+                results, elapsed, peak = self.crawl(options)
+            self.report(results, elapsed, peak)
+        finally:
+            process.terminate()
+            process.join()
+            shutdown_parse_executor()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
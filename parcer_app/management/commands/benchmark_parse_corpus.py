@@ -0,0 +1,68 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from parcer_app.benchmarks.corpus import ARTICLE_FIELDS, BASELINE_PATH, compare, run_suite
+
+
+class Command(BaseCommand):
+    help = 'Замеряет разбор страниц хабов и статей на корпусе Habr и StackOverflow и сравнивает с базовой линией'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', action='append', dest='engines', choices=['bs4', 'lxml'])
+        parser.add_argument('--repeat', type=int, default=15, help='Число замеров, по которым берется медиана')
+        parser.add_argument(
+            '--baseline', nargs='?', const=BASELINE_PATH,
+            help=f'JSON базовой линии: ошибка при регрессии. Без пути - {BASELINE_PATH}'
+        )
+        parser.add_argument('--save-baseline', help='Сохранить результаты как базовую линию')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Допустимый рост времени и памяти, доля')
+
+    def print_results(self, results):
+        fields = ARTICLE_FIELDS + ['links']
+        print(f"\nДвижок {results['engine']}, корпус версии {results['version']} ({results['corpus_hash']})")
+        print(f"{'страница':<28} {'КБ':>7} {'медиана, мс':>12} {'±, мс':>8} {'пик, КБ':>9}  " + ' '.join(f'{field:>12}' for field in fields))
+        for name, page in results['pages'].items():
+            sizes = ' '.join(f"{page['fields'].get(field, ''):>12}" for field in fields)
+            # Пик памяти замеряется только для движков, выделяющих память в Python
+            peak = f"{page['peak_kb']:>9.1f}" if 'peak_kb' in page else f"{'-':>9}"
+            print(f"{name:<28} {page['page_bytes'] / 1024:>7.1f} {page['time_ms']:>12.3f} {page['spread_ms']:>8.3f} {peak}  {sizes}")
+        dates = results['publication_date']
+        print(f"{'дата публикации':<28} {'':>7} {dates['time_ms']:>12.4f} {dates['spread_ms']:>8.4f}")
+
+    def handle(self, *args, **options):
+        engines = options['engines'] or ['bs4']
+        baseline = None
+        if options['baseline']:
+            if not os.path.exists(options['baseline']):
+                raise CommandError(f"Базовая линия {options['baseline']} не найдена, сохраните ее через --save-baseline")
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+
+        results = {}
+        regressions = []
+        for engine in engines:
+            results[engine] = run_suite(engine, options['repeat'])
+            self.print_results(results[engine])
+
+            if baseline is not None:
+                if engine not in baseline:
+                    raise CommandError(f"В базовой линии нет результатов для движка {engine}")
+                try:
+                    regressions += [f"{engine} {item}" for item in compare(results[engine], baseline[engine], options['threshold'])]
+                except ValueError as e:
+                    raise CommandError(str(e))
+
+        if options['save_baseline']:
+            saved = {}
+            if os.path.exists(options['save_baseline']):
+                with open(options['save_baseline'], encoding='utf-8') as baseline_file:
+                    saved = json.load(baseline_file)
+            saved.update(results)
+            with open(options['save_baseline'], 'w', encoding='utf-8') as baseline_file:
+                json.dump(saved, baseline_file, ensure_ascii=False, indent=2)
+            print(f"\nБазовая линия сохранена: {options['save_baseline']}")
+
+        if regressions:
+            raise CommandError("Регрессия разбора относительно базовой линии:\n" + '\n'.join(regressions))
+        if baseline is not None:
+            print("\nРегрессий относительно базовой линии нет.")
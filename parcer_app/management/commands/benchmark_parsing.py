@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from parcer_app.benchmarks.fixtures import CONTENT_SELECTORS, legacy_content, nested_content_html
+from parcer_app.engines import get_engine
+from parcer_app.parsing import serialize_content
+
+
+class Command(BaseCommand):
+    help = 'Замеряет скорость извлечения содержимого статей на глубоко вложенных страницах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depths', type=int, nargs='+', default=[10, 50, 100, 200, 400])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--engine', action='append', dest='engines', choices=['bs4', 'lxml'])
+
+    def measure(self, func, repeat):
+        best = None
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        engines = options['engines'] or ['bs4']
+        repeat = options['repeat']
+
+        print(f"{'движок':<8} {'глубина':>8} {'способ':<10} {'время, мс':>10} {'символов':>10}")
+        for depth in options['depths']:
+            html_content = nested_content_html(depth)
+
+            for name in engines:
+                engine = get_engine(name)
+                document = engine.parse(html_content)
+                content = engine.first_matches(document, {'content': engine.compile(CONTENT_SELECTORS['content_selector'])})['content']
+
+                elapsed, result = self.measure(lambda: serialize_content(engine, content), repeat)
+                print(f"{name:<8} {depth:>8} {'новый':<10} {elapsed * 1000:>10.2f} {len(result):>10}")
+
+                # Прежний способ реализован только для BeautifulSoup
+                if name == 'bs4':
+                    elapsed, result = self.measure(lambda: legacy_content(content), repeat)
+                    print(f"{name:<8} {depth:>8} {'прежний':<10} {elapsed * 1000:>10.2f} {len(result):>10}")
@@ -0,0 +1,122 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from parcer_app.benchmarks.posts import seed_hubs, seed_posts
+from parcer_app.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заполняет отдельную тестовую БД постами и замеряет типичные запросы с индексами и без них'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--hubs', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--max-ms', type=float, help='Ошибка, если запрос с индексами медленнее порога')
+        parser.add_argument('--compare', action='store_true', help='Повторить замеры без индексов Post')
+        parser.add_argument('--explain', action='store_true', help='Вывести планы запросов')
+        parser.add_argument('--keepdb', action='store_true', help='Не удалять тестовую БД (повторный запуск без заполнения)')
+
+    def queries(self, hub):
+        now = timezone.now()
+        return [
+            # Список постов в админке: сортировка Meta и подсчет для пагинации
+            ('админка: первая страница', lambda: list(Post.objects.select_related('hub')[:100])),
+            ('админка: число постов', lambda: Post.objects.count()),
+            ('админка: фильтр по хабу', lambda: list(Post.objects.filter(hub=hub).select_related('hub')[:100])),
+            ('посты хаба за неделю', lambda: list(
+                Post.objects.filter(hub=hub, publication_date__gte=now - timedelta(days=7)).values_list('post_url', flat=True)
+            )),
+            ('лента за сутки', lambda: list(
+                Post.objects.filter(publication_date__gte=now - timedelta(days=1)).values_list('pk', flat=True)
+            )),
+            ('добавленные за час', lambda: list(
+                Post.objects.filter(created_at__gte=now - timedelta(hours=1)).order_by('-created_at').values_list('pk', flat=True)
+            )),
+            # Поиск в админке по подстроке: индексом не обслуживается
+            ('поиск автора (icontains)', lambda: list(Post.objects.filter(author_name__icontains='author42')[:100])),
+        ]
+
+    def measure(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def run_queries(self, hub, options, label):
+        results = {}
+        print(f"\n{label}")
+        print(f"{'запрос':<28} {'время, мс':>10}")
+        for name, func in self.queries(hub):
+            elapsed = self.measure(func, options['repeat']) * 1000
+            results[name] = elapsed
+            print(f"{name:<28} {elapsed:>10.2f}")
+        return results
+
+    def explain(self, hub):
+        now = timezone.now()
+        querysets = [
+            Post.objects.select_related('hub')[:100],
+            Post.objects.filter(hub=hub)[:100],
+            Post.objects.filter(hub=hub, publication_date__gte=now - timedelta(days=7)),
+            Post.objects.filter(created_at__gte=now - timedelta(hours=1)).order_by('-created_at'),
+            Post.objects.filter(author_name__icontains='author42')[:100],
+        ]
+        for queryset in querysets:
+            print(f"\n{queryset.query}\n{queryset.explain()}")
+
+    def seed(self, options):
+        if Post.objects.exists():
+            print(f"В тестовой БД уже {Post.objects.count()} постов, заполнение пропущено.")
+            return
+
+        hubs = seed_hubs(options['hubs'])
+        started = time.perf_counter()
+        for created in seed_posts(hubs, options['posts']):
+            print(f"\rДобавлено постов: {created}", end='', flush=True)
+        # Время добавления близко к времени публикации, как при регулярном обходе
+        Post.objects.update(created_at=F('publication_date'))
+        print(f"\nЗаполнение заняло {time.perf_counter() - started:.1f} с")
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def handle(self, *args, **options):
+        # Замеры идут в отдельной тестовой БД, рабочие данные не затрагиваются
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            self.seed(options)
+            hub = Post.objects.values_list('hub', flat=True).first()
+            results = self.run_queries(hub, options, 'С индексами')
+
+            if options['explain']:
+                self.explain(hub)
+
+            if options['compare']:
+                indexes = Post._meta.indexes
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.remove_index(Post, index)
+                try:
+                    without = self.run_queries(hub, options, 'Без индексов')
+                finally:
+                    with connection.schema_editor() as editor:
+                        for index in indexes:
+                            editor.add_index(Post, index)
+
+                print(f"\n{'запрос':<28} {'ускорение':>10}")
+                for name, elapsed in results.items():
+                    print(f"{name:<28} {without[name] / max(elapsed, 1e-6):>9.1f}x")
+
+            slow = [name for name, elapsed in results.items() if options['max_ms'] and elapsed > options['max_ms']]
+            if slow:
+                raise CommandError(f"Запросы медленнее {options['max_ms']} мс: {', '.join(slow)}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
@@ -1,172 +1,467 @@
 import asyncio
+import logging
+import time
 import aiohttp
+import redis
 from asgiref.sync import sync_to_async
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from datetime import timedelta
 from django.utils import timezone
-from django.db import transaction
-from bs4 import BeautifulSoup
+from django.db import DataError, IntegrityError, transaction
 from urllib.parse import urljoin
-from parcer_app.models import Hub, HubSelectors, Post
+from parcer_app.models import ArchivedPage, CrawlURL, Hub, HubSelectors, Post, PostContent
+from parcer_app.archive import HtmlArchive
+from parcer_app.frontier import Frontier
+from parcer_app.http_cache import ValidatorCache
+from parcer_app.known_urls import KnownUrlIndex
+from parcer_app.http_client import create_session
+from parcer_app.locks import HubLease
+from parcer_app.log import HubLogger
+from parcer_app.profiling import CrawlProfiler
+from parcer_app.metrics import FETCH_SECONDS, PARSE_SECONDS, POSTS, RESPONSE_BYTES, RESPONSES, SELECTOR_MISSES, STORE_SECONDS
+from parcer_app.scheduling import next_fetch_at, next_fetch_interval
+from parcer_app.throttling import get_host_limiter
+from parcer_app.resilience import RETRY_STATUSES, CircuitOpenError, get_circuit_breaker, parse_retry_after, retry_delay
+from parcer_app.parsing import extract_article, extract_links, run_parser, selectors_to_dict, shutdown_parse_executor
+
+logger = logging.getLogger(__name__)
+
+# Поля статьи, которые обновляются при изменении ее содержимого
+POST_CONTENT_FIELDS = ['title', 'author_name', 'author_url', 'publication_date', 'content_hash']
 
 class ArticleFetcher:
-    def __init__(self, hub, command):
+    def __init__(self, hub, command, known_urls=None, recrawl=None, parse_executor=None):
         self.hub = hub
         self.selectors = None
-        self.semaphore = asyncio.Semaphore(5)
-        self.fetched_articles = []
+        self.parse_selectors = None
+        self.processed_count = 0
+        self.stored_count = 0
+        self.updated_count = 0
+        # Суммарное время разбора и записи в базу, секунды
+        self.parse_time = 0.0
+        self.store_time = 0.0
+        self.recrawl = settings.PARCER_RECRAWL_ENABLED if recrawl is None else recrawl
+        # Тип пула для парсинга, по умолчанию PARCER_PARSE_EXECUTOR
+        self.parse_executor = parse_executor
         self.command = command
+        self.http_cache = ValidatorCache()
+        self.known_urls = known_urls or KnownUrlIndex()
+        self.frontier = Frontier(hub)
+        self.archive = HtmlArchive() if settings.PARCER_ARCHIVE_DIR else None
+        self.skipped = False
+        self.log = HubLogger(logger, hub)
 
     async def initialize(self):
-        print(f"Инициализация селекторов для хаба {self.hub.name}...")
+        self.log.debug("Инициализация селекторов")
         try:
             self.selectors = await sync_to_async(HubSelectors.objects.get)(hub=self.hub)
-            print(f"Селекторы для хаба {self.hub.name} успешно загружены.")
+            self.parse_selectors = selectors_to_dict(self.selectors, self.hub.parser_engine)
+            self.log.debug("Селекторы успешно загружены")
         except HubSelectors.DoesNotExist:
-            print(f"Селекторы для хаба {self.hub.name} не найдены")
+            self.log.warning("Селекторы не найдены")
             self.selectors = None
 
+    async def crawl(self, session):
+        # Аренда хаба исключает одновременный обход одного хаба
+        # из нескольких запусков по расписанию
+        if not settings.PARCER_HUB_LEASE_ENABLED:
+            return await self.fetch_hub_page(session)
+
+        lease = HubLease(self.hub.pk)
+        try:
+            acquired = await sync_to_async(lease.acquire)()
+        except redis.RedisError as e:
+            self.log.warning("Ошибка при обращении к Redis, обходим хаб без аренды: %s", e)
+            return await self.fetch_hub_page(session)
+
+        if not acquired:
+            self.log.info("Хаб уже обходится другим процессом, пропускаем")
+            self.skipped = True
+            return
+
+        fetching = asyncio.create_task(self.fetch_hub_page(session))
+        lost = False
+
+        def on_lost():
+            nonlocal lost
+            lost = True
+            fetching.cancel()
+
+        heartbeat = asyncio.create_task(lease.heartbeat(on_lost))
+        try:
+            await fetching
+        except asyncio.CancelledError:
+            if not lost:
+                raise
+            self.log.warning("Аренда хаба потеряна, обход остановлен")
+        finally:
+            heartbeat.cancel()
+            try:
+                await sync_to_async(lease.release)()
+            except redis.RedisError as e:
+                self.log.warning("Ошибка при снятии аренды хаба: %s", e)
+
     async def fetch_hub_page(self, session):
-        print(f"Запрашиваем страницу хаба: {self.hub.url}...")
+        self.log.info("Запрашиваем страницу хаба: %s", self.hub.url)
         await self.initialize()
         if not self.selectors:
-            print("Ошибка: селекторы не были загружены")
+            self.log.error("Селекторы не были загружены")
             return
 
         try:
-            async with session.get(self.hub.url) as response:
-                if response.status == 200:
-                    print(f"Страница хаба {self.hub.url} успешно загружена.")
-                    html_content = await response.text()
-                    await self.parse_hub_page(html_content, session)
-                else:
-                    print(f"Не удалось получить страницу {self.hub.url}: Статус {response.status}")
-        except Exception as e:
-            print(f"Ошибка при запросе {self.hub.url}: {e}")
+            await self.http_cache.load([self.hub.url])
+            limiter = get_host_limiter(self.hub.url, self.hub.concurrency_limit)
+            status, html_content = await self.request_page(self.hub.url, session, limiter, page='hub')
+
+            # Слот хоста освобождается до загрузки статей
+            if status == 200:
+                self.log.debug("Страница хаба %s успешно загружена", self.hub.url)
+                await self.parse_hub_page(html_content)
+            elif status == 304:
+                self.log.info("Страница хаба %s не изменилась с прошлого запроса", self.hub.url)
+            else:
+                self.log.warning("Не удалось получить страницу %s: статус %s", self.hub.url, status)
 
-    async def parse_hub_page(self, html_content, session):
-        print(f"Парсинг страницы хаба {self.hub.url}...")
+            # Очередь обходится и при неизмененной странице хаба:
+            # в ней остаются статьи прерванных и неудачных обходов
+            if status in (200, 304):
+                if self.recrawl:
+                    await self.recrawl_recent()
+                await self.drain_frontier(session)
+
+            await self.save_concurrency_limit(limiter)
+        except Exception as e:
+            self.log.exception("Ошибка при запросе %s: %s", self.hub.url, e)
+
+        await self.save_schedule()
+
+    async def save_schedule(self):
+        # Чем больше новых статей за прошедшее время, тем чаще обходится хаб
+        now = timezone.now()
+        hub = self.hub
+        hub.fetch_interval = next_fetch_interval(hub.fetch_interval, hub.last_fetched, self.stored_count, now)
+        hub.next_fetch_at = next_fetch_at(hub.fetch_interval, now)
+        hub.last_fetched = now
+        hub.last_new_posts = self.stored_count
+        await sync_to_async(Hub.objects.filter(pk=hub.pk).update)(
+            last_fetched=hub.last_fetched,
+            last_new_posts=hub.last_new_posts,
+            fetch_interval=hub.fetch_interval,
+            next_fetch_at=hub.next_fetch_at,
+        )
+        self.log.info("Следующий обход хаба через %.0f мин.", hub.fetch_interval)
+
+    async def request_page(self, url, session, limiter, page='article'):
+        # Временные ошибки повторяются с экспоненциальной задержкой.
+        # Возвращает статус и HTML (только для ответа 200).
+        breaker = get_circuit_breaker(url)
+        labels = (self.hub.name, page)
+        retries = settings.PARCER_RETRY_ATTEMPTS
+
+        for retry in range(retries + 1):
+            retry_after = None
+            try:
+                with breaker.request():
+                    async with limiter.slot() as attempt:
+                        started = time.perf_counter()
+                        async with session.get(url, **self.http_cache.request_kwargs(url)) as response:
+                            status = attempt.status = response.status
+                            RESPONSES.labels(*labels, status).inc()
+                            if status not in RETRY_STATUSES:
+                                breaker.record_success()
+                                if status != 200:
+                                    FETCH_SECONDS.labels(*labels).observe(time.perf_counter() - started)
+                                    return status, None
+                                self.http_cache.remember(url, response)
+                                # text() декодирует уже прочитанное тело, повторной загрузки нет
+                                body = await response.read()
+                                html_content = await response.text()
+                                FETCH_SECONDS.labels(*labels).observe(time.perf_counter() - started)
+                                RESPONSE_BYTES.labels(*labels).observe(len(body))
+                                return status, html_content
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                            error = f"Статус {status}"
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                RESPONSES.labels(*labels, 'error').inc()
+                breaker.record_failure()
+                if retry == retries:
+                    raise
+                error = e
+            else:
+                breaker.record_failure()
+                if retry_after is not None and retry_after > settings.PARCER_RETRY_MAX_DELAY:
+                    # Хост просит подождать дольше, чем имеет смысл в рамках обхода
+                    breaker.trip(retry_after)
+                    return status, None
+                if retry == retries:
+                    return status, None
+
+            delay = retry_delay(retry, retry_after)
+            self.log.info("Повторяем запрос %s через %.1f с: %s", url, delay, error)
+            await asyncio.sleep(delay)
+
+    async def save_concurrency_limit(self, limiter):
+        # Следующий обход начнется с последнего подобранного лимита
+        self.hub.concurrency_limit = limiter.concurrency.limit
+        await sync_to_async(Hub.objects.filter(pk=self.hub.pk).update)(concurrency_limit=self.hub.concurrency_limit)
+
+    async def parse_hub_page(self, html_content):
+        self.log.debug("Парсинг страницы хаба %s", self.hub.url)
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            article_links = soup.select(self.selectors.article_selector)
+            started = time.perf_counter()
+            article_links = await run_parser(extract_links, html_content, self.parse_selectors, executor=self.parse_executor)
+            PARSE_SECONDS.labels(self.hub.name, 'hub').observe(time.perf_counter() - started)
 
             if not article_links:
-                print(f"Селектор {self.selectors.article_selector} не нашел статьи на странице {self.hub.url}")
+                SELECTOR_MISSES.labels(self.hub.name, 'статей').inc()
+                self.log.warning("Селектор %s не нашел статьи на странице %s", self.selectors.article_selector, self.hub.url)
                 return
 
-            tasks = [
-                self.fetch_article_data(urljoin(self.hub.url, link.get('href')), session)
-                for link in article_links if link.get('href')
-            ]
-            await asyncio.gather(*tasks)
+            urls = [urljoin(self.hub.url, href) for href in article_links]
+            new_urls = await self.known_urls.filter_new(urls)
+            POSTS.labels(self.hub.name, 'new').inc(len(new_urls))
+            POSTS.labels(self.hub.name, 'known').inc(len(urls) - len(new_urls))
+            self.log.info("Найдено %d ссылок, из них новых: %d", len(urls), len(new_urls))
 
-            await self.store_articles_bulk()
+            # Страница хаба запоминается после того, как ее статьи попали в очередь:
+            # при падении обхода они будут загружены из очереди, а не со страницы
+            await sync_to_async(self.frontier.enqueue)(new_urls)
+            await sync_to_async(self.http_cache.save)([self.hub.url])
         except Exception as e:
-            print(f"Ошибка при парсинге страницы хаба {self.hub.url}: {e}")
+            self.log.exception("Ошибка при парсинге страницы хаба %s: %s", self.hub.url, e)
 
-    async def fetch_article_data(self, url, session):
-        print(f"Запрашиваем статью: {url}...")
-        async with self.semaphore:
-            try:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        print(f"Статья {url} успешно загружена.")
-                        html_content = await response.text()
-                        await self.parse_article_page(url, html_content)
-                    else:
-                        print(f"Не удалось получить статью {url}: Код статуса {response.status}")
-            except Exception as e:
-                print(f"Ошибка при получении статьи {url}: {e}")
+    async def drain_frontier(self, session):
+        # Статьи забираются из очереди пачками до ее опустошения
+        started = timezone.now()
+        try:
+            while urls := await sync_to_async(self.frontier.claim)(settings.PARCER_FRONTIER_BATCH_SIZE, started):
+                self.log.info("Из очереди обхода получено %d статей", len(urls))
+                await self.http_cache.load(urls)
+                await self.run_pipeline(urls, session)
+        finally:
+            # Ссылки, оставшиеся без результата, возвращаются в очередь
+            await sync_to_async(self.frontier.release)()
+
+    async def recrawl_recent(self):
+        # Недавние статьи часто правят после публикации. Запросы условные,
+        # поэтому неизмененная статья обходится ответом 304.
+        cutoff = timezone.now() - timedelta(hours=settings.PARCER_RECRAWL_WINDOW)
+        urls = await sync_to_async(list)(
+            Post.objects.filter(hub=self.hub, publication_date__gte=cutoff)
+            .order_by('-publication_date').values_list('post_url', flat=True)
+        )
+        if not urls:
+            return
 
-    async def parse_article_page(self, url, html_content):
-        print(f"Парсим страницу: {url}")
+        self.log.info("Повторно проверяем %d недавних статей", len(urls))
+        await sync_to_async(self.frontier.enqueue)(urls, priority=CrawlURL.PRIORITY_RECRAWL, requeue=True)
 
-        if not html_content:
-            print(f"HTML контент пуст для страницы: {url}")
-            return
+    async def record_failed_url(self, url, status=None, error='', attempted=True):
+        await sync_to_async(self.frontier.fail)(url, status, error, attempted)
 
-        soup = BeautifulSoup(html_content, 'html.parser')
+    async def run_pipeline(self, urls, session, fetch=None):
+        # Загрузка -> парсинг -> сохранение пачками. Очереди ограничены,
+        # поэтому память не растет с числом ссылок на странице хаба.
+        # fetch заменяет загрузку из сети, например чтением из архива.
+        if fetch is None:
+            async def fetch(url):
+                return await self.fetch_article_data(url, session)
 
-        # Извлечение данных с использованием селекторов
-        try:
-            title_element = soup.select_one(self.selectors.title_selector)
-            title = title_element.get_text(strip=True).replace("\n", " ").strip() if title_element else None
-            if title is None:
-                raise ValueError("Заголовок не найден.")
-        except Exception as e:
-            print(f"Ошибка при извлечении заголовка на странице {url}: {e}")
-            title = "Без названия"
+        download_queue = asyncio.Queue(maxsize=settings.PARCER_QUEUE_SIZE)
+        parse_queue = asyncio.Queue(maxsize=settings.PARCER_QUEUE_SIZE)
+        store_queue = asyncio.Queue(maxsize=settings.PARCER_QUEUE_SIZE)
 
+        downloaders = [
+            asyncio.create_task(self.download_worker(download_queue, parse_queue, fetch))
+            for _ in range(settings.PARCER_DOWNLOAD_CONCURRENCY)
+        ]
+        parsers = [
+            asyncio.create_task(self.parse_worker(parse_queue, store_queue))
+            for _ in range(settings.PARCER_PARSE_CONCURRENCY)
+        ]
+        writer = asyncio.create_task(self.store_worker(store_queue))
+
+        async def feed():
+            for url in urls:
+                await download_queue.put(url)
+
+            # None в очереди означает конец работы для одного обработчика
+            for _ in downloaders:
+                await download_queue.put(None)
+            await asyncio.gather(*downloaders)
+
+            for _ in parsers:
+                await parse_queue.put(None)
+            await asyncio.gather(*parsers)
+
+            await store_queue.put(None)
+            await writer
+
+        # Ошибка любого этапа останавливает остальные: иначе загрузчики
+        # навсегда заблокируются на заполненной очереди
+        tasks = downloaders + parsers + [writer, asyncio.create_task(feed())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def download_worker(self, download_queue, parse_queue, fetch):
+        while (url := await download_queue.get()) is not None:
+            html_content = await fetch(url)
+            if html_content is not None:
+                await parse_queue.put((url, html_content))
+
+    async def parse_worker(self, parse_queue, store_queue):
+        while (item := await parse_queue.get()) is not None:
+            article = await self.parse_article_page(*item)
+            if article is not None:
+                await store_queue.put(article)
+
+    async def store_worker(self, store_queue):
+        batch = []
+        while True:
+            try:
+                article = await asyncio.wait_for(store_queue.get(), timeout=settings.PARCER_STORE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                # Новых статей давно не было: сохраняем то, что накопилось
+                await self.flush_batch(batch)
+                continue
+
+            if article is None:
+                break
+            batch.append(article)
+            if len(batch) >= settings.PARCER_STORE_BATCH_SIZE:
+                await self.flush_batch(batch)
+
+        await self.flush_batch(batch)
+
+    async def flush_batch(self, batch):
+        if not batch:
+            return
+        started = time.perf_counter()
         try:
-            author_element = soup.select_one(self.selectors.author_selector)
-            author = author_element.get_text(strip=True).replace("\n", " ").strip() if author_element else None
-            if author is None:
-                raise ValueError("Автор не найден.")
+            await self.store_articles_bulk(list(batch))
+        except (IntegrityError, DataError) as e:
+            # Одна некорректная статья откатывает всю пачку: сохраняем по одной,
+            # чтобы остальные не возвращались в очередь вместе с ней
+            self.log.warning("Пачка статей не сохранена, сохраняем по одной: %s", e)
+            await self.store_articles_one_by_one(batch)
         except Exception as e:
-            print(f"Ошибка при извлечении автора на странице {url}: {e}")
-            author = "Аноним"
+            self.log.exception("Ошибка при сохранении статей: %s", e)
+        elapsed = time.perf_counter() - started
+        self.store_time += elapsed
+        STORE_SECONDS.labels(self.hub.name).observe(elapsed)
+        batch.clear()
+
+    async def store_articles_one_by_one(self, articles):
+        for article in articles:
+            try:
+                await self.store_articles_bulk([article])
+            except (IntegrityError, DataError) as e:
+                # Попытка засчитывается, иначе статья выдавалась бы из очереди бесконечно
+                self.log.error("Не удалось сохранить статью %s: %s", article['post_url'], e)
+                await self.record_failed_url(article['post_url'], error=f"Ошибка при сохранении: {e}")
 
+    async def fetch_article_data(self, url, session):
+        self.log.debug("Запрашиваем статью: %s", url)
         try:
-            author_url_element = soup.select_one(self.selectors.author_url_selector)
-            author_url = author_url_element.get('href', '#') if author_url_element else "#"
-
-            if author_url == "#":
-                raise ValueError("URL автора не найден")
+            status, html_content = await self.request_page(url, session, get_host_limiter(url))
+            if status == 200:
+                self.log.debug("Статья %s успешно загружена", url)
+                if self.archive:
+                    await self.archive_page(url, html_content)
+                return html_content
+            elif status == 304:
+                self.log.debug("Статья %s не изменилась с прошлого запроса", url)
+                await sync_to_async(self.frontier.complete)([url])
+            else:
+                self.log.warning("Не удалось получить статью %s: код статуса %s", url, status)
+                await self.record_failed_url(url, status, f"Код статуса {status}")
+        except CircuitOpenError as e:
+            self.log.info("Статья %s отложена: %s", url, e)
+            await self.record_failed_url(url, error=str(e), attempted=False)
         except Exception as e:
-            print(f"Ошибка при извлечении URL автора на странице {url}: {e}")
-            author_url = "#"
+            self.log.warning("Ошибка при получении статьи %s: %s", url, e)
+            await self.record_failed_url(url, error=str(e))
+        return None
 
+    async def archive_page(self, url, html_content):
         try:
-            publication_date_element = soup.select_one(self.selectors.publication_date_selector)
-            publication_date = (
-                publication_date_element.get('datetime') if publication_date_element and publication_date_element.get('datetime') else
-                publication_date_element.get('title') if publication_date_element else None
-            )
-            if publication_date is None:
-                raise ValueError("Дата публикации не найдена.")
+            digest = await sync_to_async(self.archive.write, thread_sensitive=False)(html_content)
+            await sync_to_async(ArchivedPage.objects.create)(url=url, hub=self.hub, digest=digest)
         except Exception as e:
-            print(f"Ошибка при извлечении даты публикации на странице {url}: {e}")
-            publication_date = None
+            self.log.warning("Ошибка при сохранении статьи %s в архив: %s", url, e)
+
+    def archived_pages(self):
+        # Для каждой ссылки хаба берется последняя загруженная версия
+        pages = {}
+        queryset = ArchivedPage.objects.filter(hub=self.hub).order_by('url', '-fetched_at').values_list('url', 'digest')
+        for url, digest in queryset.iterator():
+            pages.setdefault(url, digest)
+        return pages
+
+    async def replay(self):
+        # Статьи разбираются заново из архива, без обращения к сети.
+        # Изменившиеся после исправления селекторов статьи обновляются по хэшу.
+        pages = await sync_to_async(self.archived_pages)()
+        if not pages:
+            self.log.info("В архиве нет статей хаба")
+            return
+
+        self.log.info("Разбираем %d статей из архива", len(pages))
+
+        async def read(url):
+            try:
+                return await sync_to_async(self.archive.read, thread_sensitive=False)(pages[url])
+            except OSError as e:
+                self.log.warning("Ошибка при чтении статьи %s из архива: %s", url, e)
+                return None
 
+        await self.run_pipeline(list(pages), None, fetch=read)
+
+    async def parse_article_page(self, url, html_content):
+        self.log.debug("Парсим страницу: %s", url)
+
+        if not html_content:
+            self.log.warning("HTML контент пуст для страницы: %s", url)
+            await self.record_failed_url(url, error="Пустая страница")
+            return None
+
+        started = time.perf_counter()
         try:
-            content_elements = soup.select_one(self.selectors.content_selector)
-            if content_elements:
-                tags = ['p', 'pre', 'code', 'blockquote', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
-                nested_content = "\n".join(
-                    element.get_text(strip=True) for element in content_elements.find_all(tags)
-                )
-
-                content = nested_content.strip() if nested_content.strip() else content_elements.get_text(strip=True)
-            else:
-                raise ValueError("Содержимое не найдено.")
+            article = await run_parser(extract_article, html_content, self.parse_selectors, executor=self.parse_executor)
         except Exception as e:
-            print(f"Ошибка при извлечении содержимого на странице {url}: {e}")
-            content = "Без содержания"
+            self.log.exception("Ошибка при парсинге страницы %s: %s", url, e)
+            await self.record_failed_url(url, error=f"Ошибка парсинга: {e}")
+            return None
+        finally:
+            elapsed = time.perf_counter() - started
+            self.parse_time += elapsed
+            PARSE_SECONDS.labels(self.hub.name, 'article').observe(elapsed)
 
-        # Добавление в список извлеченных статей
-        self.fetched_articles.append({
-            'title': title,
-            'author': author,
-            'author_url': author_url,
-            'publication_date': publication_date,
-            'post_url': url,
-            'content': content,
-        })
-
-        print(f"Статья успешно обработана: {title}")
+        for field, error in article.pop('errors'):
+            SELECTOR_MISSES.labels(self.hub.name, field).inc()
+            self.log.debug("Ошибка при извлечении %s на странице %s: %s", field, url, error)
 
+        article['post_url'] = url
+        self.processed_count += 1
 
+        self.log.debug("Статья успешно обработана: %s", article['title'])
+        return article
 
     @sync_to_async
     @transaction.atomic
-    def store_articles_bulk(self):
-        print(f"Сохранение {len(self.fetched_articles)} статей в базу данных...")
-        existing_urls = set(Post.objects.filter(hub=self.hub).values_list('post_url', flat=True))
+    def store_articles_bulk(self, articles):
+        self.log.debug("Сохранение %d статей в базу данных", len(articles))
+        urls = [article['post_url'] for article in articles]
 
-        unique_articles = [
-            article for article in self.fetched_articles if article['post_url'] not in existing_urls
-        ]
-
-        posts_to_create = [
+        posts = [
             Post(
                 hub=self.hub,
                 title=article['title'],
@@ -174,18 +469,63 @@ class ArticleFetcher:
                 author_url=article['author_url'],
                 post_url=article['post_url'],
                 publication_date=self._parse_publication_date(article['publication_date']),
-                content=article['content']
+                content_hash=article['content_hash']
             )
-            for article in unique_articles
+            for article in articles
         ]
 
-        if posts_to_create:
-            Post.objects.bulk_create(posts_to_create)
-            print(f"Добавлено {len(posts_to_create)} новых статей")
-        else:
-            print("Нет новых статей для добавления.")
-
-    def _parse_publication_date(self, publication_date):
+        # Статьи, уже сохраненные с другого хаба или параллельным обходом,
+        # пропускаются самой БД (ON CONFLICT DO NOTHING) и не откатывают пачку.
+        # Существующие строки перезаписываются, только если изменился хэш.
+        existing = {
+            post_url: (pk, content_hash)
+            for post_url, pk, content_hash in Post.objects.filter(post_url__in=urls).values_list('post_url', 'pk', 'content_hash')
+        }
+        new_posts = [post for post in posts if post.post_url not in existing]
+        changed_posts = []
+        for post in posts:
+            if post.post_url in existing and existing[post.post_url][1] != post.content_hash:
+                post.pk = existing[post.post_url][0]
+                changed_posts.append(post)
+
+        Post.objects.bulk_create(new_posts, batch_size=settings.PARCER_DB_BATCH_SIZE, ignore_conflicts=True)
+        if changed_posts:
+            Post.objects.bulk_update(changed_posts, POST_CONTENT_FIELDS, batch_size=settings.PARCER_DB_BATCH_SIZE)
+            self.updated_count += len(changed_posts)
+            POSTS.labels(self.hub.name, 'updated').inc(len(changed_posts))
+            self.log.info("Обновлено %d измененных статей", len(changed_posts))
+
+        # При ON CONFLICT DO NOTHING id не возвращаются: получаем их запросом
+        ids = dict(Post.objects.filter(post_url__in=urls).values_list('post_url', 'pk'))
+        created_count = len(ids) - len(existing)
+
+        # Тексты новых и измененных статей пишутся в отдельную таблицу
+        bodies = {article['post_url']: article['content'] for article in articles}
+        PostContent.objects.bulk_create(
+            [
+                PostContent.from_text(ids[post.post_url], bodies[post.post_url])
+                for post in new_posts + changed_posts if post.post_url in ids
+            ],
+            batch_size=settings.PARCER_DB_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['post'],
+            update_fields=['data', 'compression'],
+        )
+
+        self.known_urls.add(urls)
+        if created_count:
+            self.stored_count += created_count
+            POSTS.labels(self.hub.name, 'stored').inc(created_count)
+            self.log.info("Добавлено %d новых статей", created_count)
+        elif not changed_posts:
+            self.log.debug("Нет новых статей для добавления")
+
+        # Валидаторы сохраняются в той же транзакции, что и статьи
+        self.http_cache.save(urls)
+        self.frontier.complete(urls)
+
+    @staticmethod
+    def _parse_publication_date(publication_date):
         if publication_date:
             try:
                 publication_date_dt = timezone.datetime.fromisoformat(publication_date)
@@ -195,35 +535,105 @@ class ArticleFetcher:
         return timezone.now()
 
     async def output_results(self):
-        print(f"\nСтатьи хаба: {self.hub.name}")
-        for article in self.fetched_articles:
-            print(f"- {article['title']} (Автор: {article['author']}, Дата: {article['publication_date']}) [Ссылка: {article['post_url']}]")
+        self.log.info(
+            "Обработано статей: %d, добавлено в базу данных: %d, обновлено: %d",
+            self.processed_count, self.stored_count, self.updated_count,
+        )
 
 class Command(BaseCommand):
     help = 'Запрашивает данные со всех хабов и сохраняет их в базу данных'
 
-    async def fetch_all_hubs(self):
-        print("Запуск парсера для всех хабов...")
-        hubs = await sync_to_async(list)(Hub.objects.all())
+    def add_arguments(self, parser):
+        parser.add_argument('--recrawl', action='store_true', help='Повторно проверить недавно опубликованные статьи')
+        parser.add_argument('--replay', action='store_true', help='Разобрать статьи заново из архива HTML без загрузки')
+        parser.add_argument(
+            '--profile', action='store_true',
+            help='Профилировать обход и сохранить отчет в PARCER_PROFILE_DIR. '
+                 'Нужен yappi из req.txt, без него используется cProfile только для потока event loop'
+        )
+
+    async def fetch_all_hubs(self, session=None, recrawl=None, parse_executor=None):
+        logger.info("Запуск парсера для всех хабов")
+        return await self.fetch_hubs(session=session, recrawl=recrawl, parse_executor=parse_executor)
+
+    async def load_fetchers(self, hub_ids=None, recrawl=None, parse_executor=None):
+        # hub_ids ограничивает обход частью хабов (одна задача Celery на хаб или группу хабов)
+        hubs = Hub.objects.all()
+        if hub_ids is not None:
+            hubs = hubs.filter(pk__in=hub_ids)
+        hubs = await sync_to_async(list)(hubs)
+        known_urls = KnownUrlIndex()
         fetchers = []
 
         for hub in hubs:
-            fetcher = ArticleFetcher(hub, self)
+            fetcher = ArticleFetcher(hub, self, known_urls, recrawl, parse_executor)
             await fetcher.initialize()
             if fetcher.selectors:
                 fetchers.append(fetcher)
+        return fetchers
 
+    async def fetch_hubs(self, hub_ids=None, session=None, recrawl=None, parse_executor=None):
+        fetchers = await self.load_fetchers(hub_ids, recrawl, parse_executor)
         if not fetchers:
-            print("Нет доступных хабов для обработки")
-            return
+            logger.info("Нет доступных хабов для обработки")
+            return []
 
-        async with aiohttp.ClientSession() as session:
-            tasks = [fetcher.fetch_hub_page(session) for fetcher in fetchers]
-            await asyncio.gather(*tasks)
+        # Воркер Celery передает свою долгоживущую сессию с прогретыми соединениями
+        if session is not None:
+            await self.crawl_hubs(fetchers, session)
+        else:
+            async with create_session() as session:
+                await self.crawl_hubs(fetchers, session)
+
+        return [
+            {
+                'hub': fetcher.hub.name,
+                'processed': fetcher.processed_count,
+                'stored': fetcher.stored_count,
+                'updated': fetcher.updated_count,
+                'parse_time': fetcher.parse_time,
+                'store_time': fetcher.store_time,
+            }
+            for fetcher in fetchers if not fetcher.skipped
+        ]
 
-            for fetcher in fetchers:
+    async def crawl_hubs(self, fetchers, session):
+        tasks = [fetcher.crawl(session) for fetcher in fetchers]
+        await asyncio.gather(*tasks)
+
+        for fetcher in fetchers:
+            if not fetcher.skipped:
                 await fetcher.output_results()
 
+    async def replay_hubs(self, hub_ids=None):
+        fetchers = await self.load_fetchers(hub_ids)
+        if not fetchers:
+            logger.info("Нет доступных хабов для обработки")
+            return
+
+        await asyncio.gather(*(fetcher.replay() for fetcher in fetchers))
+        for fetcher in fetchers:
+            await fetcher.output_results()
+
     def handle(self, *args, **kwargs):
-        asyncio.run(self.fetch_all_hubs())
+        if kwargs.get('replay'):
+            if not settings.PARCER_ARCHIVE_DIR:
+                raise CommandError("Архив HTML не настроен: задайте PARCER_ARCHIVE_DIR")
+            try:
+                asyncio.run(self.replay_hubs())
+            finally:
+                shutdown_parse_executor()
+            print('Успешно!\n')
+            return
+
+        recrawl = kwargs.get('recrawl') or None
+        try:
+            if kwargs.get('profile'):
+                profiler = CrawlProfiler('fetch_articles')
+                asyncio.run(profiler.run(self.fetch_all_hubs, recrawl=recrawl, parse_executor=profiler.parse_executor))
+                print(f"Профиль: {profiler.stats_path}\nОтчет: {profiler.report_path}")
+            else:
+                asyncio.run(self.fetch_all_hubs(recrawl=recrawl))
+        finally:
+            shutdown_parse_executor()
         print('Успешно!\n')
\ No newline at end of file
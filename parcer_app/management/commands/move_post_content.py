@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from parcer_app.models import Post, PostContent
+
+BACKUP_TABLE = 'parcer_app_post_content_backup'
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит текст постов из старого столбца parcer_app_post.content в PostContent. '
+        'Запускается до makemigrations (копия столбца) и после migrate (перенос в PostContent)'
+    )
+
+    def handle(self, *args, **kwargs):
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+            post_table = Post._meta.db_table
+            columns = []
+            if post_table in tables:
+                columns = [column.name for column in connection.introspection.get_table_description(cursor, post_table)]
+
+        # Миграция удалит столбец content: до этого текст копируется в отдельную таблицу
+        if BACKUP_TABLE not in tables and 'content' in columns:
+            self.backup(post_table)
+            tables.append(BACKUP_TABLE)
+
+        if BACKUP_TABLE in tables and PostContent._meta.db_table in tables:
+            self.restore()
+
+    def backup(self, post_table):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {quote(BACKUP_TABLE)} AS "
+                f"SELECT id AS post_id, content FROM {quote(post_table)} "
+                f"WHERE content IS NOT NULL AND content <> ''"
+            )
+            cursor.execute(f"SELECT COUNT(*) FROM {quote(BACKUP_TABLE)}")
+            count = cursor.fetchone()[0]
+        print(f"Текст {count} постов скопирован в {BACKUP_TABLE}")
+
+    @transaction.atomic
+    def restore(self):
+        quote = connection.ops.quote_name
+        batch_size = settings.PARCER_DB_BATCH_SIZE
+        moved = 0
+        last_id = 0
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    f"SELECT post_id, content FROM {quote(BACKUP_TABLE)} "
+                    f"WHERE post_id > %s ORDER BY post_id LIMIT %s",
+                    [last_id, batch_size]
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                # Текст, уже записанный обходом в PostContent, не перезаписывается
+                ids = [post_id for post_id, _ in rows]
+                existing = set(Post.objects.filter(pk__in=ids).values_list('pk', flat=True))
+                stored = set(PostContent.objects.filter(post_id__in=ids).values_list('post_id', flat=True))
+                bodies = [
+                    PostContent.from_text(post_id, text) for post_id, text in rows
+                    if post_id in existing and post_id not in stored
+                ]
+                PostContent.objects.bulk_create(bodies, ignore_conflicts=True)
+                moved += len(bodies)
+
+            cursor.execute(f"DROP TABLE {quote(BACKUP_TABLE)}")
+        print(f"Текст {moved} постов перенесен в PostContent")
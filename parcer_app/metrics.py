@@ -0,0 +1,92 @@
+import logging
+import os
+import socket
+import time
+import aiohttp
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, delete_from_gateway, multiprocess, push_to_gateway
+
+logger = logging.getLogger(__name__)
+
+# Метрики обхода по этапам: сеть, разбор, запись в БД.
+# page - 'hub' для страницы хаба и 'article' для статьи.
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576, 4194304)
+
+FETCH_SECONDS = Histogram('parcer_fetch_seconds', 'Время загрузки страницы', ['hub', 'page'])
+RESPONSE_BYTES = Histogram('parcer_response_bytes', 'Размер тела ответа', ['hub', 'page'], buckets=SIZE_BUCKETS)
+RESPONSES = Counter('parcer_responses', 'Ответы по статусам, error - сетевая ошибка или таймаут', ['hub', 'page', 'status'])
+DNS_SECONDS = Histogram('parcer_dns_seconds', 'Время разрешения имени хоста', ['host'])
+CONNECT_SECONDS = Histogram('parcer_connect_seconds', 'Время установки нового соединения', ['host'])
+PARSE_SECONDS = Histogram('parcer_parse_seconds', 'Время разбора страницы', ['hub', 'page'])
+STORE_SECONDS = Histogram('parcer_store_batch_seconds', 'Время записи пачки статей в БД', ['hub'])
+POSTS = Counter('parcer_posts', 'Ссылки на статьи: new и known на странице хаба, stored и updated в БД', ['hub', 'result'])
+SELECTOR_MISSES = Counter('parcer_selector_misses', 'Поля, не найденные селекторами', ['hub', 'field'])
+
+
+def trace_config():
+    # DNS и установка соединения замеряются хуками aiohttp
+    config = aiohttp.TraceConfig()
+
+    async def on_dns_start(session, context, params):
+        context.dns_started = time.perf_counter()
+
+    async def on_dns_end(session, context, params):
+        DNS_SECONDS.labels(params.host).observe(time.perf_counter() - context.dns_started)
+
+    async def on_connect_start(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def on_connect_end(session, context, params):
+        CONNECT_SECONDS.labels(context.host).observe(time.perf_counter() - context.connect_started)
+
+    async def on_request_start(session, context, params):
+        context.host = params.url.host or ''
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_start)
+    config.on_dns_resolvehost_end.append(on_dns_end)
+    config.on_connection_create_start.append(on_connect_start)
+    config.on_connection_create_end.append(on_connect_end)
+    return config
+
+
+def get_registry():
+    # При PROMETHEUS_MULTIPROC_DIR метрики всех процессов (веб, воркеры Celery
+    # на этой машине) пишутся в общий каталог и собираются вместе
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def grouping_key():
+    # Сумма по всем процессам машины отправляется под общим ключом машины:
+    # каждая отправка заменяет группу целиком, и значения не повторяются.
+    # Без общего каталога процесс отправляет только свои метрики под своим ключом.
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return {'instance': socket.gethostname()}
+    return {'instance': f'{socket.gethostname()}-{os.getpid()}'}
+
+
+def push_metrics():
+    # Воркеры на других машинах отправляют метрики в Pushgateway
+    gateway = settings.PARCER_METRICS_PUSHGATEWAY
+    if not gateway:
+        return
+    try:
+        push_to_gateway(gateway, job='parcer', registry=get_registry(), grouping_key=grouping_key())
+    except OSError as e:
+        logger.warning("Ошибка при отправке метрик в %s: %s", gateway, e)
+
+
+def delete_metrics():
+    # Группа процесса удаляется при его завершении, иначе в Pushgateway
+    # навсегда остались бы метрики завершенных процессов
+    gateway = settings.PARCER_METRICS_PUSHGATEWAY
+    if not gateway or os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return
+    try:
+        delete_from_gateway(gateway, job='parcer', grouping_key=grouping_key())
+    except OSError as e:
+        logger.warning("Ошибка при удалении метрик из %s: %s", gateway, e)
@@ -1,5 +1,13 @@
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
+from parcer_app.compression import COMPRESSION_CHOICES, compress, decompress
+
+PARSER_ENGINE_CHOICES = (
+    ('', 'По умолчанию'),
+    ('bs4', 'BeautifulSoup (html.parser)'),
+    ('lxml', 'lxml + cssselect'),
+)
 
 
 class Hub(models.Model):
@@ -22,6 +30,39 @@ class Hub(models.Model):
         null=True,
         blank=True
     )
+    parser_engine = models.CharField(
+        max_length=16,
+        choices=PARSER_ENGINE_CHOICES,
+        help_text='Движок извлечения данных (по умолчанию из настроек)',
+        verbose_name='Движок парсинга',
+        null=False,
+        blank=True,
+        default=''
+    )
+    concurrency_limit = models.FloatField(
+        help_text='Число одновременных запросов к хосту, подобранное при прошлом обходе',
+        verbose_name='Лимит одновременных запросов',
+        null=True,
+        blank=True
+    )
+    fetch_interval = models.FloatField(
+        help_text='Интервал между обходами в минутах, подбирается по числу новых статей',
+        verbose_name='Интервал обхода, мин',
+        null=True,
+        blank=True
+    )
+    next_fetch_at = models.DateTimeField(
+        help_text='Время следующего обхода',
+        verbose_name='Следующий обход',
+        null=True,
+        blank=True
+    )
+    last_new_posts = models.PositiveIntegerField(
+        help_text='Число новых статей, найденных при последнем обходе',
+        verbose_name='Новых статей при последнем обходе',
+        null=True,
+        blank=True
+    )
 
     class Meta:
         verbose_name = 'Хаб'
@@ -132,11 +173,13 @@ class Post(models.Model):
         null=True,
         blank=True
     )
-    content = models.TextField(
-        help_text='Содержание поста',
-        verbose_name='Содержание поста',
+    content_hash = models.CharField(
+        max_length=64,
+        help_text='SHA-256 сохраненных полей поста для обнаружения изменений',
+        verbose_name='Хэш содержимого',
         null=False,
-        blank=False
+        blank=True,
+        default=''
     )
     hub = models.ForeignKey(
         Hub,
@@ -158,9 +201,294 @@ class Post(models.Model):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-publication_date',)
+        # Список в админке и выборки потребителей: посты хаба по дате,
+        # общая лента по дате, новые посты по времени добавления. Поиск автора
+        # в админке идет по подстроке (icontains): B-tree индекс его
+        # не обслуживает, для него нужен pg_trgm.
+        indexes = [
+            models.Index(fields=['hub', '-publication_date'], name='post_hub_pub_date_idx'),
+            models.Index(fields=['-publication_date'], name='post_pub_date_idx'),
+            models.Index(fields=['created_at'], name='post_created_at_idx'),
+        ]
 
     def __str__(self):
         return self.title
     
     def __repr__(self):
         return f"<{self.__class__.__name__}(id={self.id}, title='{self.title}')>"
+
+    # Текст поста хранится в PostContent и загружается отдельным запросом
+    # только при обращении, поэтому выборки постов остаются узкими
+    @property
+    def content(self):
+        if '_pending_content' in self.__dict__:
+            return self._pending_content
+        try:
+            return self.body.text
+        except PostContent.DoesNotExist:
+            return ''
+
+    @content.setter
+    def content(self, text):
+        self._pending_content = text
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if '_pending_content' in self.__dict__:
+            body = PostContent.from_text(self.pk, self.__dict__.pop('_pending_content'))
+            body.save()
+            self.body = body
+
+class PageValidator(models.Model):
+    url = models.URLField(
+        unique=True,
+        help_text='Ссылка на страницу',
+        verbose_name='Ссылка на страницу',
+        null=False,
+        blank=False
+    )
+    etag = models.CharField(
+        max_length=255,
+        help_text='Значение заголовка ETag',
+        verbose_name='ETag',
+        null=True,
+        blank=True
+    )
+    last_modified = models.CharField(
+        max_length=255,
+        help_text='Значение заголовка Last-Modified',
+        verbose_name='Last-Modified',
+        null=True,
+        blank=True
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text='Время обновления',
+        verbose_name='Время обновления',
+        null=False,
+        blank=False
+    )
+
+    class Meta:
+        verbose_name = 'Валидатор страницы'
+        verbose_name_plural = 'Валидаторы страниц'
+        ordering = ('url',)
+
+    def __str__(self):
+        return self.url
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(id={self.id}, url='{self.url}')>"
+
+class CrawlURL(models.Model):
+    # Очередь обхода (frontier): ссылки на статьи хранятся в БД, поэтому
+    # обход, прерванный падением воркера или лимитом времени задачи,
+    # продолжается со следующего запуска, а загруженное не запрашивается снова
+    PENDING = 'pending'
+    LEASED = 'leased'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает загрузки'),
+        (LEASED, 'Загружается'),
+        (DONE, 'Обработана'),
+        (FAILED, 'Не загружена'),
+    )
+
+    # Новые ссылки со страницы хаба обходятся раньше повторных проверок
+    PRIORITY_NEW = 10
+    PRIORITY_RECRAWL = 0
+
+    url = models.URLField(
+        unique=True,
+        help_text='Ссылка на статью',
+        verbose_name='Ссылка на статью',
+        null=False,
+        blank=False
+    )
+    hub = models.ForeignKey(
+        Hub,
+        on_delete=models.CASCADE,
+        help_text='Хаб',
+        verbose_name='Хаб',
+        related_name='crawl_urls',
+        null=False,
+        blank=False
+    )
+    priority = models.IntegerField(
+        default=PRIORITY_NEW,
+        help_text='Ссылки с большим приоритетом выдаются раньше',
+        verbose_name='Приоритет',
+        null=False,
+        blank=False
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        help_text='Состояние ссылки в очереди обхода',
+        verbose_name='Статус',
+        null=False,
+        blank=False
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text='Число неудачных попыток загрузки',
+        verbose_name='Число попыток',
+        null=False,
+        blank=False
+    )
+    lease_owner = models.CharField(
+        max_length=128,
+        help_text='Процесс, который загружает ссылку',
+        verbose_name='Владелец аренды',
+        null=False,
+        blank=True,
+        default=''
+    )
+    leased_until = models.DateTimeField(
+        help_text='После этого времени ссылку может забрать другой процесс',
+        verbose_name='Аренда до',
+        null=True,
+        blank=True
+    )
+    available_at = models.DateTimeField(
+        help_text='Ссылка выдается обходам, начатым после этого времени (пусто - сразу)',
+        verbose_name='Доступна с',
+        null=True,
+        blank=True
+    )
+    last_status = models.PositiveIntegerField(
+        help_text='Код статуса последнего неудачного ответа',
+        verbose_name='Последний статус',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField(
+        help_text='Текст последней ошибки',
+        verbose_name='Последняя ошибка',
+        null=False,
+        blank=True,
+        default=''
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Время добавления в очередь',
+        verbose_name='Время добавления',
+        null=False,
+        blank=False
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text='Время последнего изменения',
+        verbose_name='Время изменения',
+        null=False,
+        blank=False
+    )
+
+    class Meta:
+        verbose_name = 'Ссылка в очереди обхода'
+        verbose_name_plural = 'Очередь обхода'
+        ordering = ('-priority', 'id')
+        indexes = [
+            # Выдача пачки: ожидающие ссылки хаба по приоритету и порядку добавления
+            models.Index(fields=['hub', 'status', '-priority', 'id'], name='crawl_url_claim_idx'),
+        ]
+
+    def __str__(self):
+        return self.url
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(id={self.id}, url='{self.url}', status='{self.status}')>"
+
+class PostContent(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='body',
+        help_text='Пост',
+        verbose_name='Пост',
+        null=False,
+        blank=False
+    )
+    data = models.BinaryField(
+        help_text='Текст поста, сжатый способом из поля compression',
+        verbose_name='Содержание поста',
+        null=False,
+        blank=False
+    )
+    compression = models.CharField(
+        max_length=8,
+        choices=COMPRESSION_CHOICES,
+        help_text='Способ сжатия текста',
+        verbose_name='Сжатие',
+        null=False,
+        blank=True,
+        default=''
+    )
+
+    class Meta:
+        verbose_name = 'Содержание поста'
+        verbose_name_plural = 'Содержание постов'
+
+    def __str__(self):
+        return str(self.post_id)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(post_id={self.post_id}, compression='{self.compression}')>"
+
+    @classmethod
+    def from_text(cls, post_id, text):
+        method = settings.PARCER_CONTENT_COMPRESSION
+        return cls(post_id=post_id, data=compress(text, method), compression=method)
+
+    @property
+    def text(self):
+        return decompress(self.data, self.compression)
+
+class ArchivedPage(models.Model):
+    url = models.URLField(
+        help_text='Ссылка на страницу',
+        verbose_name='Ссылка на страницу',
+        null=False,
+        blank=False
+    )
+    hub = models.ForeignKey(
+        Hub,
+        on_delete=models.CASCADE,
+        help_text='Хаб',
+        verbose_name='Хаб',
+        related_name='archived_pages',
+        null=False,
+        blank=False
+    )
+    digest = models.CharField(
+        max_length=64,
+        help_text='SHA-256 HTML страницы, имя файла в архиве',
+        verbose_name='Хэш страницы',
+        null=False,
+        blank=False
+    )
+    fetched_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Время загрузки',
+        verbose_name='Время загрузки',
+        null=False,
+        blank=False
+    )
+
+    class Meta:
+        verbose_name = 'Архивная страница'
+        verbose_name_plural = 'Архивные страницы'
+        ordering = ('-fetched_at',)
+        indexes = [
+            models.Index(fields=['url', '-fetched_at'], name='archive_url_fetched_idx'),
+            models.Index(fields=['hub', 'url'], name='archive_hub_url_idx'),
+        ]
+
+    def __str__(self):
+        return self.url
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(id={self.id}, url='{self.url}')>"
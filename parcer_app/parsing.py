@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from parcer_app.engines import get_engine
+
+SELECTOR_FIELDS = (
+    'article_selector', 'title_selector', 'author_selector',
+    'author_url_selector', 'publication_date_selector', 'content_selector',
+)
+
+# Границы этих тегов разделяют текст содержимого на строки.
+# <code> строчный: внутри абзаца он не должен разрывать текст.
+BLOCK_TAGS = {
+    'p', 'pre', 'blockquote', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'table', 'tr', 'td', 'th',
+    'section', 'article', 'header', 'footer', 'figure', 'figcaption', 'br', 'hr',
+}
+
+# Пулы для парсинга по типу: process или thread
+logger = logging.getLogger(__name__)
+
+_executors = {}
+
+
+def selectors_to_dict(selectors, engine=None):
+    # В пул процессов передаются только строки селекторов, а не модель
+    data = {field: getattr(selectors, field) for field in SELECTOR_FIELDS}
+    data['engine'] = engine or settings.PARCER_PARSER_ENGINE
+    return data
+
+
+ARTICLE_FIELDS = (
+    'title_selector', 'author_selector', 'author_url_selector',
+    'publication_date_selector', 'content_selector',
+)
+
+
+class Extractor:
+    def __init__(self, selectors):
+        self.engine = get_engine(selectors['engine'])
+        self.selectors = selectors
+
+        # Каждый уникальный селектор компилируется один раз на хаб
+        self.patterns = {}
+        self.compile_errors = {}
+        for field in SELECTOR_FIELDS:
+            selector = selectors[field]
+            if selector in self.patterns or selector in self.compile_errors:
+                continue
+            try:
+                self.patterns[selector] = self.engine.compile(selector)
+            except Exception as e:
+                self.compile_errors[selector] = str(e)
+
+        article_selectors = [selectors[field] for field in ARTICLE_FIELDS]
+        self.links_only = self._strainer([selectors['article_selector']])
+        self.article_only = self._strainer(article_selectors)
+
+    def _strainer(self, selectors):
+        if any(selector in self.compile_errors for selector in selectors):
+            return None
+        return self.engine.strainer(selectors)
+
+    def links(self, html_content):
+        selector = self.selectors['article_selector']
+        if selector not in self.patterns:
+            raise ValueError(self.compile_errors[selector])
+
+        document = self.engine.parse(html_content, self.links_only)
+        hrefs = (self.engine.attr(link, 'href') for link in self.engine.select(document, self.patterns[selector]))
+        return [href for href in hrefs if href]
+
+    def article(self, html_content):
+        engine = self.engine
+        document = engine.parse(html_content, self.article_only)
+        wanted = {
+            self.selectors[field]: self.patterns[self.selectors[field]]
+            for field in ARTICLE_FIELDS if self.selectors[field] in self.patterns
+        }
+        elements = engine.first_matches(document, wanted)
+        errors = []
+
+        def element(field):
+            selector = self.selectors[field]
+            if selector in self.compile_errors:
+                raise ValueError(self.compile_errors[selector])
+            return elements.get(selector)
+
+        # Извлечение данных с использованием селекторов
+        try:
+            title_element = element('title_selector')
+            title = engine.text(title_element).replace("\n", " ").strip() if title_element is not None else None
+            if title is None:
+                raise ValueError("Заголовок не найден.")
+        except Exception as e:
+            errors.append(('заголовка', str(e)))
+            title = "Без названия"
+
+        try:
+            author_element = element('author_selector')
+            author = engine.text(author_element).replace("\n", " ").strip() if author_element is not None else None
+            if author is None:
+                raise ValueError("Автор не найден.")
+        except Exception as e:
+            errors.append(('автора', str(e)))
+            author = "Аноним"
+
+        try:
+            author_url_element = element('author_url_selector')
+            author_url = engine.attr(author_url_element, 'href', '#') if author_url_element is not None else "#"
+
+            if author_url == "#":
+                raise ValueError("URL автора не найден")
+        except Exception as e:
+            errors.append(('URL автора', str(e)))
+            author_url = "#"
+
+        try:
+            publication_date_element = element('publication_date_selector')
+            publication_date = (
+                engine.attr(publication_date_element, 'datetime') if publication_date_element is not None and engine.attr(publication_date_element, 'datetime') else
+                engine.attr(publication_date_element, 'title') if publication_date_element is not None else None
+            )
+            if publication_date is None:
+                raise ValueError("Дата публикации не найдена.")
+        except Exception as e:
+            errors.append(('даты публикации', str(e)))
+            publication_date = None
+
+        try:
+            content_elements = element('content_selector')
+            if content_elements is not None:
+                content = serialize_content(engine, content_elements)
+            else:
+                raise ValueError("Содержимое не найдено.")
+        except Exception as e:
+            errors.append(('содержимого', str(e)))
+            content = "Без содержания"
+
+        article = {
+            'title': title,
+            'author': author,
+            'author_url': author_url,
+            'publication_date': publication_date,
+            'content': content,
+            'errors': errors,
+        }
+        article['content_hash'] = content_hash(article)
+        return article
+
+
+def content_hash(article):
+    # Отпечаток сохраняемых полей статьи: по нему видно, изменилась ли она
+    fields = (article[key] or '' for key in ('title', 'author', 'author_url', 'publication_date', 'content'))
+    return hashlib.sha256('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
+
+def _flush(parts, lines, preformatted):
+    text = ''.join(parts)
+    parts.clear()
+
+    # В <pre> сохраняется исходное форматирование, в остальных блоках пробелы схлопываются
+    text = text.strip('\n').rstrip() if preformatted else ' '.join(text.split())
+    if text.strip():
+        lines.append(text)
+
+
+def serialize_content(engine, element):
+    # Один проход по поддереву: каждый текстовый узел попадает в результат
+    # ровно один раз, а границы блочных тегов становятся переводами строк
+    lines = []
+    parts = []
+    pre_depth = 0
+
+    for event, value in engine.walk(element):
+        if event == 'text':
+            parts.append(value)
+        elif value == 'pre':
+            if event == 'start':
+                if not pre_depth:
+                    _flush(parts, lines, False)
+                pre_depth += 1
+            else:
+                pre_depth -= 1
+                if not pre_depth:
+                    _flush(parts, lines, True)
+        elif not pre_depth and value in BLOCK_TAGS:
+            _flush(parts, lines, False)
+
+    _flush(parts, lines, False)
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=128)
+def _get_extractor(key):
+    return Extractor(dict(key))
+
+
+def get_extractor(selectors):
+    # Экстрактор кэшируется в каждом процессе пула по набору селекторов хаба
+    return _get_extractor(tuple(sorted(selectors.items())))
+
+
+def extract_links(html_content, selectors):
+    return get_extractor(selectors).links(html_content)
+
+
+def extract_article(html_content, selectors):
+    return get_extractor(selectors).article(html_content)
+
+
+def get_parse_executor(kind=None):
+    # kind задает тип пула явно, иначе берется PARCER_PARSE_EXECUTOR
+    kind = kind or settings.PARCER_PARSE_EXECUTOR
+    if kind not in _executors:
+        workers = settings.PARCER_PARSE_WORKERS or None
+        # Дочерний процесс prefork-воркера Celery не может порождать процессы
+        if kind == 'process' and multiprocessing.current_process().daemon:
+            logger.warning(
+                "Процесс %s демонический, пул процессов для парсинга недоступен: "
+                "парсинг идет в потоках. Запустите воркер с пулом threads",
+                multiprocessing.current_process().name
+            )
+            _executors[kind] = get_parse_executor('thread')
+        elif kind == 'process':
+            _executors[kind] = ProcessPoolExecutor(max_workers=workers)
+        elif kind == 'thread':
+            _executors[kind] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='parcer-parse')
+        else:
+            raise ImproperlyConfigured(f"Неизвестный тип пула для парсинга: {kind}")
+    return _executors[kind]
+
+
+def shutdown_parse_executor():
+    executors = set(_executors.values())
+    _executors.clear()
+    for executor in executors:
+        executor.shutdown()
+
+
+async def run_parser(func, *args, executor=None):
+    # Парсинг выполняется вне event loop, чтобы не блокировать загрузки
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_executor(executor), func, *args)
@@ -0,0 +1,154 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TOP_FUNCTIONS = 40
+TOP_QUERIES = 20
+
+
+def _yappi():
+    try:
+        import yappi
+    except ImportError:
+        return None
+    return yappi
+
+
+# Учет запросов к БД: число и суммарное время по тексту SQL
+class QueryRecorder:
+    def __init__(self):
+        self.queries = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats = self.queries[sql]
+            stats[0] += 1
+            stats[1] += time.perf_counter() - started
+
+    def install(self):
+        connection.execute_wrappers.append(self)
+
+    def remove(self):
+        if self in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self)
+
+    @property
+    def count(self):
+        return sum(count for count, _ in self.queries.values())
+
+    @property
+    def total_time(self):
+        return sum(elapsed for _, elapsed in self.queries.values())
+
+
+# Профилирование одного обхода. С yappi (есть в req.txt) замеряется
+# время по часам с учетом корутин и потоков sync_to_async, без него -
+# cProfile только для потока event loop. Функции парсера попадают
+# в профиль, только если обход передан parse_executor='thread'.
+# Результат: .pstats (snakeviz, flameprof, gprof2dot) и текстовый отчет .txt.
+class CrawlProfiler:
+    # Тип пула для парсинга, который вызывающий передает профилируемому обходу
+    parse_executor = 'thread'
+
+    def __init__(self, name, output_dir=None):
+        self.name = name
+        self.output_dir = output_dir or settings.PARCER_PROFILE_DIR
+        self.queries = QueryRecorder()
+        self.yappi = _yappi()
+        if self.yappi is None:
+            logger.warning(
+                "yappi не установлен (см. req.txt): профиль снимается cProfile "
+                "только для потока event loop, без корутин и потоков sync_to_async"
+            )
+        self.profile = None
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.stats_path = None
+        self.report_path = None
+
+    async def run(self, func, *args, **kwargs):
+        # Запросы ORM выполняются в общем потоке sync_to_async: обертка ставится там же
+        await sync_to_async(self.queries.install)()
+        result = None
+        try:
+            self.start()
+            try:
+                result = await func(*args, **kwargs)
+                return result
+            finally:
+                self.stop()
+        finally:
+            await sync_to_async(self.queries.remove)()
+            # Отчет сохраняется и для прерванного обхода
+            self.save(result)
+
+    def start(self):
+        self.wall_started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        if self.yappi:
+            self.yappi.clear_stats()
+            self.yappi.set_clock_type('wall')
+            self.yappi.start(builtins=False, profile_threads=True)
+        else:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        if self.yappi:
+            self.yappi.stop()
+        else:
+            self.profile.disable()
+        self.wall_time = time.perf_counter() - self.wall_started
+        self.cpu_time = time.process_time() - self.cpu_started
+
+    def save(self, results=None):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.name}-{timezone.now():%Y%m%d-%H%M%S}-{os.getpid()}")
+        self.stats_path = f'{base}.pstats'
+        self.report_path = f'{base}.txt'
+
+        if self.yappi:
+            self.yappi.get_func_stats().save(self.stats_path, type='pstat')
+            self.yappi.clear_stats()
+        else:
+            self.profile.dump_stats(self.stats_path)
+
+        with open(self.report_path, 'w', encoding='utf-8') as report:
+            report.write(self.report(results))
+        logger.info("Профиль обхода сохранен: %s, отчет: %s", self.stats_path, self.report_path)
+
+    def report(self, results=None):
+        lines = [
+            f"Профиль обхода {self.name} ({'yappi, часы' if self.yappi else 'cProfile, только поток event loop'})",
+            f"Время обхода: {self.wall_time:.2f} с, процессорное время: {self.cpu_time:.2f} с",
+            f"Запросов к БД: {self.queries.count}, время: {self.queries.total_time:.2f} с",
+        ]
+        for result in results or []:
+            lines.append(
+                f"- {result['hub']}: обработано {result['processed']}, "
+                f"разбор {result['parse_time']:.2f} с, запись в БД {result['store_time']:.2f} с"
+            )
+
+        lines.append(f"\nСамые долгие запросы к БД (первые {TOP_QUERIES}):")
+        ordered = sorted(self.queries.queries.items(), key=lambda item: item[1][1], reverse=True)
+        for sql, (count, elapsed) in ordered[:TOP_QUERIES]:
+            lines.append(f"{elapsed:>9.3f} с {count:>6} раз  {sql[:200]}")
+
+        stream = io.StringIO()
+        pstats.Stats(self.stats_path, stream=stream).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        lines.append(f"\nФункции по суммарному времени (первые {TOP_FUNCTIONS}):")
+        lines.append(stream.getvalue())
+        return '\n'.join(lines)
@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.utils import timezone
+
+# Статусы, при которых запрос имеет смысл повторить
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def parse_retry_after(value):
+    # Retry-After бывает числом секунд или HTTP-датой
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, (retry_at - timezone.now()).total_seconds())
+
+
+def retry_delay(attempt, retry_after=None):
+    # Экспоненциальная задержка с полным джиттером, но не меньше Retry-After
+    backoff = min(settings.PARCER_RETRY_MAX_DELAY, settings.PARCER_RETRY_BASE_DELAY * 2 ** attempt)
+    delay = random.uniform(0, backoff)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+# Предохранитель для хоста: после серии неудач запросы к хосту не
+# отправляются до истечения таймаута, затем пропускается один пробный
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, host, failure_threshold, reset_timeout):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        # Пробный запрос в полуоткрытом состоянии: None или метка владельца
+        self.trial = None
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        # None - запрос не пропускается, иначе метка запроса
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() < self.opened_until:
+                    return None
+                self.state = self.HALF_OPEN
+                self.trial = None
+            if self.trial is not None:
+                return None
+            self.trial = object()
+            return self.trial
+
+    @contextmanager
+    def request(self):
+        # Пробный запрос, отмененный или упавший без записи результата,
+        # освобождает пробу, иначе хост остался бы заблокирован до перезапуска
+        token = self._acquire()
+        if token is None:
+            raise CircuitOpenError(f"Хост {self.host} временно недоступен")
+        try:
+            yield
+        finally:
+            with self.lock:
+                if self.trial is token:
+                    self.trial = None
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open(self.reset_timeout)
+
+    def trip(self, seconds):
+        # Хост сам попросил подождать (Retry-After)
+        with self.lock:
+            self._open(max(seconds, self.reset_timeout))
+
+    def _open(self, seconds):
+        self.state = self.OPEN
+        self.opened_until = time.monotonic() + seconds
+        self.trial = None
+
+
+# Предохранители общие для всего процесса, независимо от event loop
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url):
+    host = urlsplit(url).hostname or ''
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(
+                host,
+                settings.PARCER_CIRCUIT_FAILURE_THRESHOLD,
+                settings.PARCER_CIRCUIT_RESET_TIMEOUT,
+            )
+        return _breakers[host]
+
+
+def reset_circuit_breakers():
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from parcer_app.http_client import create_session
+from parcer_app.parsing import shutdown_parse_executor
+
+
+# Асинхронная среда процесса воркера: один event loop в фоновом потоке и одна
+# HTTP-сессия на все задачи. Соединения, кэш DNS и лимиты хостов
+# переживают задачу и используются следующими обходами.
+class AsyncRuntime:
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.session = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever, name='parcer-runtime', daemon=True)
+            self.thread.start()
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        # func - корутинная функция, сессия передается ей аргументом session.
+        # timeout ограничивает задачу там, где пул Celery не поддерживает
+        # time_limit (пул threads)
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._call(func, *args, **kwargs), self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Например, SoftTimeLimitExceeded или TimeoutError: задача в loop тоже отменяется
+            future.cancel()
+            raise
+
+    async def _call(self, func, *args, **kwargs):
+        try:
+            return await func(*args, session=await self.get_session(), **kwargs)
+        finally:
+            # Соединение с БД в потоке sync_to_async живет между задачами
+            await sync_to_async(close_old_connections)()
+
+    async def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = create_session()
+        return self.session
+
+    def stop(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            if self.session is not None:
+                asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+                self.session = None
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+        shutdown_parse_executor()
+
+
+runtime = AsyncRuntime()
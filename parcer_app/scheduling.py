@@ -0,0 +1,27 @@
+from datetime import timedelta
+from django.conf import settings
+
+# Вес нового наблюдения при сглаживании интервала
+SMOOTHING = 0.5
+
+
+def next_fetch_interval(current, last_fetched, new_posts, now):
+    # Интервал обхода в минутах подбирается так, чтобы за один обход
+    # находилось около PARCER_TARGET_NEW_POSTS новых статей
+    current = current or settings.PARCER_FETCH_INTERVAL_DEFAULT
+
+    if not new_posts:
+        # Ничего нового: хаб обходится все реже
+        interval = current * settings.PARCER_FETCH_BACKOFF
+    elif last_fetched is None:
+        interval = current
+    else:
+        elapsed = max((now - last_fetched).total_seconds() / 60, 1)
+        estimate = elapsed * settings.PARCER_TARGET_NEW_POSTS / new_posts
+        interval = SMOOTHING * estimate + (1 - SMOOTHING) * current
+
+    return min(max(interval, settings.PARCER_FETCH_INTERVAL_MIN), settings.PARCER_FETCH_INTERVAL_MAX)
+
+
+def next_fetch_at(interval, now):
+    return now + timedelta(minutes=interval)
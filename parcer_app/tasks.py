@@ -1,15 +1,121 @@
+import logging
 from celery import shared_task
 from .management.commands.fetch_articles import Command
-from celery import current_app
-import asyncio
+from .metrics import delete_metrics, push_metrics
+from .models import Hub
+from .profiling import CrawlProfiler
+from .runtime import runtime
+from celery import chord
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+@worker_process_init.connect
+def start_runtime(**kwargs):
+    runtime.start()
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_runtime(**kwargs):
+    runtime.stop()
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def remove_pushed_metrics(**kwargs):
+    delete_metrics()
+
+def run_crawl(name, func, *args, profile=False, **kwargs):
+    # profile=True сохраняет профиль обхода в PARCER_PROFILE_DIR
+    if profile:
+        profiler = CrawlProfiler(name)
+        return runtime.run(profiler.run, func, *args, parse_executor=profiler.parse_executor, **kwargs)
+    return runtime.run(func, *args, **kwargs)
 
 @shared_task
-def fetch_articles():
-    print("Запуск парсера для всех хабов...")
+def fetch_articles(profile=False):
+    logger.info("Запуск парсера для всех хабов")
     fetch_command = Command()
-    asyncio.run(fetch_command.fetch_all_hubs())
-    print("Успешно!")
+    try:
+        run_crawl('fetch_articles', fetch_command.fetch_all_hubs, profile=profile)
+    finally:
+        push_metrics()
+    logger.info("Обход всех хабов завершен")
+
+@shared_task(
+    soft_time_limit=settings.PARCER_HUB_TASK_SOFT_TIME_LIMIT,
+    time_limit=settings.PARCER_HUB_TASK_TIME_LIMIT,
+)
+def fetch_hubs(hub_ids, recrawl=None, profile=False):
+    logger.info("Запуск парсера для хабов %s", hub_ids)
+    try:
+        # В пуле threads time_limit задачи не действует, обход ограничивается в runtime
+        return run_crawl(
+            'fetch_hubs', Command().fetch_hubs, hub_ids, recrawl=recrawl, profile=profile,
+            timeout=settings.PARCER_HUB_TASK_SOFT_TIME_LIMIT,
+        )
+    finally:
+        push_metrics()
+
+@shared_task
+def report_fetching(results):
+    stats = [item for result in results for item in result or []]
+    processed = sum(item['processed'] for item in stats)
+    stored = sum(item['stored'] for item in stats)
+    updated = sum(item['updated'] for item in stats)
+    logger.info("Обход завершен: хабов %d, обработано статей %d, добавлено %d, обновлено %d", len(stats), processed, stored, updated)
+    return {'hubs': len(stats), 'processed': processed, 'stored': stored, 'updated': updated}
+
+def hub_shards(hubs=None):
+    # Хабы без селекторов не обходятся, задачи для них не нужны
+    if hubs is None:
+        hubs = Hub.objects.order_by('pk')
+    rows = hubs.filter(selectors__isnull=False).distinct().values_list('pk', 'url')
+
+    # Лимиты хоста действуют внутри процесса, поэтому хабы одного хоста
+    # не делятся между задачами: иначе каждая задача обходила бы хост
+    # со своим лимитом запросов и соединений
+    hosts = {}
+    for pk, url in rows:
+        hosts.setdefault(urlsplit(url).hostname, []).append(pk)
+
+    size = max(1, settings.PARCER_HUBS_PER_TASK)
+    shards = []
+    for hub_ids in hosts.values():
+        if shards and len(shards[-1]) + len(hub_ids) <= size:
+            shards[-1].extend(hub_ids)
+        else:
+            shards.append(hub_ids)
+    return shards
+
+def dispatch(shards):
+    # Каждая группа хабов обходится отдельной задачей, поэтому
+    # добавление воркеров увеличивает число хабов, обходимых параллельно
+    if not shards:
+        logger.info("Нет доступных хабов для обработки")
+        return
+    chord(fetch_hubs.s(shard) for shard in shards)(report_fetching.s())
 
 @shared_task
 def schedule_fetching():
-    current_app.send_task('parcer_app.tasks.fetch_articles', countdown=0)
+    dispatch(hub_shards())
+
+@shared_task
+def dispatch_due_hubs():
+    now = timezone.now()
+    due = Hub.objects.filter(Q(next_fetch_at__isnull=True) | Q(next_fetch_at__lte=now))
+    shards = hub_shards(due.order_by(F('next_fetch_at').asc(nulls_first=True), 'pk'))
+    if not shards:
+        return
+
+    # Пока задача в очереди или выполняется, хаб не выдается повторно.
+    # По окончании обхода время следующего запуска перезапишется.
+    hub_ids = [hub_id for shard in shards for hub_id in shard]
+    Hub.objects.filter(pk__in=hub_ids).update(
+        next_fetch_at=now + timedelta(seconds=settings.PARCER_HUB_TASK_TIME_LIMIT)
+    )
+    dispatch(shards)
@@ -0,0 +1,86 @@
+import tempfile
+from unittest.mock import AsyncMock, MagicMock, patch
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase, TestCase, override_settings
+from parcer_app.archive import HtmlArchive
+from parcer_app.models import ArchivedPage, Hub, HubSelectors, Post
+from parcer_app.management.commands.fetch_articles import ArticleFetcher
+
+ARTICLE_HTML = '<html><h1 class="title">Title</h1><div class="body"><p>Текст статьи</p></div></html>'
+
+class HtmlArchiveTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.archive = HtmlArchive(self.root.name)
+
+    def test_content_addressed(self):
+        digest = self.archive.write(ARTICLE_HTML)
+
+        self.assertEqual(self.archive.write(ARTICLE_HTML), digest)
+        self.assertNotEqual(self.archive.write(ARTICLE_HTML + ' '), digest)
+        self.assertEqual(self.archive.read(digest), ARTICLE_HTML)
+
+        # Страница хранится сжатой
+        self.assertLess(self.archive.path(digest).stat().st_size, len(ARTICLE_HTML.encode('utf-8')))
+
+
+@override_settings(PARCER_RETRY_ATTEMPTS=0, PARCER_HUB_LEASE_ENABLED=False)
+class ReplayTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        archive_settings = override_settings(PARCER_ARCHIVE_DIR=self.root.name)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+        self.hub = Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
+        self.selectors = HubSelectors.objects.create(
+            hub=self.hub,
+            article_selector='a',
+            title_selector='.title',
+            author_selector='.author',
+            author_url_selector='.author_url',
+            publication_date_selector='.pub-date',
+            content_selector='.content'
+        )
+        self.article_url = 'https://example.com/hub1/article/1'
+
+    @patch('aiohttp.ClientSession')
+    async def test_replay_reextracts_without_network(self, MockClientSession):
+        mock_session = MockClientSession()
+
+        mock_hub_response = AsyncMock()
+        mock_hub_response.status = 200
+        mock_hub_response.headers = {}
+        mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url}">Article 1</a></html>')
+
+        mock_article_response = AsyncMock()
+        mock_article_response.status = 200
+        mock_article_response.headers = {}
+        mock_article_response.text = AsyncMock(return_value=ARTICLE_HTML)
+
+        mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response]
+        await ArticleFetcher(self.hub, MagicMock()).fetch_hub_page(mock_session)
+
+        page = await sync_to_async(ArchivedPage.objects.get)(url=self.article_url)
+        self.assertEqual(HtmlArchive().read(page.digest), ARTICLE_HTML)
+
+        # Селектор содержимого был неверным, после исправления статья разбирается из архива
+        post = await sync_to_async(Post.objects.select_related('body').get)(post_url=self.article_url)
+        self.assertEqual(post.content, 'Без содержания')
+
+        self.selectors.content_selector = '.body'
+        await sync_to_async(self.selectors.save)()
+        mock_session.get.reset_mock()
+
+        fetcher = ArticleFetcher(self.hub, MagicMock())
+        await fetcher.initialize()
+        await fetcher.replay()
+
+        mock_session.get.assert_not_called()
+        self.assertEqual(fetcher.updated_count, 1)
+        post = await sync_to_async(Post.objects.select_related('body').get)(post_url=self.article_url)
+        self.assertEqual(post.content, 'Текст статьи')
@@ -0,0 +1,127 @@
+import aiohttp
+import json
+from django.test import SimpleTestCase, TestCase
+from parcer_app.benchmarks.pages import (
+    HABR_SELECTORS, STACKOVERFLOW_SELECTORS, habr_article_page, habr_hub_page,
+    stackoverflow_hub_page, stackoverflow_question_page,
+)
+from parcer_app.benchmarks.corpus import BASELINE_PATH, CORPUS_VERSION, build_corpus, compare, corpus_hash
+from parcer_app.benchmarks.posts import seed_hubs, seed_posts
+from parcer_app.benchmarks.server import HABR_PREFIX, create_app, start_server
+from parcer_app.models import Post
+from parcer_app.parsing import extract_article, extract_links
+
+class SeedPostsTests(TestCase):
+
+    def test_seeds_posts_in_batches(self):
+        hubs = seed_hubs(3)
+        progress = list(seed_posts(hubs, 25, batch_size=10))
+
+        self.assertEqual(progress, [10, 20, 25])
+        self.assertEqual(Post.objects.count(), 25)
+        self.assertEqual(Post.objects.values('post_url').distinct().count(), 25)
+        self.assertLessEqual(Post.objects.values('hub').distinct().count(), 3)
+
+
+class SyntheticPagesTests(SimpleTestCase):
+
+    def test_pages_match_real_selectors(self):
+        for selectors, hub_page, article_page in [
+            (HABR_SELECTORS, habr_hub_page, habr_article_page),
+            (STACKOVERFLOW_SELECTORS, stackoverflow_hub_page, stackoverflow_question_page),
+        ]:
+            selectors = dict(selectors, engine='bs4')
+            self.assertEqual(len(extract_links(hub_page('/site', 7), selectors)), 7)
+
+            article = extract_article(article_page(3, 10), selectors)
+            self.assertEqual(article['errors'], [])
+            self.assertIn('3', article['title'])
+            self.assertTrue(article['author'])
+            self.assertTrue(article['publication_date'])
+            self.assertIn('Абзац 9', article['content'])
+
+    async def test_server_serves_pages_and_errors(self):
+        runner, base_url = await start_server(create_app(links=5, latency=0))
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'{base_url}{HABR_PREFIX}/ru/articles/') as response:
+                    self.assertEqual(response.status, 200)
+                    self.assertIn(f'{HABR_PREFIX}/ru/articles/4/', await response.text())
+        finally:
+            await runner.cleanup()
+
+        runner, base_url = await start_server(create_app(latency=0, error_rate=1))
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'{base_url}{HABR_PREFIX}/ru/articles/1/') as response:
+                    self.assertEqual(response.status, 503)
+        finally:
+            await runner.cleanup()
+
+
+class ParseCorpusTests(SimpleTestCase):
+
+    def test_corpus_pages_parse_without_selector_misses(self):
+        for name, (kind, selectors, html_content) in build_corpus().items():
+            if kind != 'article' or not name.endswith('small'):
+                continue
+            article = extract_article(html_content, dict(selectors, engine='bs4'))
+            self.assertEqual(article['errors'], [], name)
+            # Комментарии вокруг статьи не попадают в содержимое
+            self.assertNotIn('Комментарий', article['content'], name)
+
+    def test_compare_reports_regressions(self):
+        baseline = {
+            'version': CORPUS_VERSION,
+            'pages': {'habr-article-small': {'time_ms': 1.0, 'peak_kb': 100, 'fields': {'title': 8, 'content': 200}}},
+            'publication_date': {'time_ms': 0.01},
+        }
+        results = {
+            'version': CORPUS_VERSION,
+            'pages': {'habr-article-small': {'time_ms': 1.1, 'peak_kb': 110, 'fields': {'title': 8, 'content': 200}}},
+            'publication_date': {'time_ms': 0.011},
+        }
+        self.assertEqual(compare(results, baseline, threshold=0.25), [])
+
+        results['pages']['habr-article-small'].update(time_ms=2.0, peak_kb=200, fields={'title': 8, 'content': 150})
+        regressions = compare(results, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 3)
+
+        with self.assertRaises(ValueError):
+            compare(dict(results, version=CORPUS_VERSION + 1), baseline, threshold=0.25)
+
+    def test_compare_refuses_changed_corpus(self):
+        baseline = {'version': CORPUS_VERSION, 'corpus_hash': 'old', 'pages': {}, 'publication_date': {}}
+        results = {'version': CORPUS_VERSION, 'corpus_hash': 'new', 'pages': {}, 'publication_date': {}}
+        with self.assertRaises(ValueError):
+            compare(results, baseline, threshold=0.25)
+
+    def test_baseline_matches_corpus(self):
+        # Изменение страниц требует пересохранить базовую линию
+        with open(BASELINE_PATH, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        current = corpus_hash(build_corpus())
+        for engine in ('bs4', 'lxml'):
+            self.assertEqual(baseline[engine]['version'], CORPUS_VERSION)
+            self.assertEqual(baseline[engine]['corpus_hash'], current)
+
+    def test_compare_ignores_noise_and_missing_peak(self):
+        baseline = {
+            'version': CORPUS_VERSION,
+            'pages': {'habr-article-small': {'time_ms': 1.0, 'spread_ms': 0.2, 'peak_kb': 100, 'fields': {}}},
+            'publication_date': {'time_ms': 0.01},
+        }
+        # Рост в пределах разброса замеров; пик памяти для движка не замерялся
+        results = {
+            'version': CORPUS_VERSION,
+            'pages': {'habr-article-small': {'time_ms': 1.5, 'spread_ms': 0.1, 'fields': {}}},
+            'publication_date': {'time_ms': 0.01},
+        }
+        self.assertEqual(compare(results, baseline, threshold=0.25), [])
+
+        results['pages']['habr-article-small']['time_ms'] = 1.7
+        self.assertEqual(len(compare(results, baseline, threshold=0.25)), 1)
+
+        # Машина вдвое медленнее: время сравнивается с учетом калибровки
+        results['pages']['habr-article-small']['time_ms'] = 2.0
+        self.assertEqual(compare(dict(results, calibration_ms=4.0), dict(baseline, calibration_ms=2.0), threshold=0.25), [])
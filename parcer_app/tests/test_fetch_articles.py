@@ -1,14 +1,22 @@
+import asyncio
 from io import StringIO
+from datetime import timedelta
 from asgiref.sync import sync_to_async
-from django.test import TestCase
+from django.conf import settings
+from django.db import DataError
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.core.management import call_command
 from unittest.mock import patch, AsyncMock, MagicMock
-from parcer_app.models import Hub, HubSelectors, Post
+from parcer_app.models import CrawlURL, Hub, HubSelectors, Post, PageValidator
 from parcer_app.management.commands.fetch_articles import ArticleFetcher
+from parcer_app.resilience import get_circuit_breaker, reset_circuit_breakers
 
+@override_settings(PARCER_RETRY_ATTEMPTS=0)
 class ArticleFetcherTests(TestCase):
 
     def setUp(self):
+        reset_circuit_breakers()
         self.hub = Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
         self.selectors = HubSelectors.objects.create(
             hub=self.hub, 
@@ -33,10 +41,12 @@ class ArticleFetcherTests(TestCase):
             # Настройка моков для страницы хаба и статьи
             mock_hub_response = AsyncMock()
             mock_hub_response.status = 200
+            mock_hub_response.headers = {}
             mock_hub_response.text = AsyncMock(return_value='<html><a href="https://example.com/hub1/article/1">Article 1</a></html>')
 
             mock_article_response = AsyncMock()
             mock_article_response.status = 200
+            mock_article_response.headers = {}
             mock_article_response.text = AsyncMock(return_value="""
             <html>
                 <h1 class="title">Title</h1>
@@ -61,8 +71,8 @@ class ArticleFetcherTests(TestCase):
             mock_session.get.assert_any_call(self.article_url_1)
 
             # Проверка, что статьи были загружены
-            self.assertEqual(len(fetcher.fetched_articles), 1)
-            self.assertEqual(fetcher.fetched_articles[0]['post_url'], self.article_url_1)
+            self.assertEqual(fetcher.processed_count, 1)
+            self.assertTrue(await sync_to_async(Post.objects.filter(post_url=self.article_url_1).exists)())
 
         finally:
             mock_session.close()
@@ -76,10 +86,12 @@ class ArticleFetcherTests(TestCase):
             # Настройка моков для страницы хаба и статьи
             mock_hub_response = AsyncMock()
             mock_hub_response.status = 200
+            mock_hub_response.headers = {}
             mock_hub_response.text = AsyncMock(return_value='<html><a href="https://example.com/hub1/article/1">Article 1</a></html>')
 
             mock_article_response = AsyncMock()
             mock_article_response.status = 200
+            mock_article_response.headers = {}
             mock_article_response.text = AsyncMock(return_value="""
             <html>
                 <h1 class="title">Title</h1>
@@ -97,15 +109,14 @@ class ArticleFetcherTests(TestCase):
             await fetcher.fetch_hub_page(mock_session)
 
             # Проверка, что данные были загружены
-            self.assertEqual(len(fetcher.fetched_articles), 1)
-            article = fetcher.fetched_articles[0]
+            self.assertEqual(fetcher.processed_count, 1)
+            post = await sync_to_async(Post.objects.select_related('body').get)(post_url=self.article_url_1)
 
-            self.assertEqual(article['title'], 'Title')
-            self.assertEqual(article['author'], 'Test Author')
-            self.assertEqual(article['author_url'], 'https://example.com/hub1/author/1')
-            self.assertEqual(article['publication_date'], '2024-01-01')
-            self.assertEqual(article['post_url'], self.article_url_1)
-            self.assertEqual(article['content'], 'This is the content of the article.')
+            self.assertEqual(post.title, 'Title')
+            self.assertEqual(post.author_name, 'Test Author')
+            self.assertEqual(post.author_url, 'https://example.com/hub1/author/1')
+            self.assertEqual(post.publication_date.strftime('%Y-%m-%d'), '2024-01-01')
+            self.assertEqual(post.content, 'This is the content of the article.')
 
         finally:
             mock_session.close()
@@ -119,10 +130,12 @@ class ArticleFetcherTests(TestCase):
             # Настройка моков для страницы хаба и статьи
             mock_hub_response = AsyncMock()
             mock_hub_response.status = 200
+            mock_hub_response.headers = {}
             mock_hub_response.text = AsyncMock(return_value='<html><a href="https://example.com/hub1/article/1">Article 1</a></html>')
 
             mock_article_response = AsyncMock()
             mock_article_response.status = 200
+            mock_article_response.headers = {}
             mock_article_response.text = AsyncMock(return_value="""
             <html>
                 <h1 class="title">Title</h1>
@@ -139,7 +152,7 @@ class ArticleFetcherTests(TestCase):
 
             await fetcher.fetch_hub_page(mock_session)
 
-            post = await sync_to_async(Post.objects.get)(post_url=self.article_url_1)
+            post = await sync_to_async(Post.objects.select_related('body').get)(post_url=self.article_url_1)
             self.assertEqual(post.title, 'Title')
             self.assertEqual(post.author_name, 'Test Author')
             self.assertEqual(post.publication_date.strftime('%Y-%m-%d'), '2024-01-01')
@@ -156,10 +169,12 @@ class ArticleFetcherTests(TestCase):
         try:
             mock_hub_response = AsyncMock()
             mock_hub_response.status = 200
+            mock_hub_response.headers = {}
             mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a><a href="{self.article_url_2}">Article 2</a></html>')
 
             mock_article_response_1 = AsyncMock()
             mock_article_response_1.status = 200
+            mock_article_response_1.headers = {}
             mock_article_response_1.text = AsyncMock(return_value="""
             <html>
                 <h1 class="title">Title 1</h1>
@@ -173,6 +188,7 @@ class ArticleFetcherTests(TestCase):
 
             mock_article_response_2 = AsyncMock()
             mock_article_response_2.status = 200
+            mock_article_response_2.headers = {}
             mock_article_response_2.text = AsyncMock(return_value="""
             <html>
                 <h1 class="title">Title 2</h1>
@@ -190,12 +206,12 @@ class ArticleFetcherTests(TestCase):
             await fetcher.fetch_hub_page(mock_session)
 
             # Проверка, что обе статьи были успешно загружены
-            self.assertEqual(len(fetcher.fetched_articles), 2)
-            article_1 = fetcher.fetched_articles[0]
-            article_2 = fetcher.fetched_articles[1]
+            self.assertEqual(fetcher.stored_count, 2)
+            article_1 = await sync_to_async(Post.objects.get)(post_url=self.article_url_1)
+            article_2 = await sync_to_async(Post.objects.get)(post_url=self.article_url_2)
 
-            self.assertEqual(article_1['title'], 'Title 1')
-            self.assertEqual(article_2['title'], 'Title 2')
+            self.assertEqual(article_1.title, 'Title 1')
+            self.assertEqual(article_2.title, 'Title 2')
 
         finally:
             mock_session.close()
@@ -208,12 +224,15 @@ class ArticleFetcherTests(TestCase):
         try:
             mock_hub_response = AsyncMock()
             mock_hub_response.status = 200
+            mock_hub_response.headers = {}
             mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a><a href="{self.article_url_2}">Article 2</a></html>')
 
             mock_article_response_1 = AsyncMock()
             mock_article_response_1.status = 404
+            mock_article_response_1.headers = {}
             mock_article_response_2 = AsyncMock()
             mock_article_response_2.status = 500
+            mock_article_response_2.headers = {}
 
             # Настройка поведения контекстного менеджера
             mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response_1, mock_article_response_2]
@@ -221,7 +240,7 @@ class ArticleFetcherTests(TestCase):
             await fetcher.fetch_hub_page(mock_session)
 
             # Проверка, что ни одна статья не была успешно загружена
-            self.assertEqual(len(fetcher.fetched_articles), 0)
+            self.assertEqual(fetcher.processed_count, 0)
 
         finally:
             mock_session.close()
@@ -234,10 +253,12 @@ class ArticleFetcherTests(TestCase):
         try:
             mock_hub_response = AsyncMock()
             mock_hub_response.status = 200
+            mock_hub_response.headers = {}
             mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a><a href="{self.article_url_2}">Article 2</a></html>')
 
             mock_article_response_1 = AsyncMock()
             mock_article_response_1.status = 200
+            mock_article_response_1.headers = {}
             mock_article_response_1.text = AsyncMock(return_value="""
             <html>
                 <h1 class="title">Title 1</h1>
@@ -251,6 +272,7 @@ class ArticleFetcherTests(TestCase):
 
             mock_article_response_2 = AsyncMock()
             mock_article_response_2.status = 500
+            mock_article_response_2.headers = {}
 
             # Настройка поведения контекстного менеджера
             mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response_1, mock_article_response_2]
@@ -258,9 +280,400 @@ class ArticleFetcherTests(TestCase):
             await fetcher.fetch_hub_page(mock_session)
 
             # Проверка, что только одна статья была успешно загружена
-            self.assertEqual(len(fetcher.fetched_articles), 1)
-            article_1 = fetcher.fetched_articles[0]
-            self.assertEqual(article_1['title'], 'Title 1')
+            self.assertEqual(fetcher.stored_count, 1)
+            article_1 = await sync_to_async(Post.objects.get)(hub=self.hub)
+            self.assertEqual(article_1.title, 'Title 1')
+
+        finally:
+            mock_session.close()
+
+    @patch('aiohttp.ClientSession')
+    async def test_conditional_request_not_modified(self, MockClientSession):
+        await sync_to_async(PageValidator.objects.create)(url=self.hub.url, etag='"hub-v1"')
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 304
+            mock_hub_response.headers = {}
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            # Запрос условный, статьи не запрашиваются и не парсятся
+            mock_session.get.assert_called_once_with(self.hub.url, headers={'If-None-Match': '"hub-v1"'})
+            mock_hub_response.text.assert_not_called()
+            self.assertEqual(fetcher.processed_count, 0)
+
+        finally:
+            mock_session.close()
+
+    @patch('aiohttp.ClientSession')
+    async def test_validators_saved_with_articles(self, MockClientSession):
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 200
+            mock_hub_response.headers = {'ETag': '"hub-v1"'}
+            mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a></html>')
+
+            mock_article_response = AsyncMock()
+            mock_article_response.status = 200
+            mock_article_response.headers = {'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+            mock_article_response.text = AsyncMock(return_value='<html><h1 class="title">Title</h1></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            hub_validator = await sync_to_async(PageValidator.objects.get)(url=self.hub.url)
+            self.assertEqual(hub_validator.etag, '"hub-v1"')
+            self.assertIsNone(hub_validator.last_modified)
+
+            article_validator = await sync_to_async(PageValidator.objects.get)(url=self.article_url_1)
+            self.assertIsNone(article_validator.etag)
+            self.assertEqual(article_validator.last_modified, 'Mon, 01 Jan 2024 00:00:00 GMT')
+
+        finally:
+            mock_session.close()
+
+    @patch('aiohttp.ClientSession')
+    async def test_known_articles_are_not_requested(self, MockClientSession):
+        await sync_to_async(Post.objects.create)(
+            hub=self.hub, title='Title 1', author_name='Author 1',
+            post_url=self.article_url_1, content='Content 1'
+        )
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 200
+            mock_hub_response.headers = {}
+            mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a><a href="{self.article_url_2}">Article 2</a><a href="{self.article_url_2}">Article 2</a></html>')
+
+            mock_article_response = AsyncMock()
+            mock_article_response.status = 200
+            mock_article_response.headers = {}
+            mock_article_response.text = AsyncMock(return_value='<html><h1 class="title">Title 2</h1></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            # Уже сохраненная статья и повтор ссылки не запрашиваются
+            self.assertEqual(mock_session.get.call_count, 2)
+            mock_session.get.assert_any_call(self.article_url_2)
+            self.assertEqual(fetcher.stored_count, 1)
+            self.assertTrue(await sync_to_async(Post.objects.filter(post_url=self.article_url_2).exists)())
+
+        finally:
+            mock_session.close()
+
+    @override_settings(PARCER_STORE_BATCH_SIZE=1, PARCER_DOWNLOAD_CONCURRENCY=1)
+    @patch('aiohttp.ClientSession')
+    async def test_articles_stored_in_batches(self, MockClientSession):
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        store_articles_bulk = fetcher.store_articles_bulk
+        fetcher.store_articles_bulk = AsyncMock(side_effect=store_articles_bulk)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 200
+            mock_hub_response.headers = {}
+            mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a><a href="{self.article_url_2}">Article 2</a></html>')
+
+            mock_article_response_1 = AsyncMock()
+            mock_article_response_1.status = 200
+            mock_article_response_1.headers = {}
+            mock_article_response_1.text = AsyncMock(return_value='<html><h1 class="title">Title 1</h1></html>')
+
+            mock_article_response_2 = AsyncMock()
+            mock_article_response_2.status = 200
+            mock_article_response_2.headers = {}
+            mock_article_response_2.text = AsyncMock(return_value='<html><h1 class="title">Title 2</h1></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response_1, mock_article_response_2]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            # Каждая статья записывается отдельной пачкой, не дожидаясь конца обхода
+            self.assertEqual(fetcher.store_articles_bulk.call_count, 2)
+            self.assertEqual(fetcher.stored_count, 2)
+            self.assertEqual(await sync_to_async(Post.objects.filter(hub=self.hub).count)(), 2)
+
+        finally:
+            mock_session.close()
+
+    @override_settings(PARCER_QUEUE_SIZE=1, PARCER_DOWNLOAD_CONCURRENCY=1, PARCER_PARSE_CONCURRENCY=1)
+    async def test_pipeline_stops_when_store_stage_fails(self):
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        fetcher.parse_article_page = AsyncMock(side_effect=lambda url, html_content: {'post_url': url})
+        fetcher.store_worker = AsyncMock(side_effect=RuntimeError('БД недоступна'))
+
+        async def fetch(url):
+            return '<html></html>'
+
+        # Очереди переполняются, но загрузчики и парсер отменяются вместе с упавшей записью
+        urls = [f'https://example.com/hub1/article/{number}' for number in range(20)]
+        with self.assertRaisesMessage(RuntimeError, 'БД недоступна'):
+            await asyncio.wait_for(fetcher.run_pipeline(urls, None, fetch=fetch), timeout=5)
+
+    @patch('aiohttp.ClientSession')
+    async def test_concurrency_limit_saved_on_hub(self, MockClientSession):
+        self.hub.url = 'https://limits.example.com/hub1'
+        self.hub.concurrency_limit = 3
+        await sync_to_async(self.hub.save)()
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 200
+            mock_hub_response.headers = {}
+            mock_hub_response.text = AsyncMock(return_value='<html></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            # Лимит стартует с сохраненного значения и растет после успешного ответа
+            hub = await sync_to_async(Hub.objects.get)(pk=self.hub.pk)
+            self.assertGreater(hub.concurrency_limit, 3)
+            self.assertLess(hub.concurrency_limit, 4)
+
+        finally:
+            mock_session.close()
+
+    @override_settings(PARCER_RETRY_ATTEMPTS=2, PARCER_RETRY_BASE_DELAY=0)
+    @patch('aiohttp.ClientSession')
+    async def test_transient_error_is_retried(self, MockClientSession):
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 200
+            mock_hub_response.headers = {}
+            mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a></html>')
+
+            mock_unavailable_response = AsyncMock()
+            mock_unavailable_response.status = 503
+            mock_unavailable_response.headers = {'Retry-After': '0'}
+
+            mock_article_response = AsyncMock()
+            mock_article_response.status = 200
+            mock_article_response.headers = {}
+            mock_article_response.text = AsyncMock(return_value='<html><h1 class="title">Title</h1></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [
+                mock_hub_response, mock_unavailable_response, mock_article_response
+            ]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            self.assertEqual(mock_session.get.call_count, 3)
+            self.assertEqual(fetcher.stored_count, 1)
+            item = await sync_to_async(CrawlURL.objects.get)(url=self.article_url_1)
+            self.assertEqual(item.status, CrawlURL.DONE)
+
+        finally:
+            mock_session.close()
+
+    @patch('aiohttp.ClientSession')
+    async def test_failed_article_retried_on_next_run(self, MockClientSession):
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 200
+            mock_hub_response.headers = {'ETag': '"hub-v1"'}
+            mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a></html>')
+
+            mock_error_response = AsyncMock()
+            mock_error_response.status = 500
+            mock_error_response.headers = {}
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_error_response]
+            await ArticleFetcher(self.hub, self.mock_command).fetch_hub_page(mock_session)
+
+            failed = await sync_to_async(CrawlURL.objects.get)(url=self.article_url_1)
+            self.assertEqual(failed.attempts, 1)
+            self.assertEqual(failed.last_status, 500)
+            self.assertEqual(failed.status, CrawlURL.PENDING)
+
+            # Страница хаба не изменилась, но незагруженная статья запрашивается снова
+            mock_not_modified_response = AsyncMock()
+            mock_not_modified_response.status = 304
+            mock_not_modified_response.headers = {}
+
+            mock_article_response = AsyncMock()
+            mock_article_response.status = 200
+            mock_article_response.headers = {}
+            mock_article_response.text = AsyncMock(return_value='<html><h1 class="title">Title</h1></html>')
+
+            mock_session.get.reset_mock()
+            mock_session.get.return_value.__aenter__.side_effect = [mock_not_modified_response, mock_article_response]
+            fetcher = ArticleFetcher(self.hub, self.mock_command)
+            await fetcher.fetch_hub_page(mock_session)
+
+            mock_session.get.assert_any_call(self.article_url_1)
+            self.assertEqual(fetcher.stored_count, 1)
+            item = await sync_to_async(CrawlURL.objects.get)(url=self.article_url_1)
+            self.assertEqual(item.status, CrawlURL.DONE)
+
+        finally:
+            mock_session.close()
+
+    @patch('aiohttp.ClientSession')
+    async def test_open_circuit_skips_requests(self, MockClientSession):
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        mock_session = MockClientSession()
+
+        try:
+            breaker = get_circuit_breaker(self.hub.url)
+            for _ in range(breaker.failure_threshold):
+                breaker.record_failure()
+
+            await fetcher.fetch_article_data(self.article_url_1, mock_session)
+
+            # Запрос не отправлен, статья отложена без учета попытки
+            mock_session.get.assert_not_called()
+            failed = await sync_to_async(CrawlURL.objects.get)(url=self.article_url_1)
+            self.assertEqual(failed.attempts, 0)
+
+        finally:
+            mock_session.close()
+
+    @patch('aiohttp.ClientSession')
+    async def test_schedule_updated_after_run(self, MockClientSession):
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 200
+            mock_hub_response.headers = {}
+            mock_hub_response.text = AsyncMock(return_value=f'<html><a href="{self.article_url_1}">Article 1</a></html>')
+
+            mock_article_response = AsyncMock()
+            mock_article_response.status = 200
+            mock_article_response.headers = {}
+            mock_article_response.text = AsyncMock(return_value='<html><h1 class="title">Title</h1></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            hub = await sync_to_async(Hub.objects.get)(pk=self.hub.pk)
+            self.assertIsNotNone(hub.last_fetched)
+            self.assertEqual(hub.last_new_posts, 1)
+            self.assertEqual(hub.fetch_interval, settings.PARCER_FETCH_INTERVAL_DEFAULT)
+            self.assertEqual(hub.next_fetch_at, hub.last_fetched + timedelta(minutes=hub.fetch_interval))
+
+        finally:
+            mock_session.close()
+
+    async def test_duplicate_from_other_hub_does_not_roll_back_batch(self):
+        other_hub = await sync_to_async(Hub.objects.create)(name='Хаб 2', url='https://example.com/hub2')
+        await sync_to_async(Post.objects.create)(
+            hub=other_hub, title='Старая', author_name='Автор', post_url=self.article_url_1, content='Текст',
+            content_hash='Дубликат'
+        )
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+
+        articles = [
+            {'title': title, 'author': 'Автор', 'author_url': '#', 'publication_date': None, 'content': 'Текст', 'content_hash': title, 'post_url': url}
+            for title, url in (('Дубликат', self.article_url_1), ('Новая', self.article_url_2))
+        ]
+        await fetcher.store_articles_bulk(articles)
+
+        # Существующая статья с тем же хэшем не перезаписана, новая сохранена
+        self.assertEqual(fetcher.stored_count, 1)
+        post_1 = await sync_to_async(Post.objects.get)(post_url=self.article_url_1)
+        self.assertEqual(post_1.title, 'Старая')
+        self.assertTrue(await sync_to_async(Post.objects.filter(post_url=self.article_url_2, hub=self.hub).exists)())
+
+    @override_settings(PARCER_FAILED_URL_MAX_ATTEMPTS=3)
+    async def test_invalid_article_does_not_block_batch(self):
+        fetcher = ArticleFetcher(self.hub, self.mock_command)
+        store_articles_bulk = fetcher.store_articles_bulk
+
+        # В PostgreSQL строка с недопустимым значением откатывает всю пачку
+        async def store(articles):
+            if any(article['post_url'] == self.article_url_2 for article in articles):
+                raise DataError('value too long for type character varying(255)')
+            await store_articles_bulk(articles)
+
+        fetcher.store_articles_bulk = AsyncMock(side_effect=store)
+
+        articles = [
+            {'title': 'Новая', 'author': 'Автор', 'author_url': '#', 'publication_date': None, 'content': 'Текст', 'content_hash': 'hash', 'post_url': url}
+            for url in (self.article_url_1, self.article_url_2)
+        ]
+        await fetcher.flush_batch(articles)
+
+        # Корректная статья сохранена, для некорректной засчитана попытка
+        self.assertEqual(fetcher.stored_count, 1)
+        self.assertTrue(await sync_to_async(Post.objects.filter(post_url=self.article_url_1).exists)())
+        self.assertFalse(await sync_to_async(Post.objects.filter(post_url=self.article_url_2).exists)())
+        item = await CrawlURL.objects.aget(url=self.article_url_2)
+        self.assertEqual(item.attempts, 1)
+        self.assertEqual(item.status, CrawlURL.PENDING)
+        self.assertIn('Ошибка при сохранении', item.last_error)
+
+    @patch('aiohttp.ClientSession')
+    async def test_recrawl_updates_only_changed_posts(self, MockClientSession):
+        now = timezone.now()
+        changed = await sync_to_async(Post.objects.create)(
+            hub=self.hub, title='Title', author_name='Аноним', post_url=self.article_url_1,
+            publication_date=now - timedelta(hours=1), content='Старый текст', content_hash='old'
+        )
+        old = await sync_to_async(Post.objects.create)(
+            hub=self.hub, title='Old', author_name='Аноним', post_url=self.article_url_2,
+            publication_date=now - timedelta(days=30), content='Текст', content_hash='old'
+        )
+        fetcher = ArticleFetcher(self.hub, self.mock_command, recrawl=True)
+        mock_session = MockClientSession()
+
+        try:
+            mock_hub_response = AsyncMock()
+            mock_hub_response.status = 304
+            mock_hub_response.headers = {}
+
+            mock_article_response = AsyncMock()
+            mock_article_response.status = 200
+            mock_article_response.headers = {}
+            mock_article_response.text = AsyncMock(return_value='<html><h1 class="title">Title</h1><div class="content"><p>Новый текст</p></div></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response]
+
+            await fetcher.fetch_hub_page(mock_session)
+
+            # Старая статья вне окна повторной проверки не запрашивается
+            self.assertEqual(mock_session.get.call_count, 2)
+            mock_session.get.assert_any_call(self.article_url_1)
+            self.assertEqual(fetcher.updated_count, 1)
+            self.assertEqual(fetcher.stored_count, 0)
+
+            # Текст загружается отдельно от поста
+            changed = await sync_to_async(Post.objects.select_related('body').get)(pk=changed.pk)
+            self.assertEqual(changed.content, 'Новый текст')
+            self.assertNotEqual(changed.content_hash, 'old')
+
+            # Повторная проверка без изменений не переписывает строку
+            mock_session.get.return_value.__aenter__.side_effect = [mock_hub_response, mock_article_response]
+            fetcher = ArticleFetcher(self.hub, self.mock_command, recrawl=True)
+            await fetcher.fetch_hub_page(mock_session)
+            self.assertEqual(fetcher.updated_count, 0)
+
+            old = await sync_to_async(Post.objects.select_related('body').get)(pk=old.pk)
+            self.assertEqual(old.content, 'Текст')
 
         finally:
             mock_session.close()
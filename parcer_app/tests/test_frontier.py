@@ -0,0 +1,153 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from parcer_app.frontier import Frontier
+from parcer_app.management.commands.fetch_articles import ArticleFetcher
+from parcer_app.models import CrawlURL, Hub, HubSelectors
+from parcer_app.resilience import reset_circuit_breakers
+
+
+class FrontierTests(TestCase):
+
+    def setUp(self):
+        self.hub = Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
+        self.frontier = Frontier(self.hub)
+        self.started = timezone.now()
+
+    def test_enqueue_skips_known_urls(self):
+        self.frontier.enqueue(['https://example.com/1', 'https://example.com/2', 'https://example.com/1'])
+        CrawlURL.objects.filter(url='https://example.com/1').update(status=CrawlURL.DONE)
+
+        self.frontier.enqueue(['https://example.com/1', 'https://example.com/3'])
+
+        self.assertEqual(CrawlURL.objects.count(), 3)
+        self.assertEqual(CrawlURL.objects.get(url='https://example.com/1').status, CrawlURL.DONE)
+
+    def test_requeue_returns_done_urls(self):
+        self.frontier.enqueue(['https://example.com/1'])
+        CrawlURL.objects.update(status=CrawlURL.DONE, attempts=2)
+
+        self.frontier.enqueue(['https://example.com/1'], priority=CrawlURL.PRIORITY_RECRAWL, requeue=True)
+
+        item = CrawlURL.objects.get()
+        self.assertEqual(item.status, CrawlURL.PENDING)
+        self.assertEqual(item.priority, CrawlURL.PRIORITY_RECRAWL)
+        self.assertEqual(item.attempts, 0)
+
+    def test_claim_orders_by_priority_and_leases(self):
+        self.frontier.enqueue(['https://example.com/old'], priority=CrawlURL.PRIORITY_RECRAWL)
+        self.frontier.enqueue(['https://example.com/1', 'https://example.com/2'])
+
+        urls = self.frontier.claim(2, self.started)
+
+        self.assertEqual(urls, ['https://example.com/1', 'https://example.com/2'])
+        leased = CrawlURL.objects.filter(status=CrawlURL.LEASED)
+        self.assertEqual(leased.count(), 2)
+        self.assertEqual(set(leased.values_list('lease_owner', flat=True)), {self.frontier.owner})
+
+        # Арендованные ссылки не выдаются другому процессу
+        self.assertEqual(Frontier(self.hub).claim(10, self.started), ['https://example.com/old'])
+        self.assertEqual(Frontier(self.hub).claim(10, self.started), [])
+
+    def test_claim_is_per_hub(self):
+        other = Hub.objects.create(name='Хаб 2', url='https://example.com/hub2')
+        Frontier(other).enqueue(['https://example.com/other'])
+        self.frontier.enqueue(['https://example.com/1'])
+
+        self.assertEqual(self.frontier.claim(10, self.started), ['https://example.com/1'])
+
+    def test_expired_lease_is_reclaimed(self):
+        self.frontier.enqueue(['https://example.com/1'])
+        self.frontier.claim(10, self.started)
+        CrawlURL.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+
+        other = Frontier(self.hub)
+        self.assertEqual(other.claim(10, self.started), ['https://example.com/1'])
+        self.assertEqual(CrawlURL.objects.get().lease_owner, other.owner)
+
+    def test_release_returns_leased_urls(self):
+        self.frontier.enqueue(['https://example.com/1', 'https://example.com/2'])
+        self.frontier.claim(10, self.started)
+        self.frontier.complete(['https://example.com/1'])
+
+        self.assertEqual(self.frontier.release(), 1)
+        self.assertEqual(Frontier(self.hub).claim(10, self.started), ['https://example.com/2'])
+
+    @override_settings(PARCER_FAILED_URL_MAX_ATTEMPTS=2)
+    def test_fail_defers_until_max_attempts(self):
+        self.frontier.enqueue(['https://example.com/1'])
+        self.frontier.claim(10, self.started)
+
+        self.frontier.fail('https://example.com/1', 500, 'Код статуса 500')
+        item = CrawlURL.objects.get()
+        self.assertEqual(item.status, CrawlURL.PENDING)
+        self.assertEqual(item.attempts, 1)
+        self.assertEqual(item.last_status, 500)
+        # В текущем обходе отложенная ссылка больше не выдается
+        self.assertEqual(self.frontier.claim(10, self.started), [])
+        self.assertEqual(self.frontier.claim(10, timezone.now() + timedelta(seconds=1)), ['https://example.com/1'])
+
+        self.frontier.fail('https://example.com/1', 500, 'Код статуса 500')
+        self.assertEqual(CrawlURL.objects.get().status, CrawlURL.FAILED)
+
+    def test_fail_without_attempt(self):
+        self.frontier.fail('https://example.com/1', error='Хост недоступен', attempted=False)
+
+        item = CrawlURL.objects.get()
+        self.assertEqual(item.hub, self.hub)
+        self.assertEqual(item.attempts, 0)
+        self.assertEqual(item.status, CrawlURL.PENDING)
+
+
+@override_settings(PARCER_RETRY_ATTEMPTS=0)
+class FrontierResumeTests(TestCase):
+
+    def setUp(self):
+        reset_circuit_breakers()
+        self.hub = Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
+        HubSelectors.objects.create(
+            hub=self.hub,
+            article_selector='a',
+            title_selector='.title',
+            author_selector='.author',
+            author_url_selector='.author_url',
+            publication_date_selector='.pub-date',
+            content_selector='.content'
+        )
+
+    @patch('aiohttp.ClientSession')
+    async def test_interrupted_crawl_resumes_from_frontier(self, MockClientSession):
+        # Прерванный обход: одна статья сохранена, вторая осталась под истекшей арендой
+        done_url = 'https://example.com/hub1/article/1'
+        leased_url = 'https://example.com/hub1/article/2'
+        await CrawlURL.objects.acreate(url=done_url, hub=self.hub, status=CrawlURL.DONE)
+        await CrawlURL.objects.acreate(
+            url=leased_url, hub=self.hub, status=CrawlURL.LEASED, lease_owner='crashed',
+            leased_until=timezone.now() - timedelta(seconds=1),
+        )
+        mock_session = MockClientSession()
+
+        try:
+            mock_not_modified_response = AsyncMock()
+            mock_not_modified_response.status = 304
+            mock_not_modified_response.headers = {}
+
+            mock_article_response = AsyncMock()
+            mock_article_response.status = 200
+            mock_article_response.headers = {}
+            mock_article_response.text = AsyncMock(return_value='<html><h1 class="title">Title</h1></html>')
+
+            mock_session.get.return_value.__aenter__.side_effect = [mock_not_modified_response, mock_article_response]
+            fetcher = ArticleFetcher(self.hub, MagicMock())
+            await fetcher.fetch_hub_page(mock_session)
+
+            # Страница хаба не изменилась, загружена только незавершенная статья
+            self.assertEqual(mock_session.get.call_count, 2)
+            mock_session.get.assert_any_call(leased_url)
+            self.assertEqual(fetcher.stored_count, 1)
+            item = await CrawlURL.objects.aget(url=leased_url)
+            self.assertEqual(item.status, CrawlURL.DONE)
+
+        finally:
+            mock_session.close()
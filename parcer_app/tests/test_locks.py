@@ -0,0 +1,82 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from django.test import SimpleTestCase, TestCase, override_settings
+from parcer_app.locks import RELEASE_SCRIPT, RENEW_SCRIPT, HubLease
+from parcer_app.models import Hub
+from parcer_app.management.commands.fetch_articles import ArticleFetcher
+
+class HubLeaseTests(SimpleTestCase):
+
+    @patch('parcer_app.locks.get_redis')
+    def test_acquire_sets_key_with_ttl(self, mock_get_redis):
+        mock_get_redis.return_value.set.return_value = True
+        lease = HubLease(7, ttl=30)
+
+        self.assertTrue(lease.acquire())
+        mock_get_redis.return_value.set.assert_called_once_with(
+            'parcer:hub_lease:7', lease.token, nx=True, px=30000
+        )
+
+    @patch('parcer_app.locks.get_redis')
+    def test_renew_and_release_check_token(self, mock_get_redis):
+        scripts = {}
+        mock_get_redis.return_value.register_script.side_effect = lambda lua: scripts.setdefault(lua, MagicMock(return_value=1))
+        lease = HubLease(7, ttl=30)
+
+        self.assertTrue(lease.renew())
+        scripts[RENEW_SCRIPT].assert_called_once_with(keys=['parcer:hub_lease:7'], args=[lease.token, 30000])
+
+        self.assertTrue(lease.release())
+        scripts[RELEASE_SCRIPT].assert_called_once_with(keys=['parcer:hub_lease:7'], args=[lease.token])
+
+    async def test_heartbeat_reports_lost_lease(self):
+        lease = HubLease(7, ttl=0.03)
+        lost = MagicMock()
+
+        with patch.object(HubLease, 'renew', side_effect=[True, False]):
+            await asyncio.wait_for(lease.heartbeat(lost), timeout=1)
+        lost.assert_called_once()
+
+
+@override_settings(PARCER_HUB_LEASE_ENABLED=True)
+class CrawlLeaseTests(TestCase):
+
+    def setUp(self):
+        self.hub = Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
+
+    async def test_crawl_skipped_when_lease_held(self):
+        fetcher = ArticleFetcher(self.hub, MagicMock())
+
+        with patch.object(HubLease, 'acquire', return_value=False), \
+                patch.object(ArticleFetcher, 'fetch_hub_page', new_callable=AsyncMock) as mock_fetch:
+            await fetcher.crawl(MagicMock())
+
+        mock_fetch.assert_not_called()
+        self.assertTrue(fetcher.skipped)
+
+    async def test_crawl_releases_lease(self):
+        fetcher = ArticleFetcher(self.hub, MagicMock())
+
+        with patch.object(HubLease, 'acquire', return_value=True), \
+                patch.object(HubLease, 'release') as mock_release, \
+                patch.object(ArticleFetcher, 'fetch_hub_page', new_callable=AsyncMock) as mock_fetch:
+            await fetcher.crawl(MagicMock())
+
+        mock_fetch.assert_awaited_once()
+        mock_release.assert_called_once()
+        self.assertFalse(fetcher.skipped)
+
+    @override_settings(PARCER_HUB_LEASE_TTL=0.03)
+    async def test_crawl_stops_when_lease_lost(self):
+        fetcher = ArticleFetcher(self.hub, MagicMock())
+
+        async def slow_fetch(session):
+            await asyncio.sleep(5)
+
+        with patch.object(HubLease, 'acquire', return_value=True), \
+                patch.object(HubLease, 'renew', return_value=False), \
+                patch.object(HubLease, 'release') as mock_release, \
+                patch.object(ArticleFetcher, 'fetch_hub_page', side_effect=slow_fetch):
+            await asyncio.wait_for(fetcher.crawl(MagicMock()), timeout=1)
+
+        mock_release.assert_called_once()
@@ -0,0 +1,86 @@
+import logging
+import threading
+from io import StringIO
+from unittest.mock import MagicMock
+from django.test import SimpleTestCase, TestCase
+from parcer_app.log import BackgroundHandler, HubLogger
+from parcer_app.management.commands.fetch_articles import ArticleFetcher
+from parcer_app.models import Hub, HubSelectors
+
+
+class BackgroundHandlerTests(SimpleTestCase):
+
+    def test_records_written_by_listener_thread(self):
+        stream = StringIO()
+        handler = BackgroundHandler(stream)
+        handler.setFormatter(logging.Formatter('%(levelname)s %(hub)s %(message)s'))
+        logger = logging.getLogger('parcer_app.tests.background')
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            HubLogger(logger, Hub(pk=7, name='Habr')).warning("Найдено %d ссылок", 3)
+        finally:
+            logger.removeHandler(handler)
+            handler.listener.stop()
+
+        self.assertEqual(stream.getvalue(), 'WARNING Habr [Habr] Найдено 3 ссылок\n')
+
+    def test_records_formatted_by_listener_thread(self):
+        calls = []
+
+        class RecordingFormatter(logging.Formatter):
+            def format(self, record):
+                calls.append((threading.current_thread(), record.exc_info is not None))
+                return super().format(record)
+
+        stream = StringIO()
+        handler = BackgroundHandler(stream)
+        handler.setFormatter(RecordingFormatter('%(message)s'))
+        logger = logging.getLogger('parcer_app.tests.background_format')
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            try:
+                raise ValueError('ошибка')
+            except ValueError:
+                logger.exception("Сбой")
+        finally:
+            logger.removeHandler(handler)
+            handler.listener.stop()
+
+        # Трассировку форматирует слушатель, а не вызывающий поток
+        [(thread, has_exc_info)] = calls
+        self.assertIsNot(thread, threading.current_thread())
+        self.assertTrue(has_exc_info)
+        self.assertIn('ValueError: ошибка', stream.getvalue())
+
+    def test_hub_logger_adds_context_fields(self):
+        logger = logging.getLogger('parcer_app.tests.context')
+        with self.assertLogs(logger, level='INFO') as logs:
+            HubLogger(logger, Hub(pk=7, name='Habr')).info("Обход", extra={'url': 'https://example.com'})
+
+        record = logs.records[0]
+        self.assertEqual((record.hub, record.hub_id, record.url), ('Habr', 7, 'https://example.com'))
+
+
+class FetcherLogLevelTests(TestCase):
+
+    async def test_per_article_messages_are_debug(self):
+        hub = await Hub.objects.acreate(name='Хаб 1', url='https://example.com/hub1')
+        await HubSelectors.objects.acreate(
+            hub=hub,
+            article_selector='a',
+            title_selector='.title',
+            author_selector='.author',
+            author_url_selector='.author_url',
+            publication_date_selector='.pub-date',
+            content_selector='.content',
+        )
+        fetcher = ArticleFetcher(hub, MagicMock())
+        await fetcher.initialize()
+
+        with self.assertLogs('parcer_app', level='DEBUG') as logs:
+            await fetcher.parse_article_page('https://example.com/hub1/article/1', '<h1 class="title">Заголовок</h1>')
+
+        self.assertTrue(logs.records)
+        self.assertEqual({record.levelno for record in logs.records}, {logging.DEBUG})
@@ -0,0 +1,118 @@
+import os
+import shutil
+import socket
+import tempfile
+from unittest.mock import AsyncMock, MagicMock, patch
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from parcer_app.management.commands.fetch_articles import ArticleFetcher
+from parcer_app.metrics import delete_metrics, push_metrics
+from parcer_app.models import Hub, HubSelectors
+from parcer_app.resilience import reset_circuit_breakers
+from parcer_app.throttling import get_host_limiter
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(PARCER_RETRY_ATTEMPTS=0)
+class CrawlMetricsTests(TestCase):
+
+    def setUp(self):
+        reset_circuit_breakers()
+        self.hub = Hub.objects.create(name='Хаб метрик', url='https://metrics.example.com/hub')
+        HubSelectors.objects.create(
+            hub=self.hub,
+            article_selector='a',
+            title_selector='.title',
+            author_selector='.author',
+            author_url_selector='.author_url',
+            publication_date_selector='.pub-date',
+            content_selector='.content',
+        )
+
+    def mock_session(self, *responses):
+        session = MagicMock()
+        session.get.return_value.__aenter__.side_effect = responses
+        return session
+
+    def mock_response(self, status, text=''):
+        response = AsyncMock()
+        response.status = status
+        response.headers = {}
+        response.read = AsyncMock(return_value=text.encode('utf-8'))
+        response.text = AsyncMock(return_value=text)
+        return response
+
+    async def test_request_page_records_status_latency_and_size(self):
+        fetcher = ArticleFetcher(self.hub, MagicMock())
+        url = 'https://metrics.example.com/article/1'
+        labels = {'hub': self.hub.name, 'page': 'article'}
+        before_ok = sample('parcer_responses_total', status='200', **labels)
+        before_missing = sample('parcer_responses_total', status='404', **labels)
+        before_count = sample('parcer_fetch_seconds_count', **labels)
+        before_bytes = sample('parcer_response_bytes_sum', **labels)
+
+        session = self.mock_session(self.mock_response(200, 'привет'), self.mock_response(404))
+        await fetcher.request_page(url, session, get_host_limiter(url))
+        await fetcher.request_page(url, session, get_host_limiter(url))
+
+        self.assertEqual(sample('parcer_responses_total', status='200', **labels) - before_ok, 1)
+        self.assertEqual(sample('parcer_responses_total', status='404', **labels) - before_missing, 1)
+        self.assertEqual(sample('parcer_fetch_seconds_count', **labels) - before_count, 2)
+        self.assertEqual(sample('parcer_response_bytes_sum', **labels) - before_bytes, len('привет'.encode('utf-8')))
+
+    async def test_parse_counts_selector_misses(self):
+        fetcher = ArticleFetcher(self.hub, MagicMock())
+        await fetcher.initialize()
+        before_misses = sample('parcer_selector_misses_total', hub=self.hub.name, field='автора')
+        before_parsed = sample('parcer_parse_seconds_count', hub=self.hub.name, page='article')
+
+        await fetcher.parse_article_page(
+            'https://metrics.example.com/article/2',
+            '<html><h1 class="title">Заголовок</h1><div class="content">Текст</div></html>',
+        )
+
+        self.assertEqual(sample('parcer_selector_misses_total', hub=self.hub.name, field='автора') - before_misses, 1)
+        self.assertEqual(sample('parcer_parse_seconds_count', hub=self.hub.name, page='article') - before_parsed, 1)
+
+    def test_metrics_view(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'parcer_fetch_seconds', response.content)
+
+    @patch('parcer_app.metrics.push_to_gateway')
+    def test_push_only_when_gateway_configured(self, mock_push):
+        with override_settings(PARCER_METRICS_PUSHGATEWAY=''):
+            push_metrics()
+        mock_push.assert_not_called()
+
+        with override_settings(PARCER_METRICS_PUSHGATEWAY='localhost:9091'):
+            push_metrics()
+        mock_push.assert_called_once()
+        self.assertEqual(mock_push.call_args.args[0], 'localhost:9091')
+
+    @patch('parcer_app.metrics.delete_from_gateway')
+    @patch('parcer_app.metrics.push_to_gateway')
+    @override_settings(PARCER_METRICS_PUSHGATEWAY='localhost:9091')
+    def test_push_grouping(self, mock_push, mock_delete):
+        multiproc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiproc_dir)
+
+        # Общий каталог: сумма по процессам под ключом машины, группа не удаляется
+        with patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': multiproc_dir}):
+            push_metrics()
+            delete_metrics()
+        self.assertEqual(mock_push.call_args.kwargs['grouping_key'], {'instance': socket.gethostname()})
+        mock_delete.assert_not_called()
+
+        # Без общего каталога: свои метрики под ключом процесса, удаляются при завершении
+        with patch.dict(os.environ):
+            os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+            push_metrics()
+            delete_metrics()
+        key = {'instance': f'{socket.gethostname()}-{os.getpid()}'}
+        self.assertEqual(mock_push.call_args.kwargs['grouping_key'], key)
+        self.assertIs(mock_push.call_args.kwargs['registry'], REGISTRY)
+        mock_delete.assert_called_once_with('localhost:9091', job='parcer', grouping_key=key)
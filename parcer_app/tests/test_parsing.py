@@ -0,0 +1,295 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+from django.test import SimpleTestCase, override_settings
+from parcer_app import parsing
+from parcer_app.benchmarks.fixtures import CONTENT_SELECTORS, nested_content_html
+from parcer_app.engines import leading_rule
+
+try:
+    import lxml.cssselect
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+SELECTORS = {
+    'article_selector': 'a.article',
+    'title_selector': '.title',
+    'author_selector': '.author',
+    'author_url_selector': '.author_url',
+    'publication_date_selector': '.pub-date',
+    'content_selector': '.content',
+    'engine': 'bs4',
+}
+
+HABR_SELECTORS = {
+    'article_selector': 'article .tm-title__link',
+    'title_selector': 'article .tm-title span',
+    'author_selector': '.tm-article-presenter__content .tm-article-snippet__author .tm-user-info__username',
+    'author_url_selector': '.tm-article-presenter__content .tm-article-snippet__author .tm-user-info__username',
+    'publication_date_selector': 'article .tm-article-datetime-published time',
+    'content_selector': 'article .tm-article-body .article-formatted-body',
+    'engine': 'bs4',
+}
+
+STACKOVERFLOW_SELECTORS = {
+    'article_selector': '#questions .s-link',
+    'title_selector': '#question-header .question-hyperlink',
+    'author_selector': '.postcell .user-info .user-details a',
+    'author_url_selector': '.postcell .user-info .user-details a',
+    'publication_date_selector': '.postcell .user-action-time span',
+    'content_selector': '.postcell .js-post-body',
+    'engine': 'bs4',
+}
+
+ARTICLE_HTML = """
+<html>
+    <h1 class="title">Title</h1>
+    <a class="author_url" href="https://example.com/hub1/author/1">
+        <span class="author">Test Author</span>
+    </a>
+    <time datetime="2024-01-01" class="pub-date">2024-01-01</time>
+    <div class="content"><p>This is the content of the article.</p></div>
+</html>
+"""
+
+HABR_HUB_HTML = """
+<html><body>
+<article class="tm-articles-list__item"><h2 class="tm-title"><a class="tm-title__link" href="/ru/articles/1/"><span>Первая</span></a></h2></article>
+<article class="tm-articles-list__item"><h2 class="tm-title"><a class="tm-title__link" href="/ru/articles/2/"><span>Вторая</span></a></h2></article>
+<article class="tm-articles-list__item"><h2 class="tm-title"><a class="tm-title__link"><span>Без ссылки</span></a></h2></article>
+</body></html>
+"""
+
+HABR_ARTICLE_HTML = """
+<html><head><title>Статья</title><script>var x = "<p>не текст</p>";</script></head><body>
+<div class="tm-article-presenter__content">
+  <article class="tm-article-presenter__content tm-article-presenter__content_narrow">
+    <div class="tm-article-snippet__meta-container">
+      <div class="tm-article-snippet__author">
+        <span class="tm-user-info"><a class="tm-user-info__username" href="/ru/users/author/">
+          author
+        </a></span>
+      </div>
+      <span class="tm-article-datetime-published"><time datetime="2024-11-05T10:00:00.000Z" title="2024-11-05, 13:00">5 ноя</time></span>
+    </div>
+    <h1 class="tm-title tm-title_h1"><span>Заголовок
+      статьи</span></h1>
+    <div class="tm-article-body">
+      <div class="article-formatted-body article-formatted-body_version-2">
+        <div xmlns="http://www.w3.org/1999/xhtml">
+          <p>Первый <b>абзац</b> текста.</p>
+          <!-- комментарий -->
+          <h2>Раздел</h2>
+          <pre><code class="python">print("hello")</code></pre>
+          <blockquote><p>Цитата</p></blockquote>
+          <style>.x { color: red }</style>
+          <ul><li>Пункт</li></ul>
+        </div>
+      </div>
+    </div>
+  </article>
+</div>
+</body></html>
+"""
+
+STACKOVERFLOW_ARTICLE_HTML = """
+<html><body>
+<div id="question-header"><h1><a href="/questions/1/q" class="question-hyperlink">How to parse HTML?</a></h1></div>
+<div class="question">
+  <div class="postcell">
+    <div class="s-prose js-post-body" itemprop="text">
+      <p>I have a <code>str</code> with HTML.</p>
+      <pre><code>soup = BeautifulSoup(html)</code></pre>
+    </div>
+    <div class="user-info">
+      <div class="user-action-time">asked <span title="2024-10-01 12:00:00Z" class="relativetime">Oct 1</span></div>
+      <div class="user-details"><a href="/users/1/user">user</a></div>
+    </div>
+  </div>
+</div>
+</body></html>
+"""
+
+
+class ParsingTests(SimpleTestCase):
+
+    def tearDown(self):
+        parsing.shutdown_parse_executor()
+
+    def test_extract_links(self):
+        html = '<a class="article" href="/1">1</a><a class="article">2</a><a href="/3">3</a>'
+        self.assertEqual(parsing.extract_links(html, SELECTORS), ['/1'])
+
+    def test_extract_article(self):
+        article = parsing.extract_article(ARTICLE_HTML, SELECTORS)
+
+        self.assertEqual(article['title'], 'Title')
+        self.assertEqual(article['author'], 'Test Author')
+        self.assertEqual(article['author_url'], 'https://example.com/hub1/author/1')
+        self.assertEqual(article['publication_date'], '2024-01-01')
+        self.assertEqual(article['content'], 'This is the content of the article.')
+        self.assertEqual(article['errors'], [])
+
+    def test_extract_article_defaults(self):
+        article = parsing.extract_article('<html></html>', SELECTORS)
+
+        self.assertEqual(article['title'], 'Без названия')
+        self.assertEqual(article['author'], 'Аноним')
+        self.assertEqual(article['author_url'], '#')
+        self.assertIsNone(article['publication_date'])
+        self.assertEqual(article['content'], 'Без содержания')
+        self.assertEqual(len(article['errors']), 5)
+
+    def test_content_hash_tracks_stored_fields(self):
+        article = parsing.extract_article(ARTICLE_HTML, SELECTORS)
+        same = parsing.extract_article(ARTICLE_HTML, SELECTORS)
+        edited = parsing.extract_article(ARTICLE_HTML.replace('This is the content', 'This is the edited content'), SELECTORS)
+
+        self.assertEqual(len(article['content_hash']), 64)
+        self.assertEqual(article['content_hash'], same['content_hash'])
+        self.assertNotEqual(article['content_hash'], edited['content_hash'])
+
+    @override_settings(PARCER_PARSE_EXECUTOR='thread', PARCER_PARSE_WORKERS=2)
+    async def test_run_parser_in_thread_pool(self):
+        parsing.shutdown_parse_executor()
+
+        article = await parsing.run_parser(parsing.extract_article, ARTICLE_HTML, SELECTORS)
+
+        self.assertIsInstance(parsing.get_parse_executor(), ThreadPoolExecutor)
+        self.assertEqual(article['title'], 'Title')
+
+    @override_settings(PARCER_PARSE_EXECUTOR='process')
+    async def test_run_parser_with_explicit_executor(self):
+        default = parsing.get_parse_executor()
+
+        article = await parsing.run_parser(parsing.extract_article, ARTICLE_HTML, SELECTORS, executor='thread')
+
+        # Явно выбранный пул не заменяет пул по умолчанию
+        self.assertEqual(article['title'], 'Title')
+        self.assertIsInstance(parsing.get_parse_executor('thread'), ThreadPoolExecutor)
+        self.assertIs(parsing.get_parse_executor(), default)
+
+    @override_settings(PARCER_PARSE_EXECUTOR='process')
+    def test_daemon_process_falls_back_to_threads(self):
+        daemon = MagicMock(daemon=True)
+        daemon.name = 'ForkPoolWorker-1'
+
+        with patch('multiprocessing.current_process', return_value=daemon), \
+                self.assertLogs('parcer_app.parsing', level='WARNING') as logs:
+            executor = parsing.get_parse_executor()
+
+        self.assertIsInstance(executor, ThreadPoolExecutor)
+        self.assertIs(parsing.get_parse_executor('thread'), executor)
+        self.assertIn('ForkPoolWorker-1', logs.output[0])
+
+    def test_invalid_selector_reported_per_field(self):
+        article = parsing.extract_article(ARTICLE_HTML, {**SELECTORS, 'author_selector': '.author[', 'author_url_selector': None})
+
+        self.assertEqual(article['title'], 'Title')
+        self.assertEqual(article['author'], 'Аноним')
+        self.assertEqual(article['author_url'], '#')
+        self.assertEqual([field for field, _ in article['errors']], ['автора', 'URL автора'])
+
+
+class SubtreeParsingTests(SimpleTestCase):
+
+    def test_leading_rule(self):
+        self.assertEqual(leading_rule('article .tm-title span'), ('article', set(), set()))
+        self.assertEqual(leading_rule('#question-header .question-hyperlink'), (None, set(), {'question-header'}))
+        self.assertEqual(leading_rule('div.postcell.big > a'), ('div', {'postcell', 'big'}, set()))
+
+        for selector in ('h1 + p', 'h1 ~ p', 'div:first-child p', '[data-id] a', '.a, .b', '* p', None):
+            with self.subTest(selector=selector):
+                self.assertIsNone(leading_rule(selector))
+
+    def test_strained_parse_matches_full_parse(self):
+        html = """
+        <html><body>
+            <aside><h1 class="title">Реклама</h1></aside>
+            <div class="post"><h1 class="title">Заголовок</h1><p>Текст</p></div>
+            <h2>Автор</h2><span class="author">Сосед</span>
+        </body></html>
+        """
+        selectors = {
+            **SELECTORS,
+            'title_selector': '.post .title',
+            'author_selector': 'h2 + .author',
+            'content_selector': '.post',
+        }
+        strained = parsing.Extractor(selectors)
+        self.assertIsNone(strained.article_only)
+
+        selectors['author_selector'] = 'span.author'
+        strained = parsing.Extractor(selectors)
+        self.assertIsNotNone(strained.article_only)
+
+        full = parsing.Extractor(selectors)
+        full.article_only = None
+
+        article = strained.article(html)
+        self.assertEqual(article, full.article(html))
+        self.assertEqual(article['title'], 'Заголовок')
+        self.assertEqual(article['author'], 'Сосед')
+        self.assertEqual(article['content'], 'Заголовок\nТекст')
+
+    def test_extractor_is_cached_per_selectors(self):
+        self.assertIs(parsing.get_extractor(dict(SELECTORS)), parsing.get_extractor(dict(SELECTORS)))
+
+
+class ContentSerializationTests(SimpleTestCase):
+
+    def serialize(self, html, engine='bs4'):
+        return parsing.extract_article(html, {**SELECTORS, 'engine': engine})['content']
+
+    def test_nested_blocks_emit_text_once(self):
+        html = '<div class="content"><div><div><blockquote><p>Текст</p></blockquote></div></div><p>Второй</p></div>'
+        self.assertEqual(self.serialize(html), 'Текст\nВторой')
+
+    def test_inline_tags_keep_spacing(self):
+        html = '<div class="content"><p>Первый <b>абзац</b> и <code>код</code>.</p>Хвост<br>после</div>'
+        self.assertEqual(self.serialize(html), 'Первый абзац и код.\nХвост\nпосле')
+
+    def test_pre_keeps_formatting(self):
+        html = '<div class="content"><p>Пример:</p><pre><code>def f():\n    return 1\n</code></pre></div>'
+        self.assertEqual(self.serialize(html), 'Пример:\ndef f():\n    return 1')
+
+    def test_output_grows_linearly_with_depth(self):
+        for depth in (10, 100, 400):
+            with self.subTest(depth=depth):
+                html = nested_content_html(depth, paragraphs=1)
+                content = parsing.extract_article(html, {**CONTENT_SELECTORS, 'engine': 'bs4'})['content']
+
+                # Каждый абзац встречается ровно один раз
+                self.assertEqual(content.count('Абзац'), depth)
+
+
+@skipUnless(HAS_LXML, 'lxml и cssselect не установлены')
+class EngineConformanceTests(SimpleTestCase):
+    # Движок lxml должен давать те же результаты, что и BeautifulSoup
+
+    cases = (
+        (ARTICLE_HTML, SELECTORS),
+        (HABR_ARTICLE_HTML, HABR_SELECTORS),
+        (STACKOVERFLOW_ARTICLE_HTML, STACKOVERFLOW_SELECTORS),
+        ('<html><body><p>Пусто</p></body></html>', HABR_SELECTORS),
+        (nested_content_html(300), {**CONTENT_SELECTORS, 'engine': 'bs4'}),
+    )
+
+    def test_links(self):
+        for html, selectors in ((HABR_HUB_HTML, HABR_SELECTORS), (ARTICLE_HTML, SELECTORS)):
+            with self.subTest(selectors=selectors['article_selector']):
+                self.assertEqual(
+                    parsing.extract_links(html, {**selectors, 'engine': 'lxml'}),
+                    parsing.extract_links(html, {**selectors, 'engine': 'bs4'}),
+                )
+
+    def test_articles(self):
+        for html, selectors in self.cases:
+            with self.subTest(selectors=selectors['title_selector']):
+                expected = parsing.extract_article(html, {**selectors, 'engine': 'bs4'})
+                actual = parsing.extract_article(html, {**selectors, 'engine': 'lxml'})
+
+                expected.pop('errors')
+                actual.pop('errors')
+                self.assertEqual(actual, expected)
@@ -0,0 +1,74 @@
+from unittest import skipUnless
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from parcer_app.compression import compress, decompress
+from parcer_app.management.commands.move_post_content import BACKUP_TABLE
+from parcer_app.models import Hub, Post, PostContent
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+TEXT = 'Абзац статьи с повторяющимся текстом. ' * 200
+
+class PostContentTests(TestCase):
+
+    def setUp(self):
+        self.hub = Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
+
+    def test_round_trip(self):
+        for method in ('', 'zlib'):
+            self.assertEqual(decompress(compress(TEXT, method), method), TEXT)
+        self.assertLess(len(compress(TEXT, 'zlib')), len(TEXT.encode('utf-8')) // 10)
+
+    @skipUnless(HAS_ZSTD, 'zstandard не установлен')
+    def test_zstd_round_trip(self):
+        self.assertEqual(decompress(compress(TEXT, 'zstd'), 'zstd'), TEXT)
+
+    @override_settings(PARCER_CONTENT_COMPRESSION='zlib')
+    def test_content_stored_separately_and_loaded_lazily(self):
+        post = Post.objects.create(hub=self.hub, title='Пост', author_name='Автор', post_url='https://example.com/1', content=TEXT)
+
+        body = PostContent.objects.get(post=post)
+        self.assertEqual(body.compression, 'zlib')
+        self.assertEqual(body.text, TEXT)
+
+        # Выборка постов не тянет текст, он загружается при обращении
+        post = Post.objects.get(pk=post.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(post.content, TEXT)
+        with self.assertNumQueries(1):
+            self.assertEqual(Post.objects.select_related('body').get(pk=post.pk).content, TEXT)
+
+    def test_post_without_body_has_empty_content(self):
+        post = Post.objects.create(hub=self.hub, title='Пост', author_name='Автор', post_url='https://example.com/1')
+        self.assertEqual(Post.objects.get(pk=post.pk).content, '')
+
+
+class MovePostContentTests(TestCase):
+
+    def setUp(self):
+        self.hub = Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
+
+    def test_existing_bodies_survive_column_removal(self):
+        # Таблица постов до переноса: текст в столбце content
+        with connection.cursor() as cursor:
+            cursor.execute("ALTER TABLE parcer_app_post ADD COLUMN content TEXT")
+        old = Post.objects.create(hub=self.hub, title='Старый', author_name='Автор', post_url='https://example.com/1')
+        crawled = Post.objects.create(hub=self.hub, title='Новый', author_name='Автор', post_url='https://example.com/2', content='Свежий текст')
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE parcer_app_post SET content = %s WHERE id = %s", [TEXT, old.pk])
+            cursor.execute("UPDATE parcer_app_post SET content = %s WHERE id = %s", ['Старый текст', crawled.pk])
+
+        call_command('move_post_content')
+
+        self.assertEqual(Post.objects.get(pk=old.pk).content, TEXT)
+        self.assertEqual(Post.objects.get(pk=crawled.pk).content, 'Свежий текст')
+        self.assertNotIn(BACKUP_TABLE, connection.introspection.table_names())
+
+        # Повторный запуск ничего не меняет
+        call_command('move_post_content')
+        self.assertEqual(PostContent.objects.count(), 2)
@@ -0,0 +1,67 @@
+import os
+import pstats
+import shutil
+import tempfile
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from parcer_app.benchmarks.pages import HABR_SELECTORS
+from parcer_app.models import Hub
+from parcer_app.parsing import extract_links, run_parser
+from parcer_app.profiling import CrawlProfiler, _yappi
+
+HUB_HTML = '<article><h2 class="tm-title"><a class="tm-title__link" href="/a/1">1</a><a class="tm-title__link" href="/a/2">2</a></h2></article>'
+
+
+async def crawl(hub_name, parse_executor=None):
+    hubs = await sync_to_async(list)(Hub.objects.filter(name=hub_name))
+    links = await run_parser(extract_links, HUB_HTML, dict(HABR_SELECTORS, engine='bs4'), executor=parse_executor)
+    return [{'hub': hubs[0].name, 'processed': len(links), 'parse_time': 0.1, 'store_time': 0.2}]
+
+
+class CrawlProfilerTests(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        Hub.objects.create(name='Хаб 1', url='https://example.com/hub1')
+
+    async def profile(self):
+        profiler = CrawlProfiler('test', output_dir=self.output_dir)
+        result = await profiler.run(crawl, 'Хаб 1', parse_executor=profiler.parse_executor)
+
+        self.assertEqual(result[0]['processed'], 2)
+        self.assertTrue(os.path.exists(profiler.stats_path))
+        self.assertGreater(pstats.Stats(profiler.stats_path).total_calls, 0)
+
+        with open(profiler.report_path, encoding='utf-8') as report:
+            text = report.read()
+        self.assertIn('Запросов к БД: 1', text)
+        self.assertIn('parcer_app_hub', text)
+        self.assertIn('Хаб 1: обработано 2', text)
+        self.assertIn('crawl', text)
+        return profiler, text
+
+    async def test_profile_with_cprofile(self):
+        with patch('parcer_app.profiling._yappi', return_value=None), \
+                self.assertLogs('parcer_app.profiling', level='WARNING') as logs:
+            profiler, text = await self.profile()
+        self.assertIsNone(profiler.yappi)
+        self.assertIn('yappi не установлен', logs.output[0])
+        self.assertIn('cProfile', text)
+
+    async def test_profile_with_yappi(self):
+        if _yappi() is None:
+            self.skipTest('yappi не установлен')
+        profiler, text = await self.profile()
+        # Парсер выполняется в пуле потоков и попадает в профиль
+        self.assertIn('extract_links', text)
+
+    async def test_report_saved_when_crawl_fails(self):
+        async def failing():
+            raise RuntimeError('обход упал')
+
+        profiler = CrawlProfiler('test', output_dir=self.output_dir)
+        with self.assertRaises(RuntimeError):
+            await profiler.run(failing)
+        self.assertTrue(os.path.exists(profiler.report_path))
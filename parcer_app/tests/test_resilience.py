@@ -0,0 +1,112 @@
+import asyncio
+from datetime import timedelta
+from email.utils import format_datetime
+from unittest.mock import patch
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from parcer_app.resilience import CircuitBreaker, CircuitOpenError, get_circuit_breaker, parse_retry_after, reset_circuit_breakers, retry_delay
+
+
+class RetryDelayTests(SimpleTestCase):
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('завтра'))
+
+        retry_at = format_datetime(timezone.now() + timedelta(seconds=60), usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(retry_at), 60, delta=2)
+
+        # Дата в прошлом означает, что ждать не нужно
+        retry_at = format_datetime(timezone.now() - timedelta(seconds=60), usegmt=True)
+        self.assertEqual(parse_retry_after(retry_at), 0)
+
+    @override_settings(PARCER_RETRY_BASE_DELAY=1, PARCER_RETRY_MAX_DELAY=5)
+    def test_backoff_is_bounded_and_jittered(self):
+        for attempt in range(6):
+            for _ in range(20):
+                delay = retry_delay(attempt)
+                self.assertGreaterEqual(delay, 0)
+                self.assertLessEqual(delay, min(5, 2 ** attempt))
+
+    @override_settings(PARCER_RETRY_BASE_DELAY=1, PARCER_RETRY_MAX_DELAY=5)
+    def test_retry_after_is_minimum_delay(self):
+        self.assertGreaterEqual(retry_delay(0, retry_after=3), 3)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def allowed(self, breaker):
+        try:
+            with breaker.request():
+                return True
+        except CircuitOpenError:
+            return False
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('example.com', failure_threshold=3, reset_timeout=60)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertTrue(self.allowed(breaker))
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.allowed(breaker))
+
+    def test_half_open_lets_single_trial_through(self):
+        breaker = CircuitBreaker('example.com', failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+
+        with patch('parcer_app.resilience.time.monotonic', return_value=breaker.opened_until + 1):
+            with breaker.request():
+                self.assertFalse(self.allowed(breaker))
+
+                # Неудачный пробный запрос снова размыкает цепь
+                breaker.record_failure()
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with patch('parcer_app.resilience.time.monotonic', return_value=breaker.opened_until + 1):
+            with breaker.request():
+                breaker.record_success()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+            self.assertTrue(self.allowed(breaker))
+
+    def test_abandoned_trial_releases_half_open_breaker(self):
+        breaker = CircuitBreaker('example.com', failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+
+        with patch('parcer_app.resilience.time.monotonic', return_value=breaker.opened_until + 1):
+            # Пробный запрос отменен, не записав результат
+            with self.assertRaises(asyncio.CancelledError):
+                with breaker.request():
+                    with self.assertRaises(CircuitOpenError):
+                        with breaker.request():
+                            pass
+                    raise asyncio.CancelledError()
+
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            with breaker.request():
+                breaker.record_success()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_trip_waits_for_retry_after(self):
+        breaker = CircuitBreaker('example.com', failure_threshold=5, reset_timeout=10)
+        with patch('parcer_app.resilience.time.monotonic', return_value=1000):
+            breaker.trip(300)
+
+        # Цепь разомкнута дольше reset_timeout, пока не истечет Retry-After
+        with patch('parcer_app.resilience.time.monotonic', return_value=1100):
+            self.assertFalse(self.allowed(breaker))
+        with patch('parcer_app.resilience.time.monotonic', return_value=1301):
+            self.assertTrue(self.allowed(breaker))
+
+    def test_breaker_shared_per_host(self):
+        reset_circuit_breakers()
+        breaker = get_circuit_breaker('https://example.com/a')
+        self.assertIs(get_circuit_breaker('https://example.com/b'), breaker)
+        self.assertIsNot(get_circuit_breaker('https://other.example.com/a'), breaker)
+        reset_circuit_breakers()
@@ -0,0 +1,62 @@
+import asyncio
+from concurrent.futures import TimeoutError
+from django.test import SimpleTestCase
+from parcer_app.runtime import AsyncRuntime
+
+class AsyncRuntimeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.runtime = AsyncRuntime()
+        self.addCleanup(self.runtime.stop)
+
+    def test_loop_and_session_reused_between_runs(self):
+        async def task(value, session):
+            return asyncio.get_running_loop(), session, value
+
+        loop_1, session_1, value = self.runtime.run(task, 1)
+        loop_2, session_2, _ = self.runtime.run(task, 2)
+
+        self.assertEqual(value, 1)
+        self.assertIs(loop_1, loop_2)
+        self.assertIs(session_1, session_2)
+        self.assertFalse(session_1.closed)
+
+    def test_stop_closes_session(self):
+        async def task(session):
+            return session
+
+        session = self.runtime.run(task)
+        self.runtime.stop()
+
+        self.assertTrue(session.closed)
+        self.assertIsNone(self.runtime.loop)
+
+        # После остановки среда поднимается заново при следующей задаче
+        self.assertIsNot(self.runtime.run(task), session)
+
+    def test_errors_propagate(self):
+        async def task(session):
+            raise ValueError('ошибка')
+
+        with self.assertRaises(ValueError):
+            self.runtime.run(task)
+
+    def test_timeout_cancels_task(self):
+        cancelled = []
+
+        async def task(session):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with self.assertRaises(TimeoutError):
+            self.runtime.run(task, timeout=0.05)
+
+        async def wait(session):
+            await asyncio.sleep(0.01)
+
+        # Отмена доходит до корутины в loop
+        self.runtime.run(wait)
+        self.assertEqual(cancelled, [True])
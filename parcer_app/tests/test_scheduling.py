@@ -0,0 +1,36 @@
+from datetime import timedelta
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from parcer_app.scheduling import next_fetch_interval
+
+@override_settings(
+    PARCER_FETCH_INTERVAL_DEFAULT=10,
+    PARCER_FETCH_INTERVAL_MIN=5,
+    PARCER_FETCH_INTERVAL_MAX=360,
+    PARCER_TARGET_NEW_POSTS=5,
+    PARCER_FETCH_BACKOFF=1.5,
+)
+class NextFetchIntervalTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def test_first_run_uses_default(self):
+        self.assertEqual(next_fetch_interval(None, None, 3, self.now), 10)
+
+    def test_quiet_hub_backs_off(self):
+        interval = next_fetch_interval(20, self.now - timedelta(minutes=20), 0, self.now)
+        self.assertEqual(interval, 30)
+
+        # Интервал не растет бесконечно
+        self.assertEqual(next_fetch_interval(300, self.now - timedelta(minutes=300), 0, self.now), 360)
+
+    def test_busy_hub_crawled_more_often(self):
+        # 20 статей за 20 минут: 5 статей набираются за 5 минут
+        interval = next_fetch_interval(20, self.now - timedelta(minutes=20), 20, self.now)
+        self.assertEqual(interval, 12.5)
+        self.assertLess(next_fetch_interval(interval, self.now - timedelta(minutes=interval), 20, self.now), interval)
+
+    def test_interval_clamped_to_minimum(self):
+        interval = next_fetch_interval(5, self.now - timedelta(minutes=5), 500, self.now)
+        self.assertEqual(interval, 5)
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from parcer_app.models import Hub, HubSelectors
+from parcer_app.tasks import dispatch_due_hubs, hub_shards, report_fetching, schedule_fetching
+
+class ScheduleFetchingTests(TestCase):
+
+    def setUp(self):
+        self.hubs = []
+        for number in range(5):
+            hub = Hub.objects.create(name=f'Хаб {number}', url=f'https://hub{number}.example.com/')
+            HubSelectors.objects.create(hub=hub, article_selector='a')
+            self.hubs.append(hub)
+        # Хаб без селекторов не обходится
+        Hub.objects.create(name='Без селекторов', url='https://example.com/empty')
+
+    def test_one_task_per_hub(self):
+        self.assertEqual(hub_shards(), [[hub.pk] for hub in self.hubs])
+
+    @override_settings(PARCER_HUBS_PER_TASK=2)
+    def test_hubs_grouped_into_shards(self):
+        ids = [hub.pk for hub in self.hubs]
+        self.assertEqual(hub_shards(), [ids[0:2], ids[2:4], ids[4:5]])
+
+    @override_settings(PARCER_HUBS_PER_TASK=2)
+    def test_hubs_of_one_host_share_task(self):
+        ids = [hub.pk for hub in self.hubs]
+        same_host = []
+        for number in range(3):
+            hub = Hub.objects.create(name=f'Хаб хоста {number}', url=f'https://hub1.example.com/flow{number}')
+            HubSelectors.objects.create(hub=hub, article_selector='a')
+            same_host.append(hub.pk)
+
+        # Хабы хоста попадают в одну задачу, даже если их больше PARCER_HUBS_PER_TASK
+        self.assertEqual(hub_shards(), [ids[0:1], [ids[1]] + same_host, ids[2:4], ids[4:5]])
+
+    @patch('parcer_app.tasks.chord')
+    def test_schedule_dispatches_chord(self, mock_chord):
+        mock_chord.return_value = MagicMock()
+        schedule_fetching()
+
+        header = list(mock_chord.call_args.args[0])
+        self.assertEqual(len(header), len(self.hubs))
+        self.assertEqual(header[0].task, 'parcer_app.tasks.fetch_hubs')
+        self.assertEqual(header[0].args, ([self.hubs[0].pk],))
+        self.assertEqual(mock_chord.return_value.call_args.args[0].task, 'parcer_app.tasks.report_fetching')
+
+    def test_report_sums_results(self):
+        results = [
+            [{'hub': 'Хаб 0', 'processed': 3, 'stored': 2, 'updated': 1}],
+            [{'hub': 'Хаб 1', 'processed': 1, 'stored': 1, 'updated': 0}],
+            [],
+        ]
+        self.assertEqual(report_fetching(results), {'hubs': 2, 'processed': 4, 'stored': 3, 'updated': 1})
+
+    @patch('parcer_app.tasks.chord')
+    def test_only_due_hubs_dispatched(self, mock_chord):
+        now = timezone.now()
+        Hub.objects.filter(pk=self.hubs[0].pk).update(next_fetch_at=now - timedelta(minutes=1))
+        Hub.objects.filter(pk__in=[hub.pk for hub in self.hubs[1:4]]).update(next_fetch_at=now + timedelta(minutes=30))
+        # У последнего хаба время не задано: он еще ни разу не обходился
+
+        dispatch_due_hubs()
+
+        header = list(mock_chord.call_args.args[0])
+        self.assertEqual([signature.args for signature in header], [([self.hubs[4].pk],), ([self.hubs[0].pk],)])
+
+        # Выданные хабы не выдаются повторно, пока идет обход
+        mock_chord.reset_mock()
+        dispatch_due_hubs()
+        mock_chord.assert_not_called()
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from django.test import SimpleTestCase, override_settings
+from parcer_app.http_client import create_session
+from parcer_app.throttling import AdaptiveConcurrency, HostLimiter, TokenBucket, get_host_limiter
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    async def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, burst=3)
+
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.02)
+
+        # Следующие токены выдаются со скоростью rate
+        for _ in range(3):
+            await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+    async def test_zero_rate_is_unlimited(self):
+        bucket = TokenBucket(rate=0, burst=1)
+
+        started = time.monotonic()
+        for _ in range(100):
+            await bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.05)
+
+
+class HostLimiterTests(SimpleTestCase):
+
+    async def test_max_connections(self):
+        limiter = HostLimiter('example.com', rate=0, burst=1, max_connections=2, initial_connections=2)
+        active = 0
+        peak = 0
+
+        async def request():
+            nonlocal active, peak
+            async with limiter.slot():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(request() for _ in range(6)))
+        self.assertEqual(peak, 2)
+
+    @override_settings(PARCER_HOST_RATE=5, PARCER_HOST_LIMITS={'habr.com': {'rate': 1, 'max_connections': 2}})
+    async def test_limiter_shared_per_host(self):
+        habr = get_host_limiter('https://habr.com/ru/articles/')
+
+        self.assertIs(habr, get_host_limiter('https://habr.com/ru/articles/1/'))
+        self.assertIsNot(habr, get_host_limiter('https://stackoverflow.com/questions'))
+        self.assertEqual(habr.bucket.rate, 1)
+        self.assertEqual(get_host_limiter('https://stackoverflow.com/questions').bucket.rate, 5)
+
+    @override_settings(PARCER_HOST_MAX_CONNECTIONS=16, PARCER_HOST_LIMITS={'api.example.com': {'max_connections': 32}, 'habr.com': {'rate': 1}})
+    async def test_pool_does_not_cap_host_overrides(self):
+        async with create_session() as session:
+            self.assertEqual(session.connector.limit_per_host, 32)
+
+
+class AdaptiveConcurrencyTests(SimpleTestCase):
+
+    def make(self, initial=4):
+        return AdaptiveConcurrency(initial, minimum=1, maximum=8, latency_tolerance=2.0)
+
+    def test_additive_increase_up_to_maximum(self):
+        concurrency = self.make()
+        for _ in range(4):
+            concurrency.observe(time.monotonic(), 0.1, 200)
+        self.assertAlmostEqual(concurrency.limit, 5, delta=0.1)
+
+        for _ in range(200):
+            concurrency.observe(time.monotonic(), 0.1, 200)
+        self.assertEqual(concurrency.limit, 8)
+
+    def test_multiplicative_decrease_on_overload(self):
+        concurrency = self.make(initial=8)
+
+        concurrency.observe(time.monotonic(), 0.1, 429)
+        self.assertEqual(concurrency.limit, 4)
+
+        # Запрос, начатый до уменьшения, лимит повторно не снижает
+        concurrency.observe(0.0, 0.1, 503)
+        self.assertEqual(concurrency.limit, 4)
+
+        concurrency.observe(time.monotonic(), 30, failed=True)
+        concurrency.observe(time.monotonic(), 30, failed=True)
+        concurrency.observe(time.monotonic(), 30, failed=True)
+        self.assertEqual(concurrency.limit, 1)
+
+    def test_decrease_on_rising_latency(self):
+        concurrency = self.make(initial=8)
+        for _ in range(AdaptiveConcurrency.MIN_SAMPLES):
+            concurrency.observe(time.monotonic(), 0.1, 200)
+        limit = concurrency.limit
+
+        for _ in range(AdaptiveConcurrency.WINDOW):
+            concurrency.observe(time.monotonic(), 1.0, 200)
+        self.assertLess(concurrency.limit, limit)
+
+    async def test_in_flight_bounded_by_limit(self):
+        limiter = HostLimiter('example.com', rate=0, burst=1, max_connections=8, initial_connections=3)
+        active = 0
+        peak = 0
+
+        async def request():
+            nonlocal active, peak
+            async with limiter.slot() as attempt:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                attempt.status = 200
+                active -= 1
+
+        await asyncio.gather(*(request() for _ in range(3)))
+        self.assertEqual(peak, 3)
+        self.assertGreater(limiter.concurrency.limit, 3)
@@ -0,0 +1,169 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+import aiohttp
+from urllib.parse import urlsplit
+from django.conf import settings
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # rate <= 0 означает отсутствие ограничения
+        if self.rate <= 0:
+            return
+
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+# Число одновременных запросов подбирается по схеме AIMD: растет на 1 за
+# "круг" запросов, пока хост отвечает быстро и без ошибок, и уменьшается
+# вдвое при 429/503, таймаутах или росте p95 задержки
+class AdaptiveConcurrency:
+    OVERLOAD_STATUSES = (429, 503)
+    WINDOW = 50
+    MIN_SAMPLES = 20
+    DECREASE_FACTOR = 0.5
+    BASELINE_DRIFT = 0.01
+
+    def __init__(self, initial, minimum, maximum, latency_tolerance):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.baseline = None
+        self.last_decrease = 0.0
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def p95(self):
+        if len(self.latencies) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def observe(self, started, latency, status=None, failed=False):
+        overloaded = failed or status in self.OVERLOAD_STATUSES
+
+        if not overloaded:
+            self.latencies.append(latency)
+            p95 = self.p95()
+            if p95 is not None:
+                if self.baseline is None:
+                    self.baseline = p95
+                elif p95 > self.baseline * self.latency_tolerance:
+                    overloaded = True
+                else:
+                    # Базовая задержка медленно подстраивается под хост
+                    self.baseline = min(p95, self.baseline * (1 + self.BASELINE_DRIFT))
+
+        if overloaded:
+            # Уменьшаем лимит не чаще одного раза на запросы, начатые до прошлого уменьшения
+            if started >= self.last_decrease:
+                self.limit = max(self.minimum, self.limit * self.DECREASE_FACTOR)
+                self.last_decrease = time.monotonic()
+                self.latencies.clear()
+        elif status is not None and status < 500:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+class Attempt:
+    def __init__(self):
+        self.status = None
+
+
+# Ограничитель для одного хоста: частота запросов, всплеск и адаптивное
+# число одновременных соединений
+class HostLimiter:
+    def __init__(self, host, rate, burst, max_connections, min_connections=1,
+                 initial_connections=None, latency_tolerance=2.0):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(
+            initial_connections or max_connections, min_connections, max_connections, latency_tolerance
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.concurrency.acquire()
+        try:
+            await self.bucket.acquire()
+            attempt = Attempt()
+            started = time.monotonic()
+            try:
+                yield attempt
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                self.concurrency.observe(started, time.monotonic() - started, failed=True)
+                raise
+            self.concurrency.observe(started, time.monotonic() - started, attempt.status)
+        finally:
+            await self.concurrency.release()
+
+
+# Ограничители общие для всех хабов одного хоста. Примитивы asyncio
+# привязаны к event loop, поэтому реестр ведется для каждого loop отдельно.
+_limiters = weakref.WeakKeyDictionary()
+
+
+def host_limits(host):
+    limits = {
+        'rate': settings.PARCER_HOST_RATE,
+        'burst': settings.PARCER_HOST_BURST,
+        'max_connections': settings.PARCER_HOST_MAX_CONNECTIONS,
+        'min_connections': settings.PARCER_HOST_MIN_CONNECTIONS,
+        'initial_connections': settings.PARCER_HOST_INITIAL_CONNECTIONS,
+        'latency_tolerance': settings.PARCER_HOST_LATENCY_TOLERANCE,
+    }
+    limits.update(settings.PARCER_HOST_LIMITS.get(host, {}))
+    return limits
+
+
+def max_host_connections():
+    # Наибольший лимит соединений среди хостов: ограничение пула на хост
+    # не должно срезать лимиты, переопределенные в PARCER_HOST_LIMITS
+    overrides = [
+        limits['max_connections'] for limits in settings.PARCER_HOST_LIMITS.values()
+        if 'max_connections' in limits
+    ]
+    return max([settings.PARCER_HOST_MAX_CONNECTIONS] + overrides)
+
+
+def get_host_limiter(url, initial_connections=None):
+    # initial_connections - лимит, сохраненный в хабе после прошлого обхода
+    host = urlsplit(url).hostname or ''
+    limiters = _limiters.setdefault(asyncio.get_running_loop(), {})
+    if host not in limiters:
+        limits = host_limits(host)
+        if initial_connections:
+            limits['initial_connections'] = initial_connections
+        limiters[host] = HostLimiter(host, **limits)
+    return limiters[host]
@@ -1,3 +1,7 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from parcer_app.metrics import get_registry
 
-# Create your views here.
+
+def metrics(request):
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)